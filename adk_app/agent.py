@@ -2,8 +2,6 @@ import os
 import pathlib
 import sys
 import logging
-import base64
-import asyncio
 import glob
 
 # Set up logging for easier debugging
@@ -57,71 +55,163 @@ try:
 except ImportError:
     pass
 
-from vinted_scraper import capture_newest_vinted_item_screenshot
+# scan_jobs and vinted_scraper pull in Playwright, stealth and the whole scraper; they are
+# imported inside the tools so loading the agent (and a cold start) doesn't pay for them.
 
-def get_vinted_newest_item_screenshot(tool_context=None) -> str:
+# How long the blocking tool waits before handing back partial results (20 min)
+BLOCKING_SCAN_TIMEOUT = 1200
+
+NO_MATCHES_MESSAGE = "Ik heb de feed van de afgelopen 24 uur gescand op 'Nieuw met prijskaartje' Costes items. Ik heb per item de verkoper genoteerd, maar geen enkele verkoper gevonden die in deze periode 3 of meer items heeft geüpload (deze match + 2 andere). Daarom is er geen screenshot gemaakt."
+
+def format_matches(matches, intro=None):
+    """Formats matches grouped by seller as the markdown answer the agent passes on."""
+    # Group matches by seller
+    grouped_sellers = {}
+    for match in matches:
+        s_name = match['seller_name']
+        if s_name not in grouped_sellers:
+            grouped_sellers[s_name] = {
+                "url": match['seller_url'],
+                "items": []
+            }
+        grouped_sellers[s_name]["items"].append(match)
+
+    response = intro or f"Ik heb de afgelopen 24 uur gescand en **{len(matches)} matches** gevonden, verdeeld over **{len(grouped_sellers)} verkopers**:\n\n"
+
+    for s_name, data in grouped_sellers.items():
+        response += f"### Verkoper: [{s_name}]({data['url']}) ({len(data['items'])} items gevonden)\n"
+        windows = data['items'][-1].get('seller_windows')
+        if windows:
+            reasons = ", ".join(data['items'][-1].get('match_reasons') or [])
+            response += (f"Activiteit: {windows['1h']} in 1 uur, {windows['24h']} in 24 uur, {windows['7d']} in 7 dagen, "
+                         f"{windows['30d']} in 30 dagen (snelheid {data['items'][-1].get('velocity', 0)}x; regel: {reasons})\n")
+        for j, item in enumerate(data['items'], 1):
+            response += f"{j}. **Item:** {item['url']}\n"
+            response += f"   - **Maat:** {item['size']}\n"
+            response += f"   - **Kleur:** {item['color']}\n"
+            validity = " (niet in artikelcatalogus)" if item.get('product_id_valid') is False else ""
+            response += f"   - **Product ID:** {item['product_id']}{validity}\n"
+            response += f"   - **Screenshot:** `{os.path.basename(item['screenshot_path'])}`\n"
+            if item.get('shared_photo_sellers'):
+                response += f"   - **Zelfde foto's bij andere verkopers:** {', '.join(item['shared_photo_sellers'])}\n"
+        response += "\n"
+
+    response += "*(Opmerking: Vanwege lokale beperkingen kan ik de afbeeldingen hier niet direct tonen, maar ze zijn opgeslagen in de map `vinted_screenshots`.)*"
+    return response
+
+def answer_from_monitor(monitor, force_refresh):
+    """Answers from the monitor's precomputed matches, after a fresh incremental pass if asked."""
+    if force_refresh:
+        if not monitor.refresh(BLOCKING_SCAN_TIMEOUT):
+            intro = (
+                f"De nieuwe scan duurt langer dan verwacht en loopt nog op de achtergrond. "
+                f"Dit zijn de **{len(monitor.matches)} matches** van de vorige scan:\n\n"
+            )
+            return format_matches(list(monitor.matches), intro)
+    elif not monitor.wait_for_first_pass(BLOCKING_SCAN_TIMEOUT):
+        return "De monitor is net gestart en de eerste scan loopt nog. Probeer het over een paar minuten opnieuw."
+
+    if monitor.last_error and not monitor.matches:
+        raise RuntimeError(monitor.last_error)
+    matches = list(monitor.matches)
+    if not matches:
+        return NO_MATCHES_MESSAGE
+    age_minutes = int((monitor.snapshot()["age_seconds"] or 0) // 60)
+    intro = (
+        f"Volgens de doorlopende monitor (laatste scan {age_minutes} minuten geleden) zijn er "
+        f"**{len(matches)} matches** in de afgelopen 24 uur:\n\n"
+    )
+    return format_matches(matches, intro)
+
+def get_vinted_newest_item_screenshot(force_refresh: bool = False, tool_context=None) -> str:
     """
     Gaat naar Vinted, opent het nieuwste item en maakt een screenshot.
     Gebruik deze tool wanneer de gebruiker vraagt om te controleren op nieuwe Costes producten op Vinted.
+    Als de achtergrondmonitor draait, komt het antwoord direct uit de laatste monitorscan.
+    Zet force_refresh op True als de gebruiker expliciet om een verse scan vraagt.
     """
-    logger.info("Tool called: get_vinted_newest_item_screenshot")
+    logger.info(f"Tool called: get_vinted_newest_item_screenshot (force_refresh={force_refresh})")
     try:
-        # Run the scraper in a way that works whether we have a loop or not
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        if loop.is_running():
-            # If we are already in a loop (like ADK's), run it in a separate thread
-            import threading
-            from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
-            
-            with ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, capture_newest_vinted_item_screenshot())
-                try:
-                    # Set a 1200 second (20 min) timeout to allow thorough scanning of 100+ items
-                    matches = future.result(timeout=1200)
-                except FutureTimeoutError:
-                    return "De actie kon niet worden voltooid vanwege een time-out. De 24-uurs scan duurt langer dan verwacht (max 20 min). Probeer het later nog eens."
-        else:
-            matches = asyncio.run(capture_newest_vinted_item_screenshot())
-        
+        from scan_jobs import start_scan_job
+        from vinted_scraper import get_monitor
+
+        monitor = get_monitor()
+        if monitor:
+            return answer_from_monitor(monitor, force_refresh)
+
+        job = start_scan_job(force=force_refresh)
+        if not job.wait(BLOCKING_SCAN_TIMEOUT):
+            # The scan keeps running in the background; nothing found so far is lost
+            intro = (
+                f"De 24-uurs scan duurt langer dan verwacht (max 20 min) en loopt nog op de achtergrond (scan ID `{job.id}`). "
+                f"Tot nu toe zijn {job.items_scanned} items gescand en **{len(job.matches)} matches** gevonden:\n\n"
+            )
+            return format_matches(list(job.matches), intro)
+
+        if job.status == "failed":
+            raise RuntimeError(job.error)
+
+        matches = list(job.matches)
         if not matches:
-            return "Ik heb de feed van de afgelopen 24 uur gescand op 'Nieuw met prijskaartje' Costes items. Ik heb per item de verkoper genoteerd, maar geen enkele verkoper gevonden die in deze periode 3 of meer items heeft geüpload (deze match + 2 andere). Daarom is er geen screenshot gemaakt."
-        
-        
-        # Group matches by seller
-        grouped_sellers = {}
-        for match in matches:
-            s_name = match['seller_name']
-            if s_name not in grouped_sellers:
-                grouped_sellers[s_name] = {
-                    "url": match['seller_url'],
-                    "items": []
-                }
-            grouped_sellers[s_name]["items"].append(match)
-        
-        response = f"Ik heb de afgelopen 24 uur gescand en **{len(matches)} matches** gevonden, verdeeld over **{len(grouped_sellers)} verkopers**:\n\n"
-        
-        for s_name, data in grouped_sellers.items():
-            response += f"### Verkoper: [{s_name}]({data['url']}) ({len(data['items'])} items gevonden)\n"
-            for j, item in enumerate(data['items'], 1):
-                response += f"{j}. **Item:** {item['url']}\n"
-                response += f"   - **Maat:** {item['size']}\n"
-                response += f"   - **Kleur:** {item['color']}\n"
-                response += f"   - **Product ID:** {item['product_id']}\n"
-                response += f"   - **Screenshot:** `{os.path.basename(item['screenshot_path'])}`\n"
-            response += "\n"
-        
-        response += "*(Opmerking: Vanwege lokale beperkingen kan ik de afbeeldingen hier niet direct tonen, maar ze zijn opgeslagen in de map `vinted_screenshots`.)*"
-        return response
+            return NO_MATCHES_MESSAGE
+        return format_matches(matches)
     except Exception as e:
         error_msg = f"Er is een fout opgetreden bij het scrapen van Vinted: {type(e).__name__}: {str(e)}"
         logger.error(error_msg)
         return error_msg
 
+def start_vinted_scan(tool_context=None) -> str:
+    """
+    Start een scan van de Vinted feed op de achtergrond en geeft direct een scan ID terug.
+    Gebruik daarna 'get_vinted_scan_status' en 'get_vinted_scan_results' met dit scan ID.
+    """
+    logger.info("Tool called: start_vinted_scan")
+    from scan_jobs import SCAN_RESULT_TTL, start_scan_job
+
+    job = start_scan_job()
+    if job.is_finished():
+        return f"Er is een scan van minder dan {SCAN_RESULT_TTL // 60} minuten oud beschikbaar. Scan ID: `{job.id}`."
+    return f"De scan loopt op de achtergrond. Scan ID: `{job.id}`."
+
+def get_vinted_scan_status(job_id: str, tool_context=None) -> str:
+    """
+    Geeft de voortgang van een achtergrondscan: status, aantal gescande items en aantal matches tot nu toe.
+    """
+    from scan_jobs import get_scan_job
+
+    job = get_scan_job(job_id)
+    if not job:
+        return f"Geen scan gevonden met ID `{job_id}`."
+    status = job.to_dict()
+    labels = {"queued": "in de wachtrij", "running": "bezig", "done": "klaar", "failed": "mislukt"}
+    response = (
+        f"Scan `{job_id}` is {labels.get(status['status'], status['status'])}: "
+        f"{status['items_scanned']} items gescand ({status['items_cached']} uit cache), "
+        f"{status['match_count']} matches, {status['elapsed_seconds']} seconden bezig."
+    )
+    if status["error"]:
+        response += f" Fout: {status['error']}"
+    return response
+
+def get_vinted_scan_results(job_id: str, tool_context=None) -> str:
+    """
+    Geeft alle matches die een (eventueel nog lopende) achtergrondscan tot nu toe heeft gevonden.
+    """
+    from scan_jobs import get_scan_job
+
+    job = get_scan_job(job_id)
+    if not job:
+        return f"Geen scan gevonden met ID `{job_id}`."
+    matches = list(job.matches)
+    if not matches:
+        if job.is_finished():
+            return NO_MATCHES_MESSAGE
+        return f"Scan `{job_id}` is nog bezig en heeft nog geen matches gevonden ({job.items_scanned} items gescand)."
+    if job.is_finished():
+        return format_matches(matches)
+    intro = f"Scan `{job_id}` is nog bezig. Tussenstand: **{len(matches)} matches** na {job.items_scanned} items:\n\n"
+    return format_matches(matches, intro)
+
 # Configure Agent
 vinted_fraud_agent = LlmAgent(
     name="vinted_fraud_agent",
@@ -133,9 +223,11 @@ vinted_fraud_agent = LlmAgent(
         "Ga NOOIT zelf antwoorden dat je bezig bent of dat de actie is voltooid zonder de tool ECHT aan te roepen.\n\n"
         "Als je de tool aanroept, wacht dan op het resultaat. Gebruik NOOIT placeholders zoals '[insert URL here]'. "
         "Geef alleen de URL en informatie door die je van de tool terugkrijgt.\n\n"
+        "Vraagt de gebruiker expliciet om een verse of nieuwe scan, roep 'get_vinted_newest_item_screenshot' dan aan met force_refresh=True.\n\n"
+        "Als de gebruiker een scan op de achtergrond wil, gebruik dan 'start_vinted_scan' en daarna 'get_vinted_scan_status' en 'get_vinted_scan_results' met het scan ID.\n\n"
         "Reageer altijd in het Nederlands. Gebruik de informatie uit de tool om een compleet overzicht te geven van ALLE gevonden matches, gegroepeerd per verkoper, inclusief de bijbehorende URL's en de namen van de screenshots. Neem de volledige output van de tool over zonder deze samen te vatten."
     ),
-    tools=[get_vinted_newest_item_screenshot]
+    tools=[get_vinted_newest_item_screenshot, start_vinted_scan, get_vinted_scan_status, get_vinted_scan_results]
 )
 
 root_agent = vinted_fraud_agent
\ No newline at end of file
@@ -1,12 +1,180 @@
 import os
+import sys
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from google.adk.cli.fast_api import get_fast_api_app
 
+from scan_metrics import last_run_profile, render_prometheus
+
+# The scraper modules (browser_pool, scan_jobs, vinted_scraper) load Playwright, stealth,
+# NumPy and friends; they are imported on first use or by the pre-warm below, never at
+# import time, so the server starts listening quickly on a cold start.
+
 # Initialize the FastAPI application using ADK's helper
 # This ensures it's compatible with the Dockerfile's gunicorn command
 # We point to the root directory where 'adk_app' package resides.
 app = get_fast_api_app(agents_dir=".", web=True)
 
+# Keep a warm Chromium for the scraper tools (disable with VINTED_BROWSER_SERVICE=0)
+BROWSER_SERVICE_ENABLED = os.getenv("VINTED_BROWSER_SERVICE", "1") == "1"
+
+# When to import the scraper and start the browser service and monitor:
+# "background" right after the server starts listening, "blocking" before it accepts
+# requests, "off" only when a tool or route first needs them.
+SCRAPER_PREWARM = os.getenv("VINTED_PREWARM", "background")
+
+# Longest a /monitor/refresh request waits for its pass
+BLOCKING_REFRESH_TIMEOUT = 1200
+
+# ADK installs its own lifespan, which makes startup/shutdown event handlers a no-op,
+# so wrap it instead.
+_adk_lifespan = app.router.lifespan_context
+
+def _start_scraper_runtime():
+    """Imports the scraper, starts the browser service and the monitor. Blocking."""
+    from browser_pool import get_browser_service, start_browser_service
+    from vinted_scraper import MONITOR_INTERVAL, start_monitor
+
+    if BROWSER_SERVICE_ENABLED:
+        try:
+            start_browser_service()
+        except Exception as e:
+            # Tools fall back to launching their own browser per scan
+            print(f"Could not start browser service: {e}")
+    if MONITOR_INTERVAL > 0:
+        # Keeps matches precomputed so the agent can answer without scanning
+        start_monitor(MONITOR_INTERVAL, get_browser_service())
+
+def _stop_scraper_runtime():
+    # Nothing was started if the scraper was never imported
+    if "vinted_scraper" in sys.modules:
+        sys.modules["vinted_scraper"].stop_monitor()
+    if "browser_pool" in sys.modules:
+        sys.modules["browser_pool"].stop_browser_service()
+
+@asynccontextmanager
+async def _lifespan(fastapi_app):
+    warmup = None
+    if SCRAPER_PREWARM == "blocking":
+        await asyncio.to_thread(_start_scraper_runtime)
+    elif SCRAPER_PREWARM == "background":
+        # Runs in a thread while uvicorn finishes startup and starts serving
+        warmup = asyncio.create_task(asyncio.to_thread(_start_scraper_runtime))
+    try:
+        async with _adk_lifespan(fastapi_app) as state:
+            yield state
+    finally:
+        if warmup:
+            try:
+                await warmup
+            except Exception as e:
+                print(f"Scraper pre-warm failed: {e}")
+        await asyncio.to_thread(_stop_scraper_runtime)
+
+app.router.lifespan_context = _lifespan
+
+# --- Background scan jobs ---
+
+@app.post("/scans")
+def create_scan(force: bool = False):
+    """Starts a background scan (or joins/reuses a recent one) and returns its job ID."""
+    from scan_jobs import start_scan_job
+    return start_scan_job(force=force).to_dict()
+
+@app.get("/scans/cache-stats")
+def scan_cache_stats():
+    """Single-flight cache hits, misses and joins, to tune VINTED_SCAN_CACHE_TTL."""
+    from scan_jobs import get_scan_cache_stats
+    return get_scan_cache_stats()
+
+@app.get("/scans/{job_id}")
+def get_scan(job_id: str):
+    """Status and all matches found so far."""
+    from scan_jobs import get_scan_job
+    job = get_scan_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    return job.to_dict(include_matches=True)
+
+@app.get("/scans/{job_id}/events")
+async def stream_scan_events(job_id: str):
+    """Server-sent events for a scan: one event per scanned item and per match, then done/failed."""
+    from scan_jobs import get_scan_job
+    job = get_scan_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan not found")
+
+    async def event_stream():
+        cursor = 0
+        while True:
+            events = job.events[cursor:]
+            for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            cursor += len(events)
+            if job.is_finished() and cursor >= len(job.events):
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+# --- Background monitor ---
+
+@app.get("/monitor")
+def monitor_status():
+    """State of the background monitor (VINTED_MONITOR_INTERVAL) and its current matches."""
+    from vinted_scraper import get_monitor
+    monitor = get_monitor()
+    if not monitor:
+        raise HTTPException(status_code=404, detail="Monitor is not running")
+    return dict(monitor.snapshot(), matches=list(monitor.matches))
+
+@app.post("/monitor/refresh")
+async def refresh_monitor():
+    """Runs an incremental monitor pass now and returns the updated state."""
+    from vinted_scraper import get_monitor
+    monitor = get_monitor()
+    if not monitor:
+        raise HTTPException(status_code=404, detail="Monitor is not running")
+    await asyncio.to_thread(monitor.refresh, BLOCKING_REFRESH_TIMEOUT)
+    return dict(monitor.snapshot(), matches=list(monitor.matches))
+
+# --- Seller analytics ---
+
+@app.get("/sellers/trends")
+def seller_trends(by: str = "24h", limit: int = 20):
+    """Sellers with the most items in a window (1h, 24h, 7d, 30d) or the highest velocity."""
+    from history_store import HistoryStore
+    from seller_analytics import WINDOWS, get_seller_analytics
+    if by != "velocity" and by not in dict(WINDOWS):
+        raise HTTPException(status_code=400, detail="by must be 1h, 24h, 7d, 30d or velocity")
+    analytics = get_seller_analytics()
+    if not analytics.loaded:
+        store = HistoryStore()
+        try:
+            analytics.refresh(store)
+        finally:
+            store.close()
+    return analytics.top_sellers(limit, by)
+
+# --- Metrics ---
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics: phase latency histograms, scan counters, cache and browser pool stats."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/last-run")
+def latest_scan_profile():
+    """Full per-phase profile (spans and counters) of the most recent scan in this process."""
+    profile = last_run_profile()
+    if not profile:
+        raise HTTPException(status_code=404, detail="No scan has run yet")
+    return profile.to_dict()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "8080"))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=port)
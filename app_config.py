@@ -15,6 +15,10 @@ def get_config():
     config["VERTEX_LOCATION"] = os.getenv("VERTEX_LOCATION", "europe-west1")
     
     # Vinted Search URL (Optional override)
-    config["VINTED_SEARCH_URL"] = os.getenv("VINTED_SEARCH_URL", "https://www.vinted.nl/catalog?status_ids%5B%5D=6&page=1&time=1768305966&brand_ids%5B%5D=40883&search_by_image_uuid=&order=newest_first")
+    base_url = os.getenv("VINTED_BASE_URL", "https://www.vinted.nl")
+    config["VINTED_SEARCH_URL"] = os.getenv("VINTED_SEARCH_URL", f"{base_url}/catalog?status_ids%5B%5D=6&page=1&brand_ids%5B%5D=40883&order=newest_first")
+
+    # Several searches as inline JSON or a path to a JSON file (see search_targets.py)
+    config["VINTED_SEARCH_TARGETS"] = os.getenv("VINTED_SEARCH_TARGETS")
     
     return config
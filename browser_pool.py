@@ -0,0 +1,234 @@
+"""
+Long-lived Chromium shared across agent tool invocations.
+
+The FastAPI app starts one BrowserService at startup. It owns a dedicated event
+loop thread (Playwright objects are bound to the loop that created them), keeps a
+few cookie-consented browser contexts warm, and leases them to scans. Contexts are
+recycled after a number of pages, when the browser's memory grows too large or
+while the resource governor reports memory pressure, and are health-checked before
+every lease.
+"""
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+import vinted_scraper
+from resource_governor import get_resource_governor, process_tree_rss_mb
+from scan_metrics import register_collector, span
+
+POOL_SIZE = int(os.getenv("VINTED_BROWSER_POOL_SIZE", "2"))
+MAX_PAGES_PER_CONTEXT = int(os.getenv("VINTED_CONTEXT_MAX_PAGES", "300"))
+MAX_BROWSER_RSS_MB = int(os.getenv("VINTED_BROWSER_MAX_RSS_MB", "1500"))
+HEALTH_CHECK_TIMEOUT = 5
+
+
+class PooledContext:
+    """A warm browser context plus the bookkeeping needed to decide when to recycle it."""
+
+    def __init__(self, context):
+        self.context = context
+        self.pages_opened = 0
+        context.on("page", self._on_page)
+
+    def _on_page(self, page):
+        self.pages_opened += 1
+
+
+class BrowserService:
+    """Owns one Chromium and a pool of warm contexts on a background event loop."""
+
+    def __init__(self, pool_size=POOL_SIZE, max_pages_per_context=MAX_PAGES_PER_CONTEXT, max_rss_mb=MAX_BROWSER_RSS_MB):
+        self.pool_size = pool_size
+        self.max_pages_per_context = max_pages_per_context
+        self.max_rss_mb = max_rss_mb
+        self.loop = None
+        self.thread = None
+        self._playwright = None
+        self.browser = None
+        self._idle = None
+        self._launch_lock = None
+        self.stats = {"leases": 0, "contexts_created": 0, "contexts_recycled": 0, "browser_restarts": 0}
+
+    # --- lifecycle (called from any thread) ---
+
+    def start(self):
+        """Starts the loop thread, launches Chromium and warms the context pool."""
+        if self.loop:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="browser-service", daemon=True)
+        self.thread.start()
+        self.run(self._start())
+        print(f"Browser service started with {self.pool_size} warm contexts.")
+
+    def stop(self):
+        """Closes all contexts and the browser, then stops the loop thread."""
+        if not self.loop:
+            return
+        try:
+            self.run(self._stop(), timeout=30)
+        except Exception as e:
+            print(f"Error stopping browser service: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=10)
+        self.loop = None
+        print("Browser service stopped.")
+
+    def submit(self, coro):
+        """Schedules a coroutine on the service loop and returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Runs a coroutine on the service loop and blocks until it finishes."""
+        return self.submit(coro).result(timeout=timeout)
+
+    # --- internals (run on the service loop) ---
+
+    async def _start(self):
+        self._playwright = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        self._launch_lock = asyncio.Lock()
+        await self._launch_browser()
+
+    async def _launch_browser(self):
+        """
+        Launches Chromium and fills the pool. A previous browser and its idle contexts are
+        closed first; contexts still leased from it are closed when they are released.
+        The queue stays the same, so leases waiting on it get one of the new contexts.
+        """
+        while not self._idle.empty():
+            await self._close_context(self._idle.get_nowait())
+        if self.browser:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+        self.browser = await self._playwright.chromium.launch(headless=True)
+        for _ in range(self.pool_size):
+            await self._idle.put(await self._new_context())
+
+    async def _stop(self):
+        while self._idle and not self._idle.empty():
+            pooled = self._idle.get_nowait()
+            await self._close_context(pooled)
+        if self.browser:
+            await self.browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def _new_context(self):
+        """Creates a context and accepts cookies once so leased contexts start consented."""
+        context = await vinted_scraper.new_scan_context(self.browser)
+        await vinted_scraper.warm_up_context(context)
+        self.stats["contexts_created"] += 1
+        return PooledContext(context)
+
+    async def _close_context(self, pooled):
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    async def _is_healthy(self, pooled):
+        if not self.browser or not self.browser.is_connected():
+            return False
+        try:
+            await asyncio.wait_for(pooled.context.cookies(), timeout=HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def _ensure_browser(self):
+        """Relaunches Chromium (and the whole pool) if it crashed or disconnected."""
+        async with self._launch_lock:
+            # Concurrent leases that noticed the same crash relaunch once
+            if self.browser and self.browser.is_connected():
+                return
+            print("Browser disconnected, relaunching...")
+            self.stats["browser_restarts"] += 1
+            await self._launch_browser()
+
+    @asynccontextmanager
+    async def lease(self):
+        """Leases a warm, healthy context for the duration of a scan (service loop only)."""
+        with span("context_lease"):
+            await self._ensure_browser()
+            pooled = await self._idle.get()
+            if not await self._is_healthy(pooled):
+                await self._close_context(pooled)
+                if self.browser.is_connected():
+                    pooled = await self._new_context()
+                else:
+                    # The relaunch refills the pool with fresh contexts
+                    await self._ensure_browser()
+                    pooled = await self._idle.get()
+        self.stats["leases"] += 1
+        try:
+            yield pooled.context
+        finally:
+            await self._release(pooled)
+
+    async def _release(self, pooled):
+        if pooled.context.browser is not self.browser:
+            # Belongs to a browser that was relaunched while it was leased
+            await self._close_context(pooled)
+            return
+        rss_mb = process_tree_rss_mb()
+        if (pooled.pages_opened >= self.max_pages_per_context or rss_mb >= self.max_rss_mb
+                or get_resource_governor().should_recycle_context()):
+            print(f"Recycling browser context after {pooled.pages_opened} pages (RSS {rss_mb:.0f} MB).")
+            self.stats["contexts_recycled"] += 1
+            await self._close_context(pooled)
+            try:
+                pooled = await self._new_context()
+            except Exception as e:
+                print(f"Error creating replacement context: {e}")
+                await self._ensure_browser()
+                if pooled.context.browser is not self.browser:
+                    # The relaunch already refilled the pool
+                    return
+                pooled = await self._new_context()
+        await self._idle.put(pooled)
+
+
+_service = None
+
+
+def start_browser_service():
+    """Starts the process-wide browser service (idempotent)."""
+    global _service
+    if _service is None:
+        service = BrowserService()
+        service.start()
+        _service = service
+    return _service
+
+
+def stop_browser_service():
+    global _service
+    if _service is not None:
+        _service.stop()
+        _service = None
+
+
+def get_browser_service():
+    """Returns the running browser service, or None when the app did not start one."""
+    return _service
+
+
+def _browser_metrics():
+    service = _service
+    if service is None:
+        return []
+    return [
+        ("vinted_browser_pool_events_total", "counter", "Browser pool leases, context creations/recycles and browser restarts.",
+         [({"event": name}, value) for name, value in sorted(service.stats.items())]),
+        ("vinted_browser_rss_mb", "gauge", "Resident memory of the app process tree including Chromium.",
+         [({}, round(process_tree_rss_mb(), 1))]),
+    ]
+
+
+register_collector(_browser_metrics)
@@ -0,0 +1,71 @@
+"""
+One-shot harvesting of catalog grid cards.
+
+Reading the grid card by card (nth(i), inner_text, locator('a'), get_attribute)
+costs three or more Playwright round trips per card. GRID_EXTRACT_JS reads every
+card of the current catalog page in one page.evaluate call: item ID, URL, title,
+brand, price and the seller and upload-time hints some card layouts show. Cards
+that don't mention the keyword are dropped in the page, and cards are deduplicated
+on item ID (a card can hold several links to the same item).
+"""
+from scan_metrics import count, span
+
+GRID_ITEM_SELECTOR = '[data-testid="grid-item"]'
+
+GRID_EXTRACT_JS = """
+([selector, keyword]) => {
+    const text = (root, sel) => {
+        const el = root.querySelector(sel);
+        return el ? (el.innerText || el.textContent || '').trim() : null;
+    };
+    const cards = [];
+    const seen = new Set();
+    const nodes = document.querySelectorAll(selector);
+    for (const node of nodes) {
+        const link = node.querySelector('a[href*="/items/"]') || node.querySelector('a[href]');
+        if (!link) continue;
+        const url = new URL(link.getAttribute('href'), location.href).href;
+        const idMatch = url.match(/\\/items\\/(\\d+)/);
+        const itemId = idMatch ? idMatch[1] : url;
+        if (seen.has(itemId)) continue;
+        const cardText = node.innerText || node.textContent || '';
+        // The overlay link's title repeats title, brand, size and price on current layouts
+        const linkTitle = link.getAttribute('title') || '';
+        if (keyword && !(cardText + ' ' + linkTitle).toLowerCase().includes(keyword)) continue;
+        seen.add(itemId);
+
+        const lines = cardText.split('\\n').map(line => line.trim()).filter(Boolean);
+        const price = lines.find(line => /€|\\d+[,.]\\d{2}/.test(line)) || null;
+        const brand = text(node, '[data-testid$="--description-title"]') || lines[0] || null;
+        const title = text(node, '[data-testid$="--description-subtitle"]')
+            || linkTitle.split(',')[0].trim()
+            || lines.find(line => line !== brand && line !== price) || null;
+        const sellerLink = node.querySelector('a[href*="/member/"]');
+        const seller = text(node, '[data-testid$="--owner-name"]') || (sellerLink ? sellerLink.innerText.trim() : null);
+        const timeHint = lines.find(line => /geleden|ago|zojuist|just now/i.test(line)) || null;
+        cards.push({
+            item_id: itemId,
+            url,
+            title,
+            brand,
+            price,
+            seller_name: seller || null,
+            seller_url: sellerLink ? new URL(sellerLink.getAttribute('href'), location.href).href : null,
+            time_hint: timeHint,
+        });
+    }
+    return {total: nodes.length, cards};
+}
+"""
+
+
+async def harvest_grid(page, keyword="costes"):
+    """
+    Returns an ordered dict item_id -> card dict of the grid cards on the current catalog
+    page that mention keyword, in grid order.
+    """
+    with span("grid_harvest"):
+        harvested = await page.evaluate(GRID_EXTRACT_JS, [GRID_ITEM_SELECTOR, (keyword or "").lower()])
+    print(f"Found {harvested['total']} items in grid, {len(harvested['cards'])} mention '{keyword}'")
+    count("grid_cards", harvested["total"])
+    return {card["item_id"]: card for card in harvested["cards"]}
@@ -0,0 +1,244 @@
+"""
+SQLite-backed seller history and per-item scan cache.
+
+Replaces seller_history.json / item_cache.json. The database runs in WAL mode so
+several agent invocations can read and write at the same time; every write is a
+short IMMEDIATE transaction and inserts are upserts keyed by the Vinted item ID.
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+
+HISTORY_DB_FILE = os.getenv("VINTED_HISTORY_DB", "seller_history.db")
+
+# Legacy JSON files, imported once into the database
+LEGACY_HISTORY_FILE = "seller_history.json"
+LEGACY_ITEM_CACHE_FILE = "item_cache.json"
+
+ROLLING_WINDOW_SECONDS = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seller_items (
+    item_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    seller TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_seller_items_added ON seller_items (added_at);
+-- Seller counts live in SellerAnalytics; older databases still carry this index
+DROP INDEX IF EXISTS idx_seller_items_seller_added;
+
+CREATE TABLE IF NOT EXISTS scanned_items (
+    item_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    time_text TEXT,
+    uploaded_at REAL,
+    scanned_at REAL NOT NULL,
+    details TEXT,
+    seller_name TEXT,
+    seller_url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scanned_items_uploaded ON scanned_items (uploaded_at);
+
+-- Which configured searches listed each scanned item (an item can be in several)
+CREATE TABLE IF NOT EXISTS item_searches (
+    item_id TEXT NOT NULL,
+    search TEXT NOT NULL,
+    PRIMARY KEY (item_id, search)
+);
+CREATE INDEX IF NOT EXISTS idx_item_searches_search ON item_searches (search);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def item_key(product_url):
+    """Vinted item ID from the URL, or the URL itself when it has no /items/<id>."""
+    match = re.search(r'/items/(\d+)', product_url)
+    return match.group(1) if match else product_url
+
+
+class HistoryStore:
+    """Seller rolling-window history and item scan cache in one SQLite database."""
+
+    def __init__(self, path=None):
+        self.path = path or HISTORY_DB_FILE
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+        self.migrate_legacy_files()
+
+    def close(self):
+        self.conn.close()
+
+    def _write(self, sql, params=()):
+        """Runs a single write statement in its own IMMEDIATE transaction."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.conn.execute(sql, params)
+            self.conn.execute("COMMIT")
+            return cursor
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _write_many(self, sql, rows):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(sql, rows)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # --- meta ---
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        self._write(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    # --- seller history ---
+
+    def add_seller_item(self, seller, product_url, added_at=None):
+        """Records an item for a seller at added_at (its listing time; now if None). Returns True if it was new."""
+        cursor = self._write(
+            "INSERT INTO seller_items (item_id, url, seller, added_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(item_id) DO NOTHING",
+            (item_key(product_url), product_url, seller, added_at or time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def seller_count_total(self):
+        row = self.conn.execute("SELECT COUNT(DISTINCT seller) AS n FROM seller_items").fetchone()
+        return row["n"]
+
+    def expire(self, window=ROLLING_WINDOW_SECONDS):
+        """Deletes seller items and cached scans older than the rolling window."""
+        cutoff = time.time() - window
+        removed = self._write("DELETE FROM seller_items WHERE added_at <= ?", (cutoff,)).rowcount
+        removed += self._write(
+            "DELETE FROM scanned_items WHERE COALESCE(uploaded_at, scanned_at) <= ?", (cutoff,)
+        ).rowcount
+        self._write("DELETE FROM item_searches WHERE item_id NOT IN (SELECT item_id FROM scanned_items)")
+        return removed
+
+    def known_item_ids(self, search=None):
+        """
+        IDs of every item in the seller history or the scan cache, or with search
+        given, of the items that search has listed before.
+        """
+        if search is not None:
+            rows = self.conn.execute("SELECT item_id FROM item_searches WHERE search = ?", (search,))
+        else:
+            rows = self.conn.execute("SELECT item_id FROM seller_items UNION SELECT item_id FROM scanned_items")
+        return {row["item_id"] for row in rows}
+
+    def tag_item_search(self, item_id, search):
+        self._write("INSERT INTO item_searches (item_id, search) VALUES (?, ?) ON CONFLICT DO NOTHING", (item_id, search))
+
+    # --- item scan cache ---
+
+    @staticmethod
+    def _high_water_key(search):
+        return "high_water_mark" if search is None else f"high_water_mark:{search}"
+
+    def high_water_mark(self, search=None):
+        return int(self.get_meta(self._high_water_key(search), 0))
+
+    def advance_high_water_mark(self, item_id, search=None):
+        self._write(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))",
+            (self._high_water_key(search), str(int(item_id))),
+        )
+
+    def put_scanned_item(self, item_id, entry):
+        self._write(
+            "INSERT INTO scanned_items (item_id, url, time_text, uploaded_at, scanned_at, details, seller_name, seller_url) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(item_id) DO UPDATE SET url = excluded.url, time_text = excluded.time_text, "
+            "uploaded_at = excluded.uploaded_at, scanned_at = excluded.scanned_at, details = excluded.details, "
+            "seller_name = excluded.seller_name, seller_url = excluded.seller_url",
+            (
+                item_id, entry["url"], entry.get("time_text"), entry.get("uploaded_at"),
+                entry.get("scanned_at") or time.time(), json.dumps(entry.get("details") or {}),
+                entry.get("seller_name"), entry.get("seller_url"),
+            ),
+        )
+
+    def _row_to_entry(self, row):
+        entry = dict(row)
+        entry["details"] = json.loads(entry["details"] or "{}")
+        return entry
+
+    def get_scanned_item(self, item_id):
+        row = self.conn.execute("SELECT * FROM scanned_items WHERE item_id = ?", (item_id,)).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def scanned_items_newest_first(self, search=None):
+        """All cached scans (or those listed by search), newest (highest item ID) first."""
+        if search is not None:
+            rows = self.conn.execute(
+                "SELECT s.* FROM scanned_items s JOIN item_searches t ON t.item_id = s.item_id "
+                "WHERE t.search = ? ORDER BY CAST(s.item_id AS INTEGER) DESC",
+                (search,),
+            )
+        else:
+            rows = self.conn.execute("SELECT * FROM scanned_items ORDER BY CAST(item_id AS INTEGER) DESC")
+        return [self._row_to_entry(row) for row in rows]
+
+    def scanned_item_count(self):
+        return self.conn.execute("SELECT COUNT(*) AS n FROM scanned_items").fetchone()["n"]
+
+    # --- one-time migration ---
+
+    def migrate_legacy_files(self, history_file=LEGACY_HISTORY_FILE, item_cache_file=LEGACY_ITEM_CACHE_FILE):
+        """Imports seller_history.json and item_cache.json once. The JSON files are left untouched."""
+        if self.get_meta("legacy_migrated"):
+            return
+
+        if os.path.exists(history_file):
+            try:
+                with open(history_file, 'r') as f:
+                    legacy = json.load(f)
+                rows = [
+                    (item_key(item["url"]), item["url"], seller, item.get("added_at", 0))
+                    for seller, items in legacy.get("sellers", {}).items()
+                    for item in items
+                ]
+                self._write_many(
+                    "INSERT INTO seller_items (item_id, url, seller, added_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(item_id) DO NOTHING",
+                    rows,
+                )
+                print(f"Migrated {len(rows)} items from {history_file}.")
+            except Exception as e:
+                print(f"Error migrating {history_file}: {e}")
+
+        if os.path.exists(item_cache_file):
+            try:
+                with open(item_cache_file, 'r') as f:
+                    legacy = json.load(f)
+                for item_id, entry in legacy.get("items", {}).items():
+                    self.put_scanned_item(item_id, entry)
+                if legacy.get("high_water_mark"):
+                    self.advance_high_water_mark(legacy["high_water_mark"])
+                print(f"Migrated {len(legacy.get('items', {}))} cached items from {item_cache_file}.")
+            except Exception as e:
+                print(f"Error migrating {item_cache_file}: {e}")
+
+        self.set_meta("legacy_migrated", int(time.time()))
@@ -0,0 +1,226 @@
+"""
+HTTP-first extraction of Vinted item pages.
+
+Fetches item pages with a pooled httpx client (keep-alive, HTTP/2 when the h2
+package is installed) that carries the session cookies of the browser context,
+and parses the server-rendered HTML or embedded JSON into the same raw dict the
+ITEM_EXTRACT_JS page script returns. build_item_record turns either into an
+ItemRecord, so both paths yield identical fields.
+
+fetch_record() returns None whenever the response is blocked or the page does
+not contain enough to decide (upload time and seller); the caller then renders
+the item in Playwright as before.
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import re
+import time
+
+import httpx
+from bs4 import BeautifulSoup
+
+from item_extractor import PHOTO_SELECTOR, SELLER_SELECTORS, build_item_record
+from rate_control import BlockedError, http_get
+from scan_metrics import count, span
+
+# Set VINTED_HTTP_FIRST=0 to always render item pages in the browser
+HTTP_FIRST_ENABLED = os.getenv("VINTED_HTTP_FIRST", "1") == "1"
+
+# Concurrent HTTP item fetches; much cheaper than pages, so higher than SCAN_CONCURRENCY
+HTTP_CONCURRENCY = int(os.getenv("VINTED_HTTP_CONCURRENCY", "16"))
+
+HTTP_TIMEOUT_SECONDS = 15
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _looks_like_item(node, item_id):
+    return (
+        isinstance(node, dict)
+        and "title" in node
+        and ("user" in node or "user_id" in node)
+        and (item_id is None or str(node.get("id")) == item_id)
+    )
+
+
+def find_item_object(root, item_id, max_nodes=50000):
+    """Depth-first search of hydration JSON for the object describing item_id."""
+    stack = [root]
+    visited = 0
+    while stack and visited < max_nodes:
+        node = stack.pop()
+        visited += 1
+        if _looks_like_item(node, item_id):
+            return node
+        if isinstance(node, dict):
+            stack.extend(value for value in node.values() if isinstance(value, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(value for value in node if isinstance(value, (dict, list)))
+    return None
+
+
+def _title_of(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return value.get("title")
+    return None
+
+
+def parse_item_html(html, item_id, base_url):
+    """
+    Parses an item page into the raw dict produced by ITEM_EXTRACT_JS
+    (source, title, description, details, createdAt, size, color, sellerName, sellerUrl, photos).
+    """
+    soup = BeautifulSoup(html, "lxml")
+    out = {"source": "http", "title": "", "description": "", "details": [], "createdAt": None,
+           "size": None, "color": None, "sellerName": None, "sellerUrl": None, "photos": []}
+
+    # 1. Embedded hydration state
+    item = None
+    for script in soup.select('script[type="application/json"], script#__NEXT_DATA__'):
+        try:
+            item = find_item_object(json.loads(script.string or ""), item_id)
+        except ValueError:
+            item = None
+        if item:
+            break
+    if item:
+        out["source"] = "http_json"
+        out["title"] = _title_of(item.get("title")) or ""
+        out["description"] = _title_of(item.get("description")) or ""
+        out["createdAt"] = item.get("created_at_ts") or item.get("created_at")
+        out["size"] = _title_of(item.get("size_title")) or _title_of(item.get("size"))
+        out["color"] = _title_of(item.get("color1")) or _title_of(item.get("color"))
+        user = item.get("user") or {}
+        out["sellerName"] = user.get("login")
+        if user.get("profile_url"):
+            out["sellerUrl"] = str(httpx.URL(base_url).join(user["profile_url"]))
+        elif user.get("id"):
+            suffix = f"-{user['login']}" if user.get("login") else ""
+            out["sellerUrl"] = f"{base_url}/member/{user['id']}{suffix}"
+        out["photos"] = [
+            photo.get("url") or photo.get("full_size_url") for photo in item.get("photos") or []
+            if isinstance(photo, dict) and (photo.get("url") or photo.get("full_size_url"))
+        ]
+
+    # 2. Server-rendered DOM for anything still missing. get_text("\n") gives the
+    # same "key\nvalue" shape as innerText on the details rows.
+    def text(el):
+        return el.get_text("\n", strip=True) if el else ""
+
+    out["details"] = [text(el) for el in soup.select(".details-list__item")]
+    if not out["title"]:
+        out["title"] = text(soup.select_one("h1"))
+    if not out["description"]:
+        out["description"] = text(soup.select_one('[data-testid="item-description"]'))
+    if not out["photos"]:
+        out["photos"] = [str(httpx.URL(base_url).join(img["src"])) for img in soup.select(PHOTO_SELECTOR) if img.get("src")]
+    if not out["sellerName"] or not out["sellerUrl"]:
+        for selector in SELLER_SELECTORS:
+            el = soup.select_one(selector)
+            if not el:
+                continue
+            name = text(el).split("\n")[0].split("(")[0].strip()
+            href = el.get("href")
+            if not href:
+                link = el.find_parent("a", href=True) or el.find("a", href=True)
+                href = link.get("href") if link else None
+            if len(name) > 1 and href:
+                out["sellerName"] = out["sellerName"] or name
+                out["sellerUrl"] = out["sellerUrl"] or str(httpx.URL(base_url).join(href))
+                break
+    if not out["sellerUrl"]:
+        for link in soup.select('a[href*="/member/"]'):
+            href = link.get("href")
+            if href and "signup" not in href and "login" not in href:
+                out["sellerUrl"] = str(httpx.URL(base_url).join(href))
+                break
+    return out
+
+
+def is_complete(record):
+    """True if the record is enough to decide on the item without rendering it."""
+    if record.uploaded_at is None and record.time_text == "Unknown":
+        return False
+    return not record.is_within_24h or bool(record.seller_name)
+
+
+class HttpItemFetcher:
+    """
+    Pooled HTTP client for item pages. The client is created on first use so it
+    picks up the cookies the browser context holds after cookie consent.
+    """
+
+    def __init__(self, context, user_agent, concurrency=HTTP_CONCURRENCY):
+        self.context = context
+        self.user_agent = user_agent
+        self.concurrency = concurrency
+        self._client = None
+        self._lock = asyncio.Lock()
+
+    async def get_client(self):
+        async with self._lock:
+            if self._client is None:
+                cookies = httpx.Cookies()
+                for cookie in await self.context.cookies():
+                    cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+                self._client = httpx.AsyncClient(
+                    http2=HTTP2_AVAILABLE,
+                    cookies=cookies,
+                    headers={
+                        "User-Agent": self.user_agent,
+                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                        "Accept-Language": "nl-NL,nl;q=0.9,en;q=0.8",
+                    },
+                    limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                    timeout=HTTP_TIMEOUT_SECONDS,
+                    follow_redirects=True,
+                )
+            return self._client
+
+    async def fetch_record(self, product_url):
+        """Returns an ItemRecord parsed from the HTTP response, or None if the browser is needed."""
+        started = time.perf_counter()
+        try:
+            client = await self.get_client()
+            with span("http_fetch"):
+                response = await http_get(client, product_url)
+        except BlockedError as e:
+            print(f"HTTP fetch blocked for {product_url}, falling back to browser: {e}")
+            count("http_blocked")
+            return None
+        except Exception as e:
+            print(f"HTTP fetch failed for {product_url}: {e}")
+            count("http_errors")
+            return None
+
+        if response.status_code != 200:
+            print(f"HTTP {response.status_code} for {product_url}, falling back to browser.")
+            count(f"http_status_{response.status_code}")
+            return None
+        html = response.text
+        final_url = str(response.url)
+        base_url = f"{response.url.scheme}://{response.url.netloc.decode()}"
+        id_match = re.search(r'/items/(\d+)', final_url)
+        # Parsing a full page takes tens of milliseconds, keep it off the event loop
+        try:
+            with span("http_parse"):
+                raw = await asyncio.to_thread(parse_item_html, html, id_match.group(1) if id_match else None, base_url)
+        except Exception as e:
+            print(f"Could not parse {product_url}: {e}")
+            count("http_parse_errors")
+            return None
+        record = build_item_record(final_url, raw)
+        record.extract_ms = (time.perf_counter() - started) * 1000
+        if not is_complete(record):
+            count("http_incomplete")
+            return None
+        return record
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,335 @@
+"""
+Structured extraction of Vinted item pages.
+
+Everything the scanner needs from an item page (upload time, attributes, title,
+description, product ID candidates, seller and photo URLs) is collected in one
+page.evaluate call. The script prefers Vinted's embedded JSON state and falls
+back to DOM selectors for any field that is still missing.
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from article_index import get_article_index
+from scan_metrics import count
+
+SELLER_SELECTORS = [
+    '[data-testid="profile-username"]',
+    '[data-testid="item-owner-name"]',
+    '.seller-details__name',
+    'a[href*="/member/"]',
+]
+
+# Listing photos in the item gallery
+PHOTO_SELECTOR = '[data-testid^="item-photo"] img, .item-photos img'
+
+# Words that mark the "uploaded" row in the details list
+UPLOAD_LABELS = ("geplaatst", "uploaded")
+
+# Time indicators meaning "less than 24h ago"
+RECENT_MARKERS = ('zojuist', 'just now', 'sec', 'min', 'uur', 'hour')
+
+# Time indicators meaning "a day or more ago"
+OLD_MARKERS = ('dag', 'day', 'gisteren', 'yesterday')
+
+ITEM_EXTRACT_JS = """
+([sellerSelectors, photoSelector]) => {
+  const text = (el) => (el && el.innerText ? el.innerText.trim() : "");
+  const str = (v) => (typeof v === "string" ? v : (v && typeof v === "object" && v.title) || null);
+  const absolute = (href) => { try { return new URL(href, location.origin).href; } catch (e) { return null; } };
+  const idMatch = location.pathname.match(/\\/items\\/(\\d+)/);
+  const itemId = idMatch ? idMatch[1] : null;
+  const out = {source: "dom", title: "", description: "", details: [], createdAt: null,
+               size: null, color: null, sellerName: null, sellerUrl: null, photos: []};
+
+  // 1. Embedded hydration state: find the object describing this item
+  const looksLikeItem = (o) => o && typeof o === "object" && !Array.isArray(o)
+    && ("title" in o) && ("user" in o || "user_id" in o)
+    && (itemId === null || String(o.id) === itemId);
+  const findItem = (root) => {
+    const stack = [root];
+    let visited = 0;
+    while (stack.length && visited < 50000) {
+      const node = stack.pop();
+      visited++;
+      if (!node || typeof node !== "object") continue;
+      if (looksLikeItem(node)) return node;
+      for (const key in node) {
+        const value = node[key];
+        if (value && typeof value === "object") stack.push(value);
+      }
+    }
+    return null;
+  };
+  let item = null;
+  for (const script of document.querySelectorAll('script[type="application/json"], script#__NEXT_DATA__')) {
+    try { item = findItem(JSON.parse(script.textContent)); } catch (e) { item = null; }
+    if (item) break;
+  }
+  if (item) {
+    out.source = "json";
+    out.title = str(item.title) || "";
+    out.description = str(item.description) || "";
+    out.createdAt = item.created_at_ts || item.created_at || null;
+    out.size = str(item.size_title) || str(item.size);
+    out.color = str(item.color1) || str(item.color);
+    const user = item.user || {};
+    out.sellerName = user.login || null;
+    if (user.profile_url) out.sellerUrl = absolute(user.profile_url);
+    else if (user.id) out.sellerUrl = absolute(`/member/${user.id}${user.login ? "-" + user.login : ""}`);
+    out.photos = (item.photos || []).map((p) => p && (p.url || p.full_size_url)).filter(Boolean);
+  }
+
+  // 2. DOM fallback for anything still missing
+  out.details = Array.from(document.querySelectorAll('.details-list__item')).map(text);
+  if (!out.title) out.title = text(document.querySelector('h1'));
+  if (!out.description) out.description = text(document.querySelector('[data-testid="item-description"]'));
+  if (!out.photos.length) {
+    out.photos = Array.from(document.querySelectorAll(photoSelector))
+      .map((img) => img.currentSrc || img.getAttribute("src")).filter(Boolean).map(absolute);
+  }
+  if (!out.sellerName || !out.sellerUrl) {
+    for (const selector of sellerSelectors) {
+      const el = document.querySelector(selector);
+      if (!el) continue;
+      const name = text(el).split("\\n")[0].split("(")[0].trim();
+      let href = el.getAttribute("href");
+      if (!href) {
+        const link = el.closest("a[href]") || el.querySelector("a[href]");
+        href = link ? link.getAttribute("href") : null;
+      }
+      if (name.length > 1 && href) {
+        out.sellerName = out.sellerName || name;
+        out.sellerUrl = out.sellerUrl || absolute(href);
+        break;
+      }
+    }
+  }
+  if (!out.sellerUrl) {
+    for (const link of document.querySelectorAll('a[href*="/member/"]')) {
+      const href = link.getAttribute("href");
+      if (href && !href.includes("signup") && !href.includes("login")) {
+        out.sellerUrl = absolute(href);
+        break;
+      }
+    }
+  }
+  return out;
+}
+"""
+
+
+@dataclass
+class ItemRecord:
+    """Everything the scanner extracts from a single item page."""
+    url: str
+    item_id: Optional[str] = None
+    title: str = ""
+    description: str = ""
+    time_text: str = "Unknown"
+    uploaded_at: Optional[float] = None
+    is_within_24h: bool = True
+    size: str = "Onbekend"
+    color: str = "Onbekend"
+    product_id_candidates: List[str] = field(default_factory=list)
+    seller_name: Optional[str] = None
+    seller_url: Optional[str] = None
+    photo_urls: List[str] = field(default_factory=list)
+    # Catalog rows of validated article codes; None when no article catalog is configured
+    articles: Optional[List[dict]] = None
+    source: str = "dom"
+    extract_ms: float = 0.0
+
+    @property
+    def product_id(self):
+        return self.product_id_candidates[0] if self.product_id_candidates else "Onbekend"
+
+    def details(self):
+        """Returns the details dict in the shape get_item_details always produced."""
+        details = {
+            "size": self.size,
+            "color": self.color,
+            "product_id": self.product_id,
+        }
+        if self.articles is not None:
+            details["product_id_valid"] = bool(self.articles)
+            details["articles"] = self.articles
+        return details
+
+
+def find_upload_time(details_texts):
+    """Finds the relative upload time (e.g. '1 uur geleden') in the details list texts."""
+    for text in details_texts:
+        if not any(label in text.lower() for label in UPLOAD_LABELS):
+            continue
+        # The text usually looks like "Geplaatst\n1 uur geleden"
+        for line in text.split('\n'):
+            line_lower = line.lower().strip()
+            if any(x in line_lower for x in ['zojuist', 'just now', 'minu', 'uur', 'hour', 'ind', 'sec']):
+                return line.strip()
+            if any(x in line_lower for x in OLD_MARKERS):
+                return line.strip()
+    return None
+
+
+def classify_upload_time(time_text):
+    """
+    Returns True if the relative time text is < 24h, False if it is older.
+    Vinted switches to "1 dag geleden" after 24h. Unknown texts are kept (fail open).
+    """
+    time_lower = time_text.lower()
+    if any(x in time_lower for x in RECENT_MARKERS):
+        return True
+    if any(x in time_lower for x in OLD_MARKERS):
+        return False
+    return True
+
+
+# Relative time units as they appear in Dutch/English upload texts, in seconds
+RELATIVE_UNITS = (
+    ('sec', 1),
+    ('min', 60),
+    ('uur', 3600),
+    ('hour', 3600),
+    ('dag', 86400),
+    ('day', 86400),
+    ('week', 7 * 86400),
+    ('maand', 30 * 86400),
+    ('month', 30 * 86400),
+    ('jaar', 365 * 86400),
+    ('year', 365 * 86400),
+)
+
+
+def parse_relative_age(time_text):
+    """Converts a relative time text like '3 uur geleden' or 'an hour ago' into seconds, or None."""
+    time_lower = time_text.lower()
+    if 'zojuist' in time_lower or 'just now' in time_lower:
+        return 0
+    if 'gisteren' in time_lower or 'yesterday' in time_lower:
+        return 86400
+    match = re.search(r'\d+', time_lower)
+    # "een uur geleden" / "an hour ago" have no number
+    amount = int(match.group(0)) if match else 1
+    for unit, seconds in RELATIVE_UNITS:
+        if unit in time_lower:
+            return amount * seconds
+    return None
+
+
+def parse_timestamp(value):
+    """Parses an epoch number or ISO 8601 string from the JSON state into epoch seconds."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) / 1000 if value > 1e12 else float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_attributes(details_texts):
+    """Returns (size, color) from the 'key\\nvalue' texts of the details list."""
+    size = None
+    color = None
+    for text in details_texts:
+        if '\n' not in text:
+            continue
+        key, value = text.split('\n', 1)
+        key_l = key.lower()
+        if size is None and ('maat' in key_l or 'size' in key_l):
+            size = value.strip()
+        elif color is None and ('kleur' in key_l or 'color' in key_l):
+            color = value.strip()
+    return size, color
+
+
+def find_product_ids(text):
+    """
+    Returns product ID candidates in the order they should be trusted.
+    Common Costes patterns: 1234567, 123456-123 and the dotted 1.23.4.5678.
+    """
+    candidates = re.findall(r'\b\d{7,10}\b|\b\d{6}-\d{3}\b', text)
+    candidates += re.findall(r'\b\d\.\d{2}\.\d\.\d{4}\b', text)
+    return list(dict.fromkeys(candidates))
+
+
+def seller_name_from_url(seller_url):
+    """Derives the seller name from a /member/<id>-<name> URL."""
+    if not seller_url or "/member/" not in seller_url:
+        return None
+    member_part = seller_url.split("/member/", 1)[1].strip('/').split('/')[0].split('?')[0]
+    if not member_part:
+        return None
+    return member_part.split('-', 1)[1] if '-' in member_part else member_part
+
+
+def build_item_record(url, raw, now=None):
+    """Turns the raw extraction result (from the page script or HTML parsing) into an ItemRecord."""
+    now = now or time.time()
+    match = re.search(r'/items/(\d+)', url)
+    record = ItemRecord(url=url, item_id=match.group(1) if match else None, source=raw.get("source", "dom"))
+    record.title = raw.get("title") or ""
+    record.description = raw.get("description") or ""
+
+    details_texts = raw.get("details") or []
+    size, color = parse_attributes(details_texts)
+    record.size = raw.get("size") or size or "Onbekend"
+    record.color = raw.get("color") or color or "Onbekend"
+
+    uploaded_at = parse_timestamp(raw.get("createdAt"))
+    if uploaded_at:
+        age_hours = (now - uploaded_at) / 3600
+        record.uploaded_at = uploaded_at
+        record.is_within_24h = age_hours < 24
+        record.time_text = f"{age_hours:.1f} uur geleden"
+    else:
+        time_text = find_upload_time(details_texts)
+        if time_text:
+            record.time_text = time_text
+            record.is_within_24h = classify_upload_time(time_text)
+            age = parse_relative_age(time_text)
+            if age is not None:
+                record.uploaded_at = now - age
+
+    text = f"{record.title} {record.description}"
+    record.product_id_candidates = find_product_ids(text)
+    article_index = get_article_index()
+    if article_index is not None:
+        # Codes found in the article catalog go first; unvalidated numbers stay as fallback
+        record.articles = article_index.find_articles(text)
+        codes = [article["article_code"] for article in record.articles]
+        record.product_id_candidates = list(dict.fromkeys(codes + record.product_id_candidates))
+    record.photo_urls = list(dict.fromkeys(raw.get("photos") or []))
+
+    record.seller_url = raw.get("sellerUrl")
+    seller_name = raw.get("sellerName")
+    if seller_name:
+        # Clean up: sometimes it has reviews or " (90)"
+        seller_name = seller_name.splitlines()[0].split('(')[0].strip()
+    record.seller_name = seller_name or seller_name_from_url(record.seller_url)
+    return record
+
+
+async def extract_item_record(page, seller_wait_ms=3000):
+    """
+    Extracts an ItemRecord from the current item page with a single page.evaluate.
+    If the seller block has not rendered yet, waits once (bounded by seller_wait_ms)
+    for any seller selector and evaluates again.
+    """
+    started = time.perf_counter()
+    raw = await page.evaluate(ITEM_EXTRACT_JS, [SELLER_SELECTORS, PHOTO_SELECTOR])
+    if not raw.get("sellerUrl") and seller_wait_ms:
+        count("selector_fallbacks")
+        try:
+            await page.wait_for_selector(", ".join(SELLER_SELECTORS), timeout=seller_wait_ms)
+            raw = await page.evaluate(ITEM_EXTRACT_JS, [SELLER_SELECTORS, PHOTO_SELECTOR])
+        except Exception:
+            pass
+    record = build_item_record(page.url, raw)
+    count(f"extract_source_{record.source}")
+    record.extract_ms = (time.perf_counter() - started) * 1000
+    return record
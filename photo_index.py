@@ -0,0 +1,265 @@
+"""
+Perceptual-hash index of listing photos.
+
+Resellers of stolen stock tend to reuse the same product photos on several accounts,
+which the "seller has >= 3 items in 24h" rule cannot see. During a scan, PhotoHasher
+downloads the first PHOTO_HASH_LIMIT photos of every newly scanned item in batches,
+computes 64-bit pHashes in a worker thread and adds them to the PhotoIndex.
+
+The index keeps all hashes in one NumPy uint64 array (loaded from SQLite at start-up),
+so a neighbour search is a single vectorised XOR + popcount over the whole index.
+shared_photo_signal() turns the neighbours of an item's photos into the "photos shared
+across sellers" signal that is attached to every match: once when the match is emitted
+(flush_item hashes its photos first) and again after the scan, with every photo of the run.
+"""
+import asyncio
+import io
+import os
+import sqlite3
+import threading
+import time
+
+import httpx
+import numpy as np
+
+PHOTO_HASHING_ENABLED = os.getenv("VINTED_PHOTO_HASHING", "1") != "0"
+PHOTO_INDEX_DB = os.getenv("VINTED_PHOTO_INDEX_DB", "photo_index.db")
+# Hashes older than this are dropped when the index is loaded
+PHOTO_INDEX_DAYS = float(os.getenv("VINTED_PHOTO_INDEX_DAYS", "30"))
+# Maximum Hamming distance between two 64-bit pHashes of "the same" photo
+PHOTO_MATCH_DISTANCE = int(os.getenv("VINTED_PHOTO_MATCH_DISTANCE", "6"))
+PHOTO_HASH_LIMIT = int(os.getenv("VINTED_PHOTO_HASH_LIMIT", "2"))
+PHOTO_BATCH_SIZE = 16
+PHOTO_DOWNLOAD_CONCURRENCY = 8
+PHOTO_TIMEOUT_SECONDS = 10.0
+
+
+def _to_signed(value):
+    """SQLite integers are signed 64-bit; hashes are stored in two's complement."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hash_photos(blobs):
+    """Returns the 64-bit pHash of every image blob (None if it can't be decoded). Blocking."""
+    import imagehash
+    from PIL import Image
+
+    hashes = []
+    for blob in blobs:
+        try:
+            with Image.open(io.BytesIO(blob)) as image:
+                hashes.append(int(str(imagehash.phash(image)), 16))
+        except Exception:
+            hashes.append(None)
+    return hashes
+
+
+class PhotoIndex:
+    """Persistent photo hashes with a vectorised Hamming-distance neighbour search. Thread-safe."""
+
+    def __init__(self, db_path=PHOTO_INDEX_DB, max_distance=PHOTO_MATCH_DISTANCE):
+        self.max_distance = max_distance
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS photo_hashes (
+                item_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                hash INTEGER NOT NULL,
+                seller TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                PRIMARY KEY (item_id, position)
+            )"""
+        )
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self.hashes = np.zeros(1024, dtype=np.uint64)
+        self.size = 0
+        self.item_ids = []
+        self.sellers = []
+        self.rows_by_item = {}
+        self._load()
+
+    def _load(self):
+        cutoff = time.time() - PHOTO_INDEX_DAYS * 86400
+        self.conn.execute("DELETE FROM photo_hashes WHERE added_at < ?", (cutoff,))
+        self.conn.commit()
+        rows = self.conn.execute("SELECT item_id, hash, seller FROM photo_hashes ORDER BY added_at").fetchall()
+        signed = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        self._grow(len(rows))
+        self.hashes[:len(rows)] = signed.view(np.uint64)
+        self.size = len(rows)
+        for row_index, (item_id, _, seller) in enumerate(rows):
+            self.item_ids.append(item_id)
+            self.sellers.append(seller)
+            self.rows_by_item.setdefault(item_id, []).append(row_index)
+        print(f"Loaded {self.size} photo hashes for {len(self.rows_by_item)} items.")
+
+    def _grow(self, needed):
+        if needed <= len(self.hashes):
+            return
+        capacity = len(self.hashes)
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros(capacity, dtype=np.uint64)
+        grown[:self.size] = self.hashes[:self.size]
+        self.hashes = grown
+
+    def has_item(self, item_id):
+        with self._lock:
+            return item_id in self.rows_by_item
+
+    def add(self, item_id, seller, hashes):
+        """Adds the photo hashes of one item (None entries are skipped)."""
+        hashes = [value for value in hashes if value is not None]
+        if not hashes:
+            return
+        now = time.time()
+        with self._lock:
+            if item_id in self.rows_by_item:
+                return
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO photo_hashes (item_id, position, hash, seller, added_at) VALUES (?, ?, ?, ?, ?)",
+                [(item_id, position, _to_signed(value), seller, now) for position, value in enumerate(hashes)],
+            )
+            self.conn.commit()
+            self._grow(self.size + len(hashes))
+            rows = self.rows_by_item.setdefault(item_id, [])
+            for value in hashes:
+                self.hashes[self.size] = value
+                self.item_ids.append(item_id)
+                self.sellers.append(seller)
+                rows.append(self.size)
+                self.size += 1
+
+    def neighbours(self, hash_value, max_distance=None):
+        """Returns the row indices of all hashes within max_distance bits of hash_value."""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        with self._lock:
+            distances = np.bitwise_count(self.hashes[:self.size] ^ np.uint64(hash_value))
+            return np.flatnonzero(distances <= max_distance)
+
+    def shared_photo_signal(self, item_id, seller):
+        """
+        Returns {"shared_photo_sellers": [...], "shared_photo_items": [...]}: other sellers (and
+        their items) with a photo matching one of item_id's photos. Empty lists if none.
+        """
+        with self._lock:
+            own_hashes = [int(self.hashes[row]) for row in self.rows_by_item.get(item_id, [])]
+        sellers = set()
+        items = set()
+        for hash_value in own_hashes:
+            for row in self.neighbours(hash_value):
+                if self.sellers[row] != seller and self.item_ids[row] != item_id:
+                    sellers.add(self.sellers[row])
+                    items.add(self.item_ids[row])
+        return {"shared_photo_sellers": sorted(sellers), "shared_photo_items": sorted(items)}
+
+    def close(self):
+        self.conn.close()
+
+
+class PhotoHasher:
+    """Downloads and hashes item photos in batches while the scan runs."""
+
+    def __init__(self, index, user_agent, batch_size=PHOTO_BATCH_SIZE):
+        self.index = index
+        self.user_agent = user_agent
+        self.batch_size = batch_size
+        self.batch = []
+        self.tasks = set()
+        # Batch task of every started item, so a match can wait for its own photos
+        self.batch_tasks = {}
+        self.client = None
+        self.downloads = asyncio.Semaphore(PHOTO_DOWNLOAD_CONCURRENCY)
+        self.hashed = 0
+        self.failed = 0
+
+    def submit(self, item_id, seller, photo_urls):
+        """Queues an item's photos; starts a batch once batch_size items are waiting."""
+        if not item_id or not seller or not photo_urls or self.index.has_item(item_id):
+            return
+        self.batch.append((item_id, seller, photo_urls[:PHOTO_HASH_LIMIT]))
+        if len(self.batch) >= self.batch_size:
+            self._start_batch()
+
+    def _start_batch(self):
+        batch, self.batch = self.batch, []
+        task = asyncio.create_task(self._run_batch(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        for item_id, _, _ in batch:
+            self.batch_tasks[item_id] = task
+
+    async def _download(self, url):
+        # Photos come from the image CDN, not the rate-limited Vinted front end
+        async with self.downloads:
+            try:
+                response = await self.client.get(url)
+            except Exception:
+                return None
+            return response.content if response.status_code == 200 else None
+
+    async def _run_batch(self, batch):
+        if self.client is None:
+            self.client = httpx.AsyncClient(headers={"User-Agent": self.user_agent},
+                                            timeout=PHOTO_TIMEOUT_SECONDS, follow_redirects=True)
+        urls = [url for _, _, photo_urls in batch for url in photo_urls]
+        blobs = await asyncio.gather(*(self._download(url) for url in urls))
+        downloaded = [blob for blob in blobs if blob]
+        hashes = iter(await asyncio.to_thread(hash_photos, downloaded))
+        # Put the hashes back in item order; failed downloads hash to None
+        position = 0
+        entries = []
+        for item_id, seller, photo_urls in batch:
+            item_hashes = []
+            for _ in photo_urls:
+                item_hashes.append(next(hashes) if blobs[position] else None)
+                position += 1
+            entries.append((item_id, seller, item_hashes))
+        await asyncio.to_thread(self._add_all, entries)
+
+    def _add_all(self, entries):
+        for item_id, seller, item_hashes in entries:
+            if any(value is not None for value in item_hashes):
+                self.index.add(item_id, seller, item_hashes)
+                self.hashed += 1
+            else:
+                self.failed += 1
+
+    async def flush_item(self, item_id):
+        """Hashes item_id now if it is still queued and waits until its photos are indexed."""
+        if any(queued_id == item_id for queued_id, _, _ in self.batch):
+            self._start_batch()
+        task = self.batch_tasks.pop(item_id, None)
+        if task:
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def flush(self):
+        """Hashes everything still queued and waits for all batches."""
+        if self.batch:
+            self._start_batch()
+        results = await asyncio.gather(*list(self.tasks), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Error hashing photos: {result}")
+
+    async def close(self):
+        await self.flush()
+        if self.client is not None:
+            await self.client.aclose()
+        if self.hashed or self.failed:
+            print(f"Photo hashes: {self.hashed} items indexed, {self.failed} without usable photos.")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_photo_index():
+    """Returns the process-wide PhotoIndex, loading it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PhotoIndex()
+        return _index
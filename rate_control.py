@@ -0,0 +1,336 @@
+"""
+Adaptive rate control, retries and block detection for every request to Vinted.
+
+All navigations (catalog pages, item pages, screenshots) and HTTP item fetches go
+through goto() / http_get(). Per domain, a DomainController:
+
+- classifies each attempt: ok, blocked (HTTP 429, a 403 from the bot protection or a
+  challenge interstitial) or timeout;
+- runs AIMD on the domain's token bucket in rate_limit: every success adds a little
+  to the allowed rate, a block or timeout halves it (at most once per cooldown), so the
+  scraper settles at the highest rate Vinted tolerates;
+- retries failed attempts with full-jitter exponential backoff (honouring Retry-After),
+  within a per-request limit and a domain-wide retry budget;
+- opens a circuit breaker after CIRCUIT_THRESHOLD consecutive blocks. While open every
+  request fails fast with CircuitOpenError; after the cooldown one probe is let through
+  and its outcome closes or re-opens the circuit (with a doubled cooldown). A probe that
+  ends without a verdict (cancelled, or stuck past PROBE_TIMEOUT_SECONDS) re-opens it.
+
+Normal Vinted pages load the DataDome tag and reCAPTCHA config, so words like
+"datadome" or "captcha" in a page say nothing. Only the interstitial itself counts: the
+captcha-delivery.com challenge frame, or a challenge page title.
+"""
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from rate_limit import get_rate_limiter, throttle
+from scan_metrics import count, register_collector
+
+MIN_RATE = float(os.getenv("VINTED_DOMAIN_MIN_RATE", "0.2"))
+# Ceiling for the additive increase, as a multiple of the configured VINTED_DOMAIN_RATE
+MAX_RATE_FACTOR = float(os.getenv("VINTED_DOMAIN_MAX_RATE_FACTOR", "3"))
+ADDITIVE_INCREASE = 0.1
+MULTIPLICATIVE_DECREASE = 0.5
+DECREASE_COOLDOWN_SECONDS = 2.0
+
+MAX_RETRIES = int(os.getenv("VINTED_MAX_RETRIES", "3"))
+# Retries may add at most this fraction of the domain's requests (plus a small floor)
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_FLOOR = 10
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+CIRCUIT_THRESHOLD = int(os.getenv("VINTED_CIRCUIT_THRESHOLD", "5"))
+CIRCUIT_COOLDOWN_SECONDS = 60.0
+CIRCUIT_MAX_COOLDOWN_SECONDS = 600.0
+# A half-open probe without a verdict after this long no longer holds the circuit
+PROBE_TIMEOUT_SECONDS = 60.0
+
+RATE_LIMIT_STATUS = 429
+FORBIDDEN_STATUS = 403
+# Header DataDome sets on the responses it answers itself
+BOT_PROTECTION_HEADER = "x-datadome"
+
+# Host serving the DataDome challenge frame; the regular tag loads from elsewhere
+CHALLENGE_HOST = "captcha-delivery.com"
+# Titles of challenge interstitials (lower-case)
+CHALLENGE_TITLES = ("just a moment...", "attention required! | cloudflare")
+
+CHALLENGE_FRAME_PATTERN = re.compile(r"<(?:iframe|script)\b[^>]*\bsrc=[\"'][^\"']*captcha-delivery\.com", re.I)
+TITLE_PATTERN = re.compile(r"<title[^>]*>([^<]*)</title>", re.I)
+
+CHALLENGE_JS = """
+([host, titles]) => {
+  if (titles.includes(document.title.trim().toLowerCase())) return true;
+  return !!document.querySelector(`iframe[src*="${host}"], script[src*="${host}"]`);
+}
+"""
+
+
+class BlockedError(Exception):
+    """The request kept being blocked, challenged or timing out after all retries."""
+
+
+class CircuitOpenError(BlockedError):
+    """Requests to the domain are suspended by the circuit breaker."""
+
+
+def is_challenge_html(html):
+    """True if html is a challenge interstitial (not a normal page that loads the bot protection tag)."""
+    title = TITLE_PATTERN.search(html)
+    if title and title.group(1).strip().lower() in CHALLENGE_TITLES:
+        return True
+    return CHALLENGE_FRAME_PATTERN.search(html) is not None
+
+
+def is_block_status(status, headers):
+    """429 always; 403 only when the bot protection answered it (a plain 403 is a normal response)."""
+    if status == RATE_LIMIT_STATUS:
+        return True
+    return status == FORBIDDEN_STATUS and BOT_PROTECTION_HEADER in {key.lower() for key in headers.keys()}
+
+
+def is_timeout(error):
+    return isinstance(error, (asyncio.TimeoutError, TimeoutError)) or "Timeout" in type(error).__name__
+
+
+class DomainController:
+    """AIMD rate, retry budget and circuit breaker of one domain. Thread-safe."""
+
+    def __init__(self, domain):
+        self.domain = domain
+        bucket = get_rate_limiter().bucket(domain)
+        self.base_rate = bucket.rate
+        self.rate = bucket.rate
+        self.max_rate = bucket.rate * MAX_RATE_FACTOR
+        self.last_decrease = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.stats = {"ok": 0, "blocked": 0, "timeout": 0, "retries": 0, "circuit_opened": 0, "rejected": 0}
+        self.consecutive_failures = 0
+        self.circuit = "closed"
+        self.circuit_opened_at = 0.0
+        self.cooldown = CIRCUIT_COOLDOWN_SECONDS
+        self.probe = 0
+        self.probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def _apply_rate(self):
+        get_rate_limiter().bucket(self.domain).set_rate(self.rate)
+
+    def _start_probe(self, now):
+        self.probe += 1
+        self.probe_started_at = now
+        return self.probe
+
+    def before_request(self):
+        """
+        Raises CircuitOpenError while the circuit is open; lets one probe through afterwards.
+        Returns the probe token for a probe request (pass it to release_probe), else 0.
+        """
+        with self._lock:
+            now = time.time()
+            probe = 0
+            if self.circuit == "open":
+                if now - self.circuit_opened_at < self.cooldown:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(f"circuit open for {self.domain}")
+                self.circuit = "half_open"
+                probe = self._start_probe(now)
+                print(f"Circuit half-open for {self.domain}, sending a probe request.")
+            elif self.circuit == "half_open":
+                if now - self.probe_started_at < PROBE_TIMEOUT_SECONDS:
+                    # Only the probe may go; everyone else waits for its verdict
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(f"circuit half-open for {self.domain}")
+                print(f"Probe for {self.domain} gave no verdict in {PROBE_TIMEOUT_SECONDS:.0f}s, sending a new one.")
+                probe = self._start_probe(now)
+            self.requests += 1
+            return probe
+
+    def release_probe(self, probe):
+        """Ends a probe; if it gave no verdict (e.g. it was cancelled) the circuit re-opens."""
+        with self._lock:
+            if self.circuit == "half_open" and self.probe == probe:
+                self.circuit = "open"
+                self.circuit_opened_at = time.time()
+
+    def record_success(self):
+        with self._lock:
+            self.stats["ok"] += 1
+            self.consecutive_failures = 0
+            if self.circuit != "closed":
+                print(f"Circuit closed for {self.domain}.")
+                self.circuit = "closed"
+                self.cooldown = CIRCUIT_COOLDOWN_SECONDS
+            # Additive increase: roughly +ADDITIVE_INCREASE req/s per second of clean traffic
+            self.rate = min(self.max_rate, self.rate + ADDITIVE_INCREASE / max(self.rate, 1.0))
+            self._apply_rate()
+
+    def record_failure(self, kind):
+        with self._lock:
+            self.stats[kind] += 1
+            self.consecutive_failures += 1
+            now = time.time()
+            if now - self.last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                # Multiplicative decrease, once per cooldown so a burst of concurrent failures counts once
+                self.rate = max(MIN_RATE, self.rate * MULTIPLICATIVE_DECREASE)
+                self.last_decrease = now
+                self._apply_rate()
+                print(f"Backing off {self.domain} to {self.rate:.2f} req/s after {kind}.")
+            if self.circuit == "half_open" or (kind == "blocked" and self.consecutive_failures >= CIRCUIT_THRESHOLD):
+                if self.circuit == "half_open":
+                    self.cooldown = min(CIRCUIT_MAX_COOLDOWN_SECONDS, self.cooldown * 2)
+                self.circuit = "open"
+                self.circuit_opened_at = now
+                self.stats["circuit_opened"] += 1
+                print(f"Circuit opened for {self.domain} for {self.cooldown:.0f}s after {self.consecutive_failures} failures.")
+
+    def record_error(self):
+        """An attempt failed for an unrelated reason; a probe that errors re-opens the circuit."""
+        with self._lock:
+            if self.circuit == "half_open":
+                self.circuit = "open"
+                self.circuit_opened_at = time.time()
+
+    def allow_retry(self):
+        with self._lock:
+            if self.circuit != "closed":
+                return False
+            if self.retries >= self.requests * RETRY_BUDGET_RATIO + RETRY_BUDGET_FLOOR:
+                return False
+            self.retries += 1
+            self.stats["retries"] += 1
+            return True
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, rate=round(self.rate, 3), base_rate=self.base_rate, circuit=self.circuit,
+                        consecutive_failures=self.consecutive_failures)
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def controller_for(url):
+    domain = urlsplit(url).hostname or ""
+    with _controllers_lock:
+        if domain not in _controllers:
+            _controllers[domain] = DomainController(domain)
+        return _controllers[domain]
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff; a Retry-After header (seconds) is a lower bound."""
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return min(delay, BACKOFF_MAX_SECONDS)
+
+
+async def _controlled(url, attempt_fn):
+    """
+    Runs attempt_fn() under the domain's controller. attempt_fn returns (outcome, value,
+    retry_after) with outcome "ok", "blocked" or "timeout", or raises. Returns value of the
+    first ok attempt; raises BlockedError / CircuitOpenError or the last exception.
+    """
+    controller = controller_for(url)
+    attempt = 0
+    while True:
+        probe = controller.before_request()
+        try:
+            await throttle(url)
+            retry_after = None
+            try:
+                outcome, value, retry_after = await attempt_fn()
+                error = None
+            except Exception as e:
+                if not is_timeout(e):
+                    controller.record_error()
+                    raise
+                outcome, value, error = "timeout", None, e
+
+            # Counted per attempt; "requests_blocked" is already the resource policy's counter
+            count(f"attempts_{outcome}")
+            if outcome == "ok":
+                controller.record_success()
+                return value
+            controller.record_failure(outcome)
+        finally:
+            # Cancellation or any other exit must not leave the circuit half-open
+            if probe:
+                controller.release_probe(probe)
+        if attempt >= MAX_RETRIES or not controller.allow_retry():
+            if error is not None:
+                raise error
+            raise BlockedError(f"{outcome} on {url} after {attempt + 1} attempts")
+        delay = backoff_delay(attempt, retry_after)
+        print(f"{outcome.capitalize()} on {url}, retrying in {delay:.1f}s (attempt {attempt + 2}).")
+        count("request_retries")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def goto(page, url, **kwargs):
+    """page.goto with rate control, block/challenge detection, retries and the circuit breaker."""
+    async def attempt():
+        response = await page.goto(url, **kwargs)
+        if response is not None and is_block_status(response.status, response.headers):
+            return "blocked", response, response.headers.get("retry-after")
+        try:
+            challenged = await page.evaluate(CHALLENGE_JS, [CHALLENGE_HOST, list(CHALLENGE_TITLES)])
+        except Exception:
+            challenged = False
+        if challenged:
+            return "blocked", response, None
+        return "ok", response, None
+
+    return await _controlled(url, attempt)
+
+
+async def http_get(client, url):
+    """client.get with the same control as goto. Returns the response."""
+    async def attempt():
+        response = await client.get(url)
+        if is_block_status(response.status_code, response.headers):
+            return "blocked", response, response.headers.get("retry-after")
+        if response.status_code in (200, FORBIDDEN_STATUS) and is_challenge_html(response.text):
+            return "blocked", response, None
+        return "ok", response, None
+
+    return await _controlled(url, attempt)
+
+
+def rate_control_stats():
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return {controller.domain: controller.snapshot() for controller in controllers}
+
+
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _rate_control_metrics():
+    stats = rate_control_stats()
+    return [
+        ("vinted_rate_control_rate", "gauge", "AIMD request rate per domain (requests/second).",
+         [({"domain": domain}, values["rate"]) for domain, values in sorted(stats.items())]),
+        ("vinted_rate_control_circuit_state", "gauge", "Circuit breaker state per domain (0 closed, 1 half-open, 2 open).",
+         [({"domain": domain}, CIRCUIT_STATE_VALUES[values["circuit"]]) for domain, values in sorted(stats.items())]),
+        ("vinted_rate_control_requests_total", "counter", "Controlled requests per domain by outcome.",
+         [({"domain": domain, "outcome": outcome}, values[outcome])
+          for domain, values in sorted(stats.items())
+          for outcome in ("ok", "blocked", "timeout", "retries", "rejected", "circuit_opened")]),
+    ]
+
+
+register_collector(_rate_control_metrics)
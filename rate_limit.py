@@ -0,0 +1,108 @@
+"""
+Per-domain request budget shared by every search running in the process.
+
+Each domain (www.vinted.nl, www.vinted.de, ...) gets a token bucket. Callers
+reserve a token before every navigation or HTTP fetch and sleep until their
+reservation is due, so requests are served in arrival order and no single search
+can starve the others on the same domain. Buckets are guarded by a thread lock,
+which makes the limiter usable from the browser service loop and from scans
+running on their own event loop at the same time.
+"""
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from scan_metrics import register_collector
+
+# Sustained requests per second per domain, and how many may be sent back to back
+DOMAIN_RATE_PER_SECOND = float(os.getenv("VINTED_DOMAIN_RATE", "4"))
+DOMAIN_BURST = int(os.getenv("VINTED_DOMAIN_BURST", "8"))
+
+
+class TokenBucket:
+    """Token bucket handing out reservations: reserve() returns how long to wait."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+
+class DomainRateLimiter:
+    """One TokenBucket per domain, created on first use."""
+
+    def __init__(self, rate=DOMAIN_RATE_PER_SECOND, burst=DOMAIN_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.waited_seconds = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, domain):
+        with self._lock:
+            if domain not in self.buckets:
+                self.buckets[domain] = TokenBucket(self.rate, self.burst)
+                self.waited_seconds[domain] = 0.0
+            return self.buckets[domain]
+
+    async def acquire(self, url):
+        """Waits until a request to url's domain fits in the budget."""
+        domain = urlsplit(url).hostname or ""
+        delay = self.bucket(domain).reserve()
+        if delay > 0:
+            with self._lock:
+                self.waited_seconds[domain] += delay
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {
+                domain: {"rate_per_second": bucket.rate, "waited_seconds": round(self.waited_seconds[domain], 2)}
+                for domain, bucket in self.buckets.items()
+            }
+
+
+_limiter = DomainRateLimiter()
+
+
+def get_rate_limiter():
+    return _limiter
+
+
+async def throttle(url):
+    """Reserves a slot in the process-wide per-domain budget before requesting url."""
+    await _limiter.acquire(url)
+
+
+def _rate_limit_metrics():
+    stats = _limiter.stats()
+    return [
+        ("vinted_domain_rate_per_second", "gauge", "Current request budget per domain.",
+         [({"domain": domain}, values["rate_per_second"]) for domain, values in sorted(stats.items())]),
+        ("vinted_domain_throttled_seconds_total", "counter", "Time requests spent waiting for the per-domain budget.",
+         [({"domain": domain}, values["waited_seconds"]) for domain, values in sorted(stats.items())]),
+    ]
+
+
+register_collector(_rate_limit_metrics)
@@ -0,0 +1,140 @@
+"""
+Readiness waits for item pages, replacing fixed sleeps and one-by-one selector timeouts.
+
+- race_selectors() checks every candidate selector in one wait_for_function that is
+  re-evaluated on each animation frame. It returns the first usable element as soon as
+  one appears, instead of giving each selector its own timeout in turn.
+- Candidates are always checked in the configured order, most specific first, so a
+  broad fallback like 'main' only wins when no specific selector matches. A SelectorRace
+  counts which selector won; the counts are only exported on /metrics, where a layout
+  change on Vinted shows up as fallback wins.
+- wait_for_visual_ready() waits for real signals in one evaluate: web fonts loaded,
+  images in the element decoded and the element's box unchanged over a few frames.
+  Every wait is capped, so a page that never settles costs at most the cap.
+"""
+import threading
+
+from scan_metrics import count, register_collector
+
+RACE_TIMEOUT_MS = 5000
+VISUAL_READY_TIMEOUT_MS = 1500
+# Consecutive animation frames with an unchanged box before the layout counts as stable
+STABLE_FRAMES = 3
+
+RACE_JS = """
+([selectors, minSize]) => {
+  for (let i = 0; i < selectors.length; i++) {
+    for (const el of document.querySelectorAll(selectors[i])) {
+      const box = el.getBoundingClientRect();
+      if (box.width > minSize && box.height > minSize) return [i, el];
+    }
+  }
+  return false;
+}
+"""
+
+VISUAL_READY_JS = """
+async ([el, stableFrames, timeoutMs]) => {
+  const deadline = performance.now() + timeoutMs;
+  const capped = (promise) => Promise.race([
+    promise, new Promise((resolve) => setTimeout(resolve, Math.max(0, deadline - performance.now()))),
+  ]);
+  const root = el || document.body;
+  if (document.fonts) await capped(document.fonts.ready);
+  const images = Array.from(root.querySelectorAll("img")).filter((img) => {
+    const box = img.getBoundingClientRect();
+    return box.bottom > 0 && box.top < window.innerHeight && box.width > 0;
+  });
+  await capped(Promise.all(images.map((img) => img.decode().catch(() => null))));
+  const frame = () => new Promise((resolve) => requestAnimationFrame(resolve));
+  let last = null, stable = 0;
+  while (stable < stableFrames && performance.now() < deadline) {
+    await frame();
+    const box = root.getBoundingClientRect();
+    const key = [box.x, box.y, box.width, box.height].join(",");
+    stable = key === last ? stable + 1 : 0;
+    last = key;
+  }
+  return stable >= stableFrames;
+}
+"""
+
+
+class SelectorRace:
+    """Named list of candidate selectors plus how often each one won."""
+
+    def __init__(self, name, selectors):
+        self.name = name
+        self.selectors = list(selectors)
+        self.wins = {selector: 0 for selector in self.selectors}
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, selector):
+        with self._lock:
+            if selector is None:
+                self.misses += 1
+            else:
+                self.wins[selector] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"wins": dict(self.wins), "misses": self.misses}
+
+
+_races = []
+
+
+def selector_race(name, selectors):
+    """Creates a SelectorRace whose win counts are exported on /metrics."""
+    race = SelectorRace(name, selectors)
+    _races.append(race)
+    return race
+
+
+async def race_selectors(page, race, min_size=100, timeout_ms=RACE_TIMEOUT_MS):
+    """
+    Waits until any selector of race matches an element larger than min_size px in both
+    directions. Returns (selector, element handle), or (None, None) after timeout_ms.
+    """
+    selectors = race.selectors
+    try:
+        handle = await page.wait_for_function(RACE_JS, arg=[selectors, min_size], polling="raf", timeout=timeout_ms)
+        index = await (await handle.get_property("0")).json_value()
+        element = (await handle.get_property("1")).as_element()
+    except Exception:
+        race.record(None)
+        count(f"selector_race_{race.name}_misses")
+        return None, None
+    selector = selectors[index]
+    race.record(selector)
+    if selector != race.selectors[0]:
+        count(f"selector_race_{race.name}_fallbacks")
+    return selector, element
+
+
+async def wait_for_visual_ready(page, element=None, timeout_ms=VISUAL_READY_TIMEOUT_MS):
+    """Waits for fonts, decoded images and a stable layout of element (or the page). Returns True if settled."""
+    try:
+        settled = await page.evaluate(VISUAL_READY_JS, [element, STABLE_FRAMES, timeout_ms])
+    except Exception:
+        settled = False
+    if not settled:
+        count("visual_ready_timeouts")
+    return settled
+
+
+def _readiness_metrics():
+    wins = []
+    misses = []
+    for race in _races:
+        stats = race.stats()
+        wins += [({"race": race.name, "selector": selector}, value) for selector, value in stats["wins"].items()]
+        misses.append(({"race": race.name}, stats["misses"]))
+    return [
+        ("vinted_selector_race_wins_total", "counter", "Times each candidate selector won its readiness race.", wins),
+        ("vinted_selector_race_misses_total", "counter", "Readiness races where no selector matched in time.", misses),
+    ]
+
+
+register_collector(_readiness_metrics)
@@ -0,0 +1,231 @@
+"""
+Memory governor for long scans.
+
+Pages are reused for many navigations during a scan, and Chromium's memory grows
+with every one of them. On a memory-capped Cloud Run instance the container is killed
+partway through a long scan. ResourceGovernor samples the resident memory of the
+process tree (Python plus Chromium) and compares it with the memory limit:
+
+- pages are closed and replaced after VINTED_PAGE_MAX_NAVIGATIONS uses, or right away
+  when memory is above the soft limit;
+- above the soft limit fewer pages run at once (half), above the hard limit one;
+- the browser service recycles contexts between scans while memory is above the soft limit.
+
+ScanCheckpoint records how far a scan got through the catalog. Scanned items are
+already cached as they finish, but the high-water mark jumps to the newest item, so
+the run after an interrupted scan stopped paging on page 1. With the checkpoint it
+pages on (answering cached items from the cache) until it is past the pages the
+interrupted run had reached. A scan that keeps ending incomplete (an item that fails on
+every run) stops resuming after VINTED_CHECKPOINT_MAX_RESUMES runs. Each scanner (the
+background monitor, on-demand scan jobs) keeps its own checkpoint per search.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+
+from scan_metrics import count, register_collector
+
+PAGE_MAX_NAVIGATIONS = int(os.getenv("VINTED_PAGE_MAX_NAVIGATIONS", "50"))
+# 0 = use the container's cgroup limit (fallback DEFAULT_MEMORY_LIMIT_MB)
+MEMORY_LIMIT_MB = int(os.getenv("VINTED_MEMORY_LIMIT_MB", "0"))
+MEMORY_SOFT_FRACTION = float(os.getenv("VINTED_MEMORY_SOFT_FRACTION", "0.75"))
+MEMORY_HARD_FRACTION = float(os.getenv("VINTED_MEMORY_HARD_FRACTION", "0.9"))
+DEFAULT_MEMORY_LIMIT_MB = 2048
+# Reading /proc for every Chromium process takes a few ms, so samples are reused this long
+SAMPLE_INTERVAL_SECONDS = 1.0
+THROTTLE_POLL_SECONDS = 0.2
+# Consecutive incomplete runs after which the next run starts from page 1 again
+CHECKPOINT_MAX_RESUMES = int(os.getenv("VINTED_CHECKPOINT_MAX_RESUMES", "3"))
+
+CGROUP_LIMIT_FILES = ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+
+
+def process_tree_rss_mb(root_pid=None):
+    """Resident memory (MB) of root_pid and all its descendants, read from /proc."""
+    root_pid = root_pid or os.getpid()
+    parents = {}
+    rss_pages = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            # Fields after the ")" of the command name: state, ppid, ... rss is field 24
+            fields = stat[stat.rindex(")") + 2:].split()
+            parents[int(entry)] = int(fields[1])
+            rss_pages[int(entry)] = int(fields[21])
+        except (OSError, ValueError, IndexError):
+            continue
+
+    tree = {root_pid}
+    changed = True
+    while changed:
+        changed = False
+        for pid, ppid in parents.items():
+            if ppid in tree and pid not in tree:
+                tree.add(pid)
+                changed = True
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    return sum(rss_pages.get(pid, 0) for pid in tree) * page_size / (1024 * 1024)
+
+
+def container_memory_limit_mb():
+    """The cgroup memory limit in MB, or None when unlimited or unknown."""
+    for path in CGROUP_LIMIT_FILES:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 50:
+            return int(value) / (1024 * 1024)
+    return None
+
+
+class ResourceGovernor:
+    """Samples memory and decides when to recycle pages and how many may run at once."""
+
+    def __init__(self, limit_mb=None, max_navigations=PAGE_MAX_NAVIGATIONS):
+        self.set_limit(limit_mb or MEMORY_LIMIT_MB or container_memory_limit_mb() or DEFAULT_MEMORY_LIMIT_MB)
+        self.max_navigations = max_navigations
+        self.sampled_at = 0.0
+        self.last_mb = 0.0
+        self.peak_mb = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"pages_recycled": 0, "throttled_waits": 0, "contexts_recycled": 0}
+
+    def set_limit(self, limit_mb):
+        """Sets the memory limit and the soft and hard thresholds derived from it."""
+        self.limit_mb = limit_mb
+        self.soft_mb = limit_mb * MEMORY_SOFT_FRACTION
+        self.hard_mb = limit_mb * MEMORY_HARD_FRACTION
+
+    def rss_mb(self):
+        """Resident memory of the process tree; sampled at most every SAMPLE_INTERVAL_SECONDS."""
+        with self._lock:
+            if time.monotonic() - self.sampled_at >= SAMPLE_INTERVAL_SECONDS:
+                self.last_mb = process_tree_rss_mb()
+                self.peak_mb = max(self.peak_mb, self.last_mb)
+                self.sampled_at = time.monotonic()
+            return self.last_mb
+
+    def pressure(self):
+        """'ok', 'high' (above the soft limit) or 'critical' (above the hard limit)."""
+        rss = self.rss_mb()
+        if rss >= self.hard_mb:
+            return "critical"
+        if rss >= self.soft_mb:
+            return "high"
+        return "ok"
+
+    def page_limit(self, size):
+        """How many of size pages may be in use at the current memory pressure."""
+        pressure = self.pressure()
+        if pressure == "critical":
+            return 1
+        if pressure == "high":
+            return max(1, size // 2)
+        return size
+
+    async def wait_for_slot(self, in_use, size):
+        """Waits until in_use() is below page_limit(size). Returns without awaiting when it already is."""
+        waited = False
+        while in_use() >= self.page_limit(size):
+            waited = True
+            await asyncio.sleep(THROTTLE_POLL_SECONDS)
+        if waited:
+            self.stats["throttled_waits"] += 1
+            count("memory_throttled")
+
+    def should_recycle_page(self, uses):
+        """True when a page that served uses navigations should be closed instead of reused."""
+        if uses >= self.max_navigations or self.pressure() != "ok":
+            self.stats["pages_recycled"] += 1
+            count("pages_recycled")
+            return True
+        return False
+
+    def should_recycle_context(self):
+        if self.pressure() != "ok":
+            self.stats["contexts_recycled"] += 1
+            return True
+        return False
+
+    def report(self):
+        """Prints the peak memory and recycling counters of the last run, then resets the peak."""
+        self.rss_mb()
+        print(f"Memory: peak {self.peak_mb:.0f} MB of {self.limit_mb:.0f} MB, "
+              f"{self.stats['pages_recycled']} pages recycled, {self.stats['throttled_waits']} throttled waits.")
+        self.peak_mb = self.last_mb
+
+
+class ScanCheckpoint:
+    """Progress of the catalog walk of one search by one scanner, persisted in the history store's meta table."""
+
+    def __init__(self, store, scope=None, scanner="scan", max_resumes=CHECKPOINT_MAX_RESUMES):
+        self.store = store
+        self.key = f"scan_checkpoint:{scanner}" if scope is None else f"scan_checkpoint:{scanner}:{scope}"
+        previous = json.loads(store.get_meta(self.key) or "null")
+        # Pages an interrupted run (or a chain of them) had read; paging continues past them
+        self.resume_pages = 0
+        self.attempts = 0
+        if previous and not previous.get("completed"):
+            attempts = previous.get("attempts", 0) + 1
+            if attempts > max_resumes:
+                print(f"Previous {max_resumes} scans ended incomplete, starting from the first catalog page.")
+            else:
+                self.attempts = attempts
+                self.resume_pages = max(previous.get("pages_read", 0), previous.get("resume_pages", 0))
+                print(f"Previous scan was interrupted after catalog page {self.resume_pages}, resuming.")
+        self.pages_read = 0
+        self.catalog_done = False
+        self._save(completed=False)
+
+    def _save(self, completed):
+        self.store.set_meta(self.key, json.dumps({
+            "pages_read": self.pages_read,
+            "resume_pages": self.resume_pages,
+            "attempts": self.attempts,
+            "completed": completed,
+            "updated_at": time.time(),
+        }))
+
+    def page_read(self, page_number):
+        self.pages_read = page_number
+        self._save(completed=False)
+
+    def complete(self):
+        """Marks the scan finished: every candidate it paged through has been processed."""
+        self._save(completed=True)
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_resource_governor():
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ResourceGovernor()
+        return _governor
+
+
+def _governor_metrics():
+    governor = _governor
+    if governor is None:
+        return []
+    return [
+        ("vinted_memory_limit_mb", "gauge", "Memory limit the resource governor works against.",
+         [({}, round(governor.limit_mb, 1))]),
+        ("vinted_memory_peak_mb", "gauge", "Peak resident memory of the process tree since the last scan report.",
+         [({}, round(governor.peak_mb, 1))]),
+        ("vinted_governor_events_total", "counter", "Pages and contexts recycled and throttled waits.",
+         [({"event": name}, value) for name, value in sorted(governor.stats.items())]),
+    ]
+
+
+register_collector(_governor_metrics)
@@ -0,0 +1,139 @@
+"""
+Request interception policies for the Vinted scraper.
+
+During the scan phase we only need the DOM text of catalog and item pages, so
+images, media, fonts and third-party trackers are aborted before they are
+downloaded. Pages that are screenshotted use the full policy, which loads
+everything but still counts traffic so the savings can be estimated.
+"""
+from urllib.parse import urlparse
+
+# Resource types that are never needed to read text from a page
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# Third-party analytics / advertising hosts (matched as substrings of the hostname)
+BLOCKED_HOST_PATTERNS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google",
+    "facebook.net",
+    "connect.facebook",
+    "hotjar",
+    "criteo",
+    "adnxs.com",
+    "taboola",
+    "outbrain",
+    "amazon-adsystem.com",
+    "scorecardresearch.com",
+    "tiktok",
+    "pinterest",
+    "snapchat",
+    "bing.com",
+    "clarity.ms",
+    "sentry.io",
+)
+
+# Fallback average sizes (bytes) used to estimate savings before any
+# full-render page has been observed in this run
+DEFAULT_RESOURCE_SIZES = {
+    "image": 60_000,
+    "media": 400_000,
+    "font": 40_000,
+    "script": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "other": 5_000,
+}
+
+
+def is_third_party_tracker(url):
+    """True if the URL points at a known analytics/advertising host."""
+    host = urlparse(url).hostname or ""
+    return any(pattern in host for pattern in BLOCKED_HOST_PATTERNS)
+
+
+def should_block(resource_type, url):
+    """Decides whether a request is dropped under the lean (scan) policy."""
+    return resource_type in BLOCKED_RESOURCE_TYPES or is_third_party_tracker(url)
+
+
+class ResourceStats:
+    """Counts blocked and loaded requests for a single scan run."""
+
+    def __init__(self):
+        self.blocked_requests = {}
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+        # Observed (count, bytes) per resource type, used to estimate savings
+        self.observed = {}
+
+    def record_blocked(self, resource_type):
+        self.blocked_requests[resource_type] = self.blocked_requests.get(resource_type, 0) + 1
+
+    def record_loaded(self, resource_type, size):
+        self.loaded_requests += 1
+        self.loaded_bytes += size
+        count, total = self.observed.get(resource_type, (0, 0))
+        self.observed[resource_type] = (count + 1, total + size)
+
+    def average_size(self, resource_type):
+        count, total = self.observed.get(resource_type, (0, 0))
+        if count and total:
+            return total / count
+        return DEFAULT_RESOURCE_SIZES.get(resource_type, DEFAULT_RESOURCE_SIZES["other"])
+
+    def requests_saved(self):
+        return sum(self.blocked_requests.values())
+
+    def estimated_bytes_saved(self):
+        return int(sum(self.average_size(rtype) * count for rtype, count in self.blocked_requests.items()))
+
+    def summary(self):
+        return {
+            "requests_blocked": self.requests_saved(),
+            "blocked_by_type": dict(self.blocked_requests),
+            "requests_loaded": self.loaded_requests,
+            "bytes_loaded": self.loaded_bytes,
+            "estimated_bytes_saved": self.estimated_bytes_saved(),
+        }
+
+    def report(self):
+        summary = self.summary()
+        print(
+            f"Resource policy: blocked {summary['requests_blocked']} requests "
+            f"(~{summary['estimated_bytes_saved'] / 1e6:.1f} MB saved), "
+            f"loaded {summary['requests_loaded']} requests ({summary['bytes_loaded'] / 1e6:.1f} MB)."
+        )
+
+
+def _track_responses(page, stats):
+    def on_response(response):
+        try:
+            size = int(response.headers.get("content-length") or 0)
+        except ValueError:
+            size = 0
+        stats.record_loaded(response.request.resource_type, size)
+
+    page.on("response", on_response)
+
+
+async def apply_lean_policy(page, stats):
+    """Blocks heavy and third-party resources on a page used for data extraction."""
+
+    async def handle_route(route):
+        request = route.request
+        if should_block(request.resource_type, request.url):
+            stats.record_blocked(request.resource_type)
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await page.route("**/*", handle_route)
+    _track_responses(page, stats)
+
+
+async def apply_full_policy(page, stats):
+    """Loads everything (needed for screenshots) but still counts the traffic."""
+    _track_responses(page, stats)
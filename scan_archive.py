@@ -0,0 +1,169 @@
+"""
+Long-term archive of scanned items.
+
+The seller history in SQLite only covers the rolling 24h window (expire() removes
+everything older). ScanArchive keeps every committed item (item ID, seller, upload
+time, size, colour, product ID, match flag) in Parquet files under
+VINTED_ARCHIVE_DIR, partitioned by upload day:
+
+    scan_archive/day=2026-10-16/part-<timestamp>-<pid>.parquet
+
+Rows are buffered during a scan and written every VINTED_ARCHIVE_FLUSH_ROWS rows and
+at the end of the scan (also when it fails), one file per flush and day. Older days
+with many small files are compacted into one file; days older than
+VINTED_ARCHIVE_RETENTION_DAYS are deleted. Reads prune partitions by day, so loading
+the last 30 days never touches older files.
+
+pyarrow is imported on first use, so importing this module stays cheap.
+"""
+import glob
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+ARCHIVE_ENABLED = os.getenv("VINTED_ARCHIVE", "1") != "0"
+ARCHIVE_DIR = os.getenv("VINTED_ARCHIVE_DIR", "scan_archive")
+ARCHIVE_RETENTION_DAYS = int(os.getenv("VINTED_ARCHIVE_RETENTION_DAYS", "90"))
+# Buffered rows are written once this many are pending, so a killed scan loses at most these
+ARCHIVE_FLUSH_ROWS = int(os.getenv("VINTED_ARCHIVE_FLUSH_ROWS", "200"))
+# A finished day with more part files than this is merged into one file
+ARCHIVE_COMPACT_FILES = 24
+
+COLUMNS = ("item_id", "seller", "uploaded_at", "scanned_at", "size", "color", "product_id", "matched")
+
+
+def day_of(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("item_id", pa.string()),
+        ("seller", pa.string()),
+        ("uploaded_at", pa.float64()),
+        ("scanned_at", pa.float64()),
+        ("size", pa.string()),
+        ("color", pa.string()),
+        ("product_id", pa.string()),
+        ("matched", pa.bool_()),
+    ])
+
+
+class ScanArchive:
+    """Append-only, day-partitioned Parquet store of scanned items. Thread-safe."""
+
+    def __init__(self, root=ARCHIVE_DIR, retention_days=ARCHIVE_RETENTION_DAYS, flush_rows=ARCHIVE_FLUSH_ROWS):
+        self.root = root
+        self.retention_days = retention_days
+        self.flush_rows = flush_rows
+        self.buffer = []
+        self.flushes = 0
+        self._lock = threading.Lock()
+        # Serialises flush() so concurrent flushes never compact the same day at once
+        self._flush_lock = threading.Lock()
+
+    def append(self, item_id, seller, uploaded_at, scanned_at, size=None, color=None, product_id=None, matched=False):
+        with self._lock:
+            self.buffer.append((str(item_id), seller, uploaded_at, scanned_at, size, color,
+                                None if product_id is None else str(product_id), bool(matched)))
+
+    def flush_due(self):
+        """True when flush_rows or more rows are buffered."""
+        with self._lock:
+            return len(self.buffer) >= self.flush_rows
+
+    def _day_dir(self, day):
+        return os.path.join(self.root, f"day={day}")
+
+    def flush(self):
+        """Writes the buffered rows, one file per upload day. Blocking. Returns the number of rows."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with self._flush_lock:
+            with self._lock:
+                rows, self.buffer = self.buffer, []
+            if not rows:
+                return 0
+            by_day = {}
+            for row in rows:
+                by_day.setdefault(day_of(row[2] or row[3]), []).append(row)
+            self.flushes += 1
+            stamp = f"{int(time.time() * 1000)}-{os.getpid()}-{self.flushes}"
+            for day, day_rows in by_day.items():
+                table = pa.Table.from_pydict(
+                    {name: [row[i] for row in day_rows] for i, name in enumerate(COLUMNS)}, schema=_schema()
+                )
+                os.makedirs(self._day_dir(day), exist_ok=True)
+                path = os.path.join(self._day_dir(day), f"part-{stamp}.parquet")
+                pq.write_table(table, f"{path}.tmp")
+                os.replace(f"{path}.tmp", path)
+            self.maintain()
+            return len(rows)
+
+    def days(self):
+        """Partition days present in the archive, oldest first."""
+        return sorted(
+            os.path.basename(path)[len("day="):] for path in glob.glob(os.path.join(self.root, "day=*"))
+        )
+
+    def maintain(self):
+        """Deletes days past the retention period and compacts finished days with many files."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        cutoff = day_of(time.time() - self.retention_days * 86400)
+        today = day_of(time.time())
+        for day in self.days():
+            if day < cutoff:
+                shutil.rmtree(self._day_dir(day), ignore_errors=True)
+                continue
+            files = sorted(glob.glob(os.path.join(self._day_dir(day), "part-*.parquet")))
+            if day >= today or len(files) <= ARCHIVE_COMPACT_FILES:
+                continue
+            table = pa.concat_tables([pq.read_table(path, schema=_schema()) for path in files])
+            merged = os.path.join(self._day_dir(day), f"part-{int(time.time() * 1000)}-compacted.parquet")
+            pq.write_table(table, f"{merged}.tmp")
+            os.replace(f"{merged}.tmp", merged)
+            for path in files:
+                os.remove(path)
+
+    def read(self, since=None, columns=COLUMNS):
+        """
+        Returns a pyarrow Table of the archived rows uploaded on or after the day of the
+        since timestamp (all rows if None). Only the matching day partitions are read.
+        An item listed on a seller profile before its own scan has two rows; the later one
+        carries the details and the match flag.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        first_day = day_of(since) if since else ""
+        files = [
+            path
+            for day in self.days() if day >= first_day
+            for path in sorted(glob.glob(os.path.join(self._day_dir(day), "part-*.parquet")))
+        ]
+        schema = _schema()
+        if not files:
+            return schema.empty_table().select(list(columns))
+        return pa.concat_tables([pq.read_table(path, columns=list(columns), schema=schema) for path in files])
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_scan_archive():
+    """Returns the process-wide ScanArchive, or None when VINTED_ARCHIVE=0."""
+    global _archive
+    if not ARCHIVE_ENABLED:
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = ScanArchive()
+        return _archive
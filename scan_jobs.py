@@ -0,0 +1,201 @@
+"""
+Background scan jobs.
+
+A scan runs as a job with its own ID instead of blocking the caller. Progress and
+matches are recorded on the job as they happen, so the agent can poll for status,
+fetch partial results, and the FastAPI app can stream events over SSE. A job that
+outlives the caller's patience keeps running and nothing it found is lost.
+
+Scans are single-flight: callers asking for the same scan while one is running join
+it, and a finished scan is served to new callers until it is SCAN_RESULT_TTL old.
+"""
+import os
+import asyncio
+import threading
+import time
+import uuid
+
+from browser_pool import get_browser_service
+from scan_metrics import register_collector
+from screenshot_store import register_reference_source
+from vinted_scraper import capture_newest_vinted_item_screenshot
+
+# Finished jobs are kept this long so results can still be fetched
+JOB_RETENTION_SECONDS = 6 * 3600
+
+# Completed scans younger than this are reused instead of starting a new one
+SCAN_RESULT_TTL = int(os.getenv("VINTED_SCAN_CACHE_TTL", "300"))
+
+
+class ScanJob:
+    """State of one background scan. Mutated on the scan's loop, read from any thread."""
+
+    def __init__(self, key="default"):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.items_scanned = 0
+        self.items_cached = 0
+        self.matches = []
+        self.events = []
+        self.error = None
+        self.done = threading.Event()
+
+    def on_event(self, kind, data):
+        """Scan event callback passed to capture_newest_vinted_item_screenshot."""
+        if kind == "item":
+            self.items_scanned += 1
+            if data.get("cached"):
+                self.items_cached += 1
+        elif kind == "match":
+            self.matches.append(dict(data))
+        self.events.append({"type": kind, "time": time.time(), "data": dict(data)})
+
+    def _finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self.events.append({"type": status, "time": self.finished_at, "data": {"error": error}})
+        self.done.set()
+
+    def is_finished(self):
+        return self.done.is_set()
+
+    def wait(self, timeout=None):
+        """Blocks until the job finishes or timeout passes. Returns True if finished."""
+        return self.done.wait(timeout)
+
+    def to_dict(self, include_matches=False):
+        elapsed = (self.finished_at or time.time()) - (self.started_at or self.created_at)
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "items_scanned": self.items_scanned,
+            "items_cached": self.items_cached,
+            "match_count": len(self.matches),
+            "elapsed_seconds": round(elapsed, 1),
+            "error": self.error,
+        }
+        if include_matches:
+            data["matches"] = list(self.matches)
+        return data
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+# Latest job per scan key, used for single-flight joins and the TTL result cache
+_latest_by_key = {}
+_cache_stats = {"hits": 0, "misses": 0, "joins": 0}
+
+
+async def _run_job(job, **scan_kwargs):
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        matches = await capture_newest_vinted_item_screenshot(on_event=job.on_event, **scan_kwargs)
+        # The final list carries the shared-photo signals completed after the scan
+        job.matches = [dict(match) for match in matches]
+        job._finish("done")
+    except Exception as e:
+        job._finish("failed", f"{type(e).__name__}: {e}")
+
+
+def _run_in_thread(job):
+    """Runs a job on its own event loop when no browser service is available."""
+    thread = threading.Thread(target=lambda: asyncio.run(_run_job(job)), name=f"scan-{job.id}", daemon=True)
+    thread.start()
+
+
+def _prune_jobs():
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    for job_id in [job_id for job_id, job in _jobs.items() if job.is_finished() and job.finished_at < cutoff]:
+        job = _jobs.pop(job_id)
+        if _latest_by_key.get(job.key) is job:
+            del _latest_by_key[job.key]
+
+
+def scan_key(**scan_kwargs):
+    """Identifies scans that would produce the same result."""
+    return repr(sorted(scan_kwargs.items())) if scan_kwargs else "default"
+
+
+def start_scan_job(force=False, ttl=None):
+    """
+    Returns a ScanJob immediately. If an identical scan is running it is joined; if one
+    finished successfully less than ttl seconds ago it is reused. Otherwise (or with
+    force=True) a new scan starts in the background.
+    """
+    ttl = SCAN_RESULT_TTL if ttl is None else ttl
+    key = scan_key()
+    with _jobs_lock:
+        _prune_jobs()
+        latest = _latest_by_key.get(key)
+        if latest and not latest.is_finished():
+            # Single flight: never run two identical scans at once, even with force
+            _cache_stats["joins"] += 1
+            print(f"Joining scan job {latest.id} already in flight")
+            return latest
+        if latest and not force and latest.status == "done" and time.time() - latest.finished_at < ttl:
+            _cache_stats["hits"] += 1
+            print(f"Serving cached scan job {latest.id} ({time.time() - latest.finished_at:.0f}s old)")
+            return latest
+        _cache_stats["misses"] += 1
+        job = ScanJob(key)
+        _jobs[job.id] = job
+        _latest_by_key[key] = job
+
+    browser_service = get_browser_service()
+    if browser_service:
+        browser_service.submit(_run_job(job, browser_service=browser_service))
+    else:
+        _run_in_thread(job)
+    print(f"Started scan job {job.id}")
+    return job
+
+
+def get_scan_cache_stats():
+    """Hit/miss/join counters of the single-flight result cache."""
+    with _jobs_lock:
+        stats = dict(_cache_stats)
+    lookups = stats["hits"] + stats["misses"] + stats["joins"]
+    stats["ttl_seconds"] = SCAN_RESULT_TTL
+    stats["hit_ratio"] = round((stats["hits"] + stats["joins"]) / lookups, 3) if lookups else 0.0
+    return stats
+
+
+def get_scan_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def list_scan_jobs():
+    with _jobs_lock:
+        return list(_jobs.values())
+
+
+def _scan_job_metrics():
+    stats = get_scan_cache_stats()
+    with _jobs_lock:
+        running = sum(1 for job in _jobs.values() if not job.is_finished())
+    return [
+        ("vinted_scan_cache_lookups_total", "counter", "Single-flight scan cache lookups by outcome.",
+         [({"outcome": outcome}, stats[outcome]) for outcome in ("hits", "misses", "joins")]),
+        ("vinted_scan_jobs_running", "gauge", "Scan jobs currently running.", [({}, running)]),
+    ]
+
+
+register_collector(_scan_job_metrics)
+
+
+def _job_screenshots():
+    """Screenshots of retained jobs, which callers may still fetch."""
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return [match.get("screenshot_path") for job in jobs for match in list(job.matches)]
+
+
+register_reference_source(_job_screenshots)
@@ -0,0 +1,196 @@
+"""
+Phase timing and counters for scraper runs.
+
+Code inside a scan wraps each phase in `with span("item_goto"):` and bumps
+counters with `count("timeouts")`. Both are recorded on the current run's
+RunProfile (carried in a contextvar, so concurrent worker tasks of the same scan
+share it) and in process-wide totals. Each finished run is written as a JSON
+profile, and render_prometheus() exports the totals for the FastAPI /metrics
+endpoint. Other modules can add gauges with register_collector().
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+PROFILE_DIR = os.getenv("VINTED_PROFILE_DIR", "scan_profiles")
+
+# Histogram buckets (seconds) for phase durations
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 300)
+
+_current_profile = ContextVar("vinted_scan_profile", default=None)
+_lock = threading.Lock()
+_span_totals = {}
+_counter_totals = {}
+_run_totals = {"runs": 0, "last_run_seconds": 0.0, "last_run_finished": 0.0}
+_collectors = []
+_last_profile = None
+
+
+class RunProfile:
+    """Spans and counters of a single scan run."""
+
+    def __init__(self):
+        self.run_id = f"{int(time.time())}_{uuid.uuid4().hex[:6]}"
+        self.started_at = time.time()
+        self.finished_at = None
+        self.spans = []
+        self.counters = {}
+
+    def add_span(self, name, started_at, duration, attrs):
+        self.spans.append({
+            "name": name,
+            "offset_ms": round((started_at - self.started_at) * 1000, 1),
+            "duration_ms": round(duration * 1000, 1),
+            **attrs,
+        })
+
+    def phase_summary(self):
+        """Per-phase count, total and max duration in milliseconds."""
+        summary = {}
+        for entry in self.spans:
+            phase = summary.setdefault(entry["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            phase["count"] += 1
+            phase["total_ms"] = round(phase["total_ms"] + entry["duration_ms"], 1)
+            phase["max_ms"] = max(phase["max_ms"], entry["duration_ms"])
+        return summary
+
+    def to_dict(self):
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": round((self.finished_at or time.time()) - self.started_at, 3),
+            "counters": dict(self.counters),
+            "phases": self.phase_summary(),
+            "spans": list(self.spans),
+        }
+
+
+def start_run():
+    """Starts a profile for the current scan and makes it current for this task and its children."""
+    profile = RunProfile()
+    _current_profile.set(profile)
+    return profile
+
+
+def finish_run(profile, output_dir=None):
+    """Marks the run finished, updates the totals and writes the JSON profile. Returns its path."""
+    global _last_profile
+    profile.finished_at = time.time()
+    with _lock:
+        _run_totals["runs"] += 1
+        _run_totals["last_run_seconds"] = profile.finished_at - profile.started_at
+        _run_totals["last_run_finished"] = profile.finished_at
+        _last_profile = profile
+
+    output_dir = output_dir or PROFILE_DIR
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"run_{profile.run_id}.json")
+        with open(path, "w") as f:
+            json.dump(profile.to_dict(), f, indent=2)
+        print(f"Run profile written to {path}")
+        return path
+    except Exception as e:
+        print(f"Error writing run profile: {e}")
+        return None
+
+
+def last_run_profile():
+    return _last_profile
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+@contextmanager
+def span(name, **attrs):
+    """Times the enclosed block as phase `name`."""
+    started_at = time.time()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        profile = _current_profile.get()
+        if profile:
+            profile.add_span(name, started_at, duration, attrs)
+        with _lock:
+            totals = _span_totals.setdefault(name, {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)})
+            totals["count"] += 1
+            totals["sum"] += duration
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    totals["buckets"][i] += 1
+
+
+def count(name, amount=1):
+    """Adds amount to counter `name` for the current run and the process totals."""
+    profile = _current_profile.get()
+    if profile:
+        profile.counters[name] = profile.counters.get(name, 0) + amount
+    with _lock:
+        _counter_totals[name] = _counter_totals.get(name, 0) + amount
+
+
+def register_collector(collector):
+    """
+    Registers a callable returning extra samples for /metrics as a list of
+    (metric_name, metric_type, help_text, [(labels_dict, value), ...]).
+    """
+    _collectors.append(collector)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = {key: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for key, value in labels.items()}
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+
+def render_prometheus():
+    """Renders all totals in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        span_totals = {name: dict(totals, buckets=list(totals["buckets"])) for name, totals in _span_totals.items()}
+        counter_totals = dict(_counter_totals)
+        run_totals = dict(_run_totals)
+
+    lines.append("# HELP vinted_scan_phase_seconds Duration of scraper phases.")
+    lines.append("# TYPE vinted_scan_phase_seconds histogram")
+    for name, totals in sorted(span_totals.items()):
+        for bound, value in zip(BUCKETS, totals["buckets"]):
+            lines.append(f'vinted_scan_phase_seconds_bucket{{phase="{name}",le="{bound}"}} {value}')
+        lines.append(f'vinted_scan_phase_seconds_bucket{{phase="{name}",le="+Inf"}} {totals["count"]}')
+        lines.append(f'vinted_scan_phase_seconds_sum{{phase="{name}"}} {totals["sum"]:.6f}')
+        lines.append(f'vinted_scan_phase_seconds_count{{phase="{name}"}} {totals["count"]}')
+
+    lines.append("# HELP vinted_scan_events_total Scraper event counters (items scanned, skipped, matched, ...).")
+    lines.append("# TYPE vinted_scan_events_total counter")
+    for name, value in sorted(counter_totals.items()):
+        lines.append(f'vinted_scan_events_total{{event="{name}"}} {value}')
+
+    lines.append("# HELP vinted_scan_runs_total Completed scan runs.")
+    lines.append("# TYPE vinted_scan_runs_total counter")
+    lines.append(f"vinted_scan_runs_total {run_totals['runs']}")
+    lines.append("# HELP vinted_scan_last_run_seconds Duration of the most recent scan run.")
+    lines.append("# TYPE vinted_scan_last_run_seconds gauge")
+    lines.append(f"vinted_scan_last_run_seconds {run_totals['last_run_seconds']:.3f}")
+
+    for collector in list(_collectors):
+        try:
+            for name, metric_type, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        except Exception as e:
+            print(f"Error in metrics collector: {e}")
+
+    return "\n".join(lines) + "\n"
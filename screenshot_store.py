@@ -0,0 +1,244 @@
+"""
+Storage for item screenshots.
+
+- Captures are keyed by item ID. If a screenshot of the item is younger than
+  VINTED_SCREENSHOT_FRESH_HOURS, it is reused instead of opening the item page again.
+  This matters for items whose seller stays over the threshold for several runs.
+- The PNG from Playwright is downscaled to SCREENSHOT_MAX_WIDTH and re-encoded to WebP
+  (or JPEG) with Pillow in a worker thread, lowering the quality until it fits
+  SCREENSHOT_MAX_BYTES.
+- evict() removes screenshots older than VINTED_SCREENSHOT_TTL_DAYS, then the oldest
+  ones until the store fits VINTED_SCREENSHOT_STORE_MB. It only touches files the store
+  wrote itself (KEY_PREFIX), never other files in the directory, and keeps every
+  screenshot a live match still points to (see register_reference_source).
+- Storage is pluggable. LocalBackend writes to a directory (the default output_dir).
+  GcsBackend writes to the Cloud Storage bucket in VINTED_SCREENSHOT_BUCKET.
+"""
+import asyncio
+import io
+import os
+import threading
+import time
+
+SCREENSHOT_FORMAT = os.getenv("VINTED_SCREENSHOT_FORMAT", "webp").lower()
+SCREENSHOT_QUALITY = int(os.getenv("VINTED_SCREENSHOT_QUALITY", "80"))
+SCREENSHOT_MAX_WIDTH = int(os.getenv("VINTED_SCREENSHOT_MAX_WIDTH", "1280"))
+SCREENSHOT_MAX_BYTES = int(os.getenv("VINTED_SCREENSHOT_MAX_KB", "400")) * 1024
+SCREENSHOT_FRESH_SECONDS = float(os.getenv("VINTED_SCREENSHOT_FRESH_HOURS", "6")) * 3600
+SCREENSHOT_TTL_SECONDS = float(os.getenv("VINTED_SCREENSHOT_TTL_DAYS", "7")) * 86400
+SCREENSHOT_STORE_BYTES = int(os.getenv("VINTED_SCREENSHOT_STORE_MB", "200")) * 1024 * 1024
+SCREENSHOT_BUCKET = os.getenv("VINTED_SCREENSHOT_BUCKET", "")
+
+# Only keys with this prefix are written and evicted by the store; the vinted_item_<time>.png
+# captures from before the store are left alone
+KEY_PREFIX = "vinted_shot_"
+CONTENT_TYPES = {"webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+MIN_QUALITY = 40
+
+
+class LocalBackend:
+    """Screenshots as files in one directory."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def location(self, key):
+        return os.path.join(self.root, key)
+
+    def put(self, key, data, content_type):
+        path = self.location(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def stat(self, key):
+        """Returns (modified timestamp, size) or None."""
+        try:
+            st = os.stat(self.location(key))
+        except FileNotFoundError:
+            return None
+        return st.st_mtime, st.st_size
+
+    def list(self, prefix):
+        """Returns [(key, modified timestamp, size)] of stored screenshots."""
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.startswith(prefix) and not entry.name.endswith(".tmp"):
+                st = entry.stat()
+                entries.append((entry.name, st.st_mtime, st.st_size))
+        return entries
+
+    def delete(self, key):
+        try:
+            os.remove(self.location(key))
+        except FileNotFoundError:
+            pass
+
+
+class GcsBackend:
+    """Screenshots as objects in a Cloud Storage bucket, under an optional prefix."""
+
+    def __init__(self, bucket_name, prefix=""):
+        from google.cloud import storage
+
+        self.bucket = storage.Client().bucket(bucket_name)
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def location(self, key):
+        return f"gs://{self.bucket.name}/{self.prefix}{key}"
+
+    def put(self, key, data, content_type):
+        self.bucket.blob(self.prefix + key).upload_from_string(data, content_type=content_type)
+        return self.location(key)
+
+    def stat(self, key):
+        blob = self.bucket.get_blob(self.prefix + key)
+        if blob is None:
+            return None
+        return blob.updated.timestamp(), blob.size
+
+    def list(self, prefix):
+        return [
+            (blob.name[len(self.prefix):], blob.updated.timestamp(), blob.size)
+            for blob in self.bucket.list_blobs(prefix=self.prefix + prefix)
+        ]
+
+    def delete(self, key):
+        blob = self.bucket.blob(self.prefix + key)
+        if blob.exists():
+            blob.delete()
+
+
+def encode_screenshot(png_bytes, image_format=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY,
+                      max_width=SCREENSHOT_MAX_WIDTH, max_bytes=SCREENSHOT_MAX_BYTES):
+    """Downscales and re-encodes a PNG screenshot. Blocking; run it off the event loop."""
+    from PIL import Image
+
+    if image_format == "png":
+        return png_bytes
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        image = image.convert("RGB")
+        if image.width > max_width:
+            image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+        pil_format = "WEBP" if image_format == "webp" else "JPEG"
+        while True:
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, quality=quality, optimize=True)
+            if buffer.tell() <= max_bytes or quality <= MIN_QUALITY:
+                return buffer.getvalue()
+            quality -= 10
+
+
+class ScreenshotStore:
+    """Keyed screenshot storage with reuse of fresh captures and bounded size."""
+
+    def __init__(self, backend, image_format=SCREENSHOT_FORMAT, fresh_seconds=SCREENSHOT_FRESH_SECONDS,
+                 ttl_seconds=SCREENSHOT_TTL_SECONDS, max_store_bytes=SCREENSHOT_STORE_BYTES):
+        self.backend = backend
+        self.image_format = "jpg" if image_format in ("jpg", "jpeg") else image_format
+        self.fresh_seconds = fresh_seconds
+        self.ttl_seconds = ttl_seconds
+        self.max_store_bytes = max_store_bytes
+        self.stats = {"reused": 0, "saved": 0, "bytes_in": 0, "bytes_out": 0, "evicted": 0}
+
+    def key_for(self, item_id):
+        return f"{KEY_PREFIX}{item_id}.{self.image_format}"
+
+    def fresh(self, item_id):
+        """Returns the location of a screenshot of item_id taken within the fresh window, or None."""
+        key = self.key_for(item_id)
+        info = self.backend.stat(key)
+        if info is None or time.time() - info[0] > self.fresh_seconds:
+            return None
+        self.stats["reused"] += 1
+        return self.backend.location(key)
+
+    async def fresh_async(self, item_id):
+        return await asyncio.to_thread(self.fresh, item_id)
+
+    async def save(self, item_id, png_bytes):
+        """Encodes and stores a PNG screenshot off the event loop. Returns its location."""
+        key = self.key_for(item_id)
+
+        def encode_and_put():
+            data = encode_screenshot(png_bytes, self.image_format)
+            return self.backend.put(key, data, CONTENT_TYPES[self.image_format]), len(data)
+
+        location, size = await asyncio.to_thread(encode_and_put)
+        self.stats["saved"] += 1
+        self.stats["bytes_in"] += len(png_bytes)
+        self.stats["bytes_out"] += size
+        return location
+
+    def evict(self, keep=()):
+        """
+        Removes expired screenshots, then the oldest until the store fits its size cap.
+        Screenshots at the locations in keep, or referenced by a registered source, stay.
+        """
+        now = time.time()
+        referenced = {os.path.basename(location) for location in referenced_locations(keep)}
+        entries = sorted(self.backend.list(KEY_PREFIX), key=lambda entry: entry[1])
+        evicted = 0
+        kept = []
+        for key, modified, size in entries:
+            if key in referenced:
+                continue
+            if now - modified > self.ttl_seconds:
+                self.backend.delete(key)
+                evicted += 1
+            else:
+                kept.append((key, size))
+        total = sum(size for _, size in kept)
+        for key, size in kept:
+            if total <= self.max_store_bytes:
+                break
+            self.backend.delete(key)
+            evicted += 1
+            total -= size
+        self.stats["evicted"] += evicted
+        return evicted
+
+    def report(self):
+        """Prints and resets the counters of the last run."""
+        if self.stats["saved"] or self.stats["reused"] or self.stats["evicted"]:
+            ratio = self.stats["bytes_out"] / self.stats["bytes_in"] if self.stats["bytes_in"] else 0
+            print(f"Screenshots: {self.stats['saved']} saved ({ratio:.0%} of PNG size), "
+                  f"{self.stats['reused']} reused, {self.stats['evicted']} evicted.")
+        self.stats = dict.fromkeys(self.stats, 0)
+
+
+_reference_sources = []
+
+
+def register_reference_source(source):
+    """Registers a callable returning screenshot locations held by live matches; evict() keeps them."""
+    _reference_sources.append(source)
+
+
+def referenced_locations(extra=()):
+    locations = set(location for location in extra if location)
+    for source in _reference_sources:
+        try:
+            locations.update(location for location in source() if location)
+        except Exception as e:
+            print(f"Error collecting referenced screenshots: {e}")
+    return locations
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_screenshot_store(output_dir="vinted_screenshots"):
+    """Returns the store for output_dir; Cloud Storage instead when VINTED_SCREENSHOT_BUCKET is set."""
+    with _stores_lock:
+        if output_dir not in _stores:
+            if SCREENSHOT_BUCKET:
+                backend = GcsBackend(SCREENSHOT_BUCKET, os.path.basename(os.path.normpath(output_dir)))
+            else:
+                backend = LocalBackend(output_dir)
+            _stores[output_dir] = ScreenshotStore(backend)
+        return _stores[output_dir]
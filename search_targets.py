@@ -0,0 +1,111 @@
+"""
+Configured Vinted searches.
+
+Each SearchTarget is one catalog search (brand, status, country domain) with its
+own keyword filter for the grid and its own seller match threshold. Targets come
+from VINTED_SEARCH_TARGETS, either inline JSON or the path to a JSON file:
+
+    [
+      {"name": "costes-nl", "domain": "www.vinted.nl", "brand_ids": [40883], "status_ids": [6]},
+      {"name": "costes-be", "domain": "www.vinted.be", "brand_ids": [40883], "status_ids": [6],
+       "keyword": "costes", "match_threshold": 4},
+      {"name": "custom", "url": "https://www.vinted.de/catalog?brand_ids[]=40883&order=newest_first"}
+    ]
+
+Without it, the single VINTED_SEARCH_URL search is used.
+"""
+import json
+import os
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app_config import get_config
+
+DEFAULT_KEYWORD = "costes"
+DEFAULT_MATCH_THRESHOLD = 3
+DEFAULT_MAX_PAGES = int(os.getenv("VINTED_CATALOG_MAX_PAGES", "10"))
+
+# Query parameters that pin a search to a moment in time and go stale
+STALE_PARAMS = ("time", "search_by_image_uuid")
+
+
+def build_search_url(domain="www.vinted.nl", brand_ids=(), status_ids=(), search_text=None):
+    """Builds a newest-first catalog URL from filter values."""
+    query = [("status_ids[]", str(status_id)) for status_id in status_ids]
+    query += [("brand_ids[]", str(brand_id)) for brand_id in brand_ids]
+    if search_text:
+        query.append(("search_text", search_text))
+    query += [("page", "1"), ("order", "newest_first")]
+    return urlunsplit(("https", domain, "/catalog", urlencode(query), ""))
+
+
+def clean_search_url(url):
+    """Drops stale parameters (time=, empty search_by_image_uuid=) and forces newest-first order."""
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if key not in STALE_PARAMS and key != "order"]
+    query.append(("order", "newest_first"))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+@dataclass
+class SearchTarget:
+    """One catalog search and the rules applied to its results."""
+    name: str
+    url: str
+    keyword: str = DEFAULT_KEYWORD
+    match_threshold: int = DEFAULT_MATCH_THRESHOLD
+    max_pages: int = DEFAULT_MAX_PAGES
+
+    @property
+    def domain(self):
+        return urlsplit(self.url).hostname
+
+    def _query_values(self, key):
+        return tuple(value for name, value in parse_qsl(urlsplit(self.url).query) if name == key)
+
+    @property
+    def status_ids(self):
+        """The status_ids[] filter of the search URL, as strings (empty = any status)."""
+        return self._query_values("status_ids[]")
+
+    @property
+    def brand_ids(self):
+        """The brand_ids[] filter of the search URL, as strings (empty = any brand)."""
+        return self._query_values("brand_ids[]")
+
+    @classmethod
+    def from_dict(cls, data, index=0):
+        url = data.get("url") or build_search_url(
+            data.get("domain", "www.vinted.nl"), data.get("brand_ids", ()),
+            data.get("status_ids", ()), data.get("search_text"),
+        )
+        return cls(
+            name=data.get("name") or f"search{index + 1}",
+            url=clean_search_url(url),
+            keyword=(data.get("keyword") or DEFAULT_KEYWORD).lower(),
+            match_threshold=int(data.get("match_threshold", DEFAULT_MATCH_THRESHOLD)),
+            max_pages=int(data.get("max_pages", DEFAULT_MAX_PAGES)),
+        )
+
+
+def load_search_targets(config=None):
+    """Returns the configured SearchTargets (at least one)."""
+    config = config or get_config()
+    raw = config.get("VINTED_SEARCH_TARGETS")
+    if raw:
+        try:
+            if os.path.exists(raw):
+                with open(raw) as f:
+                    entries = json.load(f)
+            else:
+                entries = json.loads(raw)
+            targets = [SearchTarget.from_dict(entry, i) for i, entry in enumerate(entries)]
+            names = [target.name for target in targets]
+            if len(set(names)) != len(names):
+                raise ValueError(f"duplicate search target names: {names}")
+            if targets:
+                return targets
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error loading VINTED_SEARCH_TARGETS, using VINTED_SEARCH_URL: {e}")
+    return [SearchTarget(name="default", url=clean_search_url(config["VINTED_SEARCH_URL"]))]
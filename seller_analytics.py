@@ -0,0 +1,252 @@
+"""
+Multi-window seller analytics and the match rule.
+
+A seller used to match when the SQLite history held at least match_threshold of
+their items from the last 24h. That misses sellers who post two items a day for
+weeks. SellerAnalytics keeps every item of the last ANALYTICS_DAYS days in NumPy
+arrays (seller code, listing time, item ID). It is loaded from the Parquet scan
+archive plus the SQLite seller history, and items committed during a scan are
+appended in memory.
+
+window_table() counts the items of every seller in the 1h/24h/7d/30d windows in one
+pass. Each item falls into one age bucket (searchsorted), a single bincount over
+seller * buckets + bucket counts all buckets, and a cumulative sum turns buckets into
+windows. A million rows take a few tens of milliseconds. The velocity score is the
+24h count divided by the seller's average items per day over 30 days (at least 1),
+so a seller posting far above their usual rate stands out.
+
+All counts use the listing time (upload time, or the scan time when the upload time is
+unknown); the SQLite seller history stores the same time in added_at.
+
+DetectionRule decides on a seller from these counts. Its 24h minimum is the search's
+match_threshold; the other windows are opt-in through VINTED_RULE_MIN_* (0, the
+default, disables a window).
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from scan_archive import get_scan_archive
+from search_targets import DEFAULT_MATCH_THRESHOLD
+
+# Window name and length in seconds, shortest first
+WINDOWS = (("1h", 3600), ("24h", 24 * 3600), ("7d", 7 * 24 * 3600), ("30d", 30 * 24 * 3600))
+ANALYTICS_DAYS = 30
+
+RULE_MIN_1H = int(os.getenv("VINTED_RULE_MIN_1H", "0"))
+RULE_MIN_7D = int(os.getenv("VINTED_RULE_MIN_7D", "0"))
+RULE_MIN_30D = int(os.getenv("VINTED_RULE_MIN_30D", "0"))
+RULE_MIN_VELOCITY = float(os.getenv("VINTED_RULE_MIN_VELOCITY", "0"))
+
+
+def _numeric_id(item_id):
+    return int(item_id) if str(item_id).isdigit() else -1
+
+
+def velocity(count_24h, count_30d):
+    """24h count relative to the seller's average items per day over 30 days."""
+    return count_24h / max(count_30d / 30, 1)
+
+
+@dataclass
+class DetectionRule:
+    """Minimum counts per window; a seller matches when any enabled minimum is reached."""
+    min_24h: int = DEFAULT_MATCH_THRESHOLD
+    min_1h: int = RULE_MIN_1H
+    min_7d: int = RULE_MIN_7D
+    min_30d: int = RULE_MIN_30D
+    min_velocity: float = RULE_MIN_VELOCITY
+
+    def reasons(self, windows, velocity_score=0.0):
+        """Returns the reasons the seller matches (empty if it does not), e.g. ['24h>=3']."""
+        reasons = []
+        for name, minimum in (("1h", self.min_1h), ("24h", self.min_24h), ("7d", self.min_7d), ("30d", self.min_30d)):
+            if minimum and windows[name] >= minimum:
+                reasons.append(f"{name}>={minimum}")
+        if self.min_velocity and windows["24h"] and velocity_score >= self.min_velocity:
+            reasons.append(f"velocity>={self.min_velocity:g}")
+        return reasons
+
+
+class SellerAnalytics:
+    """Recent items of all sellers in NumPy arrays, with vectorised per-window counts. Thread-safe."""
+
+    def __init__(self, archive=None):
+        self.archive = archive
+        self.sellers = []
+        self.seller_codes = {}
+        self.codes = np.zeros(1024, dtype=np.int32)
+        self.times = np.zeros(1024, dtype=np.float64)
+        self.ids = np.zeros(1024, dtype=np.int64)
+        self.size = 0
+        self.sorted_ids = np.zeros(0, dtype=np.int64)
+        self.new_ids = set()
+        # Per-window counts as of table_at; items added since are in `recent`
+        self.table = np.zeros((0, len(WINDOWS)), dtype=np.int64)
+        self.table_at = 0.0
+        self.recent = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    # Loading
+
+    def _code(self, seller):
+        code = self.seller_codes.get(seller)
+        if code is None:
+            code = self.seller_codes[seller] = len(self.sellers)
+            self.sellers.append(seller)
+        return code
+
+    def _grow(self, needed):
+        if needed <= len(self.codes):
+            return
+        capacity = len(self.codes)
+        while capacity < needed:
+            capacity *= 2
+        for name in ("codes", "times", "ids"):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def _known(self, numeric_id):
+        if numeric_id < 0:
+            return False
+        if numeric_id in self.new_ids:
+            return True
+        index = np.searchsorted(self.sorted_ids, numeric_id)
+        return index < len(self.sorted_ids) and self.sorted_ids[index] == numeric_id
+
+    def _add_rows(self, item_ids, sellers, times):
+        """Appends rows whose item ID is not loaded yet (vectorised dedupe)."""
+        numeric = np.fromiter((_numeric_id(item_id) for item_id in item_ids), dtype=np.int64, count=len(item_ids))
+        # Last occurrence of every ID in the batch, minus IDs already loaded
+        _, last = np.unique(numeric[::-1], return_index=True)
+        keep = np.zeros(len(numeric), dtype=bool)
+        keep[len(numeric) - 1 - last] = True
+        keep |= numeric < 0
+        if len(self.sorted_ids):
+            keep &= ~np.isin(numeric, self.sorted_ids)
+        if self.new_ids:
+            keep &= ~np.isin(numeric, np.fromiter(self.new_ids, dtype=np.int64, count=len(self.new_ids)))
+        rows = np.flatnonzero(keep)
+        self._grow(self.size + len(rows))
+        end = self.size + len(rows)
+        self.codes[self.size:end] = [self._code(sellers[row]) for row in rows]
+        self.times[self.size:end] = np.asarray(times, dtype=np.float64)[rows]
+        self.ids[self.size:end] = numeric[rows]
+        self.size = end
+        self.sorted_ids = np.unique(self.ids[:self.size][self.ids[:self.size] >= 0])
+        self.new_ids = set()
+        return len(rows)
+
+    def refresh(self, store=None):
+        """
+        Loads the archive on first use, adds the SQLite seller history not seen yet and
+        recomputes the window table. Call at the start of a scan. Blocking.
+        """
+        with self._lock:
+            cutoff = time.time() - ANALYTICS_DAYS * 86400
+            if not self.loaded and self.archive is not None:
+                try:
+                    table = self.archive.read(since=cutoff, columns=("item_id", "seller", "uploaded_at", "scanned_at"))
+                    uploaded = table.column("uploaded_at").to_numpy(zero_copy_only=False)
+                    scanned = table.column("scanned_at").to_numpy(zero_copy_only=False)
+                    times = np.where(np.isnan(uploaded), scanned, uploaded)
+                    added = self._add_rows(table.column("item_id").to_pylist(), table.column("seller").to_pylist(), times)
+                    print(f"Loaded {added} archived items of the last {ANALYTICS_DAYS} days.")
+                except Exception as e:
+                    print(f"Could not read the scan archive: {e}")
+            self.loaded = True
+            if store is not None:
+                rows = store.conn.execute("SELECT item_id, seller, added_at FROM seller_items").fetchall()
+                if rows:
+                    self._add_rows([row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows])
+            self._drop_before(cutoff)
+            self.table = self.window_table()
+            self.table_at = time.time()
+            self.recent = {}
+
+    def _drop_before(self, cutoff):
+        keep = self.times[:self.size] >= cutoff
+        if keep.all():
+            return
+        kept = int(keep.sum())
+        for name in ("codes", "times", "ids"):
+            values = getattr(self, name)
+            values[:kept] = values[:self.size][keep]
+        self.size = kept
+        self.sorted_ids = np.unique(self.ids[:self.size][self.ids[:self.size] >= 0])
+
+    # Counting
+
+    def window_table(self, now=None):
+        """Returns an (n_sellers, n_windows) array of item counts per window, in one pass."""
+        now = time.time() if now is None else now
+        bounds = np.array([seconds for _, seconds in WINDOWS], dtype=np.float64)
+        buckets = len(WINDOWS)
+        # Bucket b holds items younger than window b but not younger than window b-1
+        bucket = np.searchsorted(bounds, now - self.times[:self.size], side="right")
+        inside = bucket < buckets
+        flat = np.bincount(self.codes[:self.size][inside] * buckets + bucket[inside],
+                           minlength=len(self.sellers) * buckets)
+        return np.cumsum(flat.reshape(len(self.sellers), buckets), axis=1)
+
+    def add(self, item_id, seller, listed_at):
+        """Records an item committed during the scan. Returns False if it was already known."""
+        with self._lock:
+            numeric = _numeric_id(item_id)
+            if self._known(numeric):
+                return False
+            self._grow(self.size + 1)
+            self.codes[self.size] = self._code(seller)
+            self.times[self.size] = listed_at
+            self.ids[self.size] = numeric
+            self.size += 1
+            if numeric >= 0:
+                self.new_ids.add(numeric)
+            self.recent.setdefault(seller, []).append(listed_at)
+            return True
+
+    def seller_windows(self, seller, now=None):
+        """{'1h': n, '24h': n, '7d': n, '30d': n} for one seller: the table row plus items added since."""
+        now = time.time() if now is None else now
+        with self._lock:
+            code = self.seller_codes.get(seller)
+            base = self.table[code] if code is not None and code < len(self.table) else np.zeros(len(WINDOWS), dtype=np.int64)
+            recent = self.recent.get(seller, ())
+            return {
+                name: int(base[i]) + sum(1 for listed_at in recent if now - listed_at < seconds)
+                for i, (name, seconds) in enumerate(WINDOWS)
+            }
+
+    def top_sellers(self, limit=20, by="24h"):
+        """Sellers with the highest count in window `by` (or 'velocity'), with all their counts."""
+        with self._lock:
+            table = self.window_table()
+            sellers = list(self.sellers)
+        columns = {name: i for i, (name, _) in enumerate(WINDOWS)}
+        scores = table[:, columns["24h"]] / np.maximum(table[:, columns["30d"]] / 30, 1)
+        key = scores if by == "velocity" else table[:, columns[by]]
+        order = np.argsort(-key, kind="stable")[:limit]
+        return [
+            dict({name: int(table[row, i]) for name, i in columns.items()},
+                 seller=sellers[row], velocity=round(float(scores[row]), 2))
+            for row in order if table[row, -1]
+        ]
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_seller_analytics():
+    """Returns the process-wide SellerAnalytics (call refresh(store) before a scan)."""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = SellerAnalytics(get_scan_archive())
+        return _analytics
@@ -0,0 +1,245 @@
+"""
+Seller profile crawl.
+
+A seller's rolling count only grew when the catalog scan opened one of their items,
+so a seller with five fresh listings needed five item page loads before the match.
+When an item resolves its seller, SellerProfileCache fetches that seller's wardrobe
+(newest listings with upload times) in one request: the wardrobe JSON API, falling
+back to the embedded state of the /member/ page. It keeps the summary for
+VINTED_SELLER_PROFILE_TTL seconds.
+
+- The seller's other recent listings that mention the search keyword and pass the
+  search's status and brand filters are added to the seller history, so the count is
+  complete after the first item.
+- Catalog items that appear in a cached profile are answered from it without
+  opening the item page.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+from item_extractor import build_item_record
+from rate_control import BlockedError, http_get
+from scan_metrics import count, span
+
+SELLER_PROFILES_ENABLED = os.getenv("VINTED_SELLER_PROFILES", "1") != "0"
+SELLER_PROFILE_TTL_SECONDS = float(os.getenv("VINTED_SELLER_PROFILE_TTL", "900"))
+SELLER_PROFILE_PER_PAGE = 96
+ROLLING_WINDOW_SECONDS = 24 * 3600
+
+# Catalog status_ids by the condition label wardrobe items carry when they lack status_id
+STATUS_IDS = {
+    "nieuw met prijskaartje": 6, "new with tags": 6, "neuf avec étiquette": 6, "neu mit etikett": 6,
+    "nieuw zonder prijskaartje": 1, "new without tags": 1, "neuf sans étiquette": 1, "neu ohne etikett": 1,
+    "zeer goed": 2, "very good": 2, "très bon état": 2, "sehr gut": 2,
+    "goed": 3, "good": 3, "bon état": 3, "gut": 3,
+    "redelijk": 4, "satisfactory": 4, "satisfaisant": 4, "zufriedenstellend": 4,
+}
+
+
+def member_id(seller_url):
+    """Returns the numeric member ID from a /member/<id>-<name> URL, or None."""
+    match = re.search(r"/member/(\d+)", seller_url or "")
+    return match.group(1) if match else None
+
+
+def _title_of(value):
+    if isinstance(value, dict):
+        return value.get("title")
+    return value if isinstance(value, str) else None
+
+
+def _status_id(item):
+    status_id = item.get("status_id")
+    if status_id is None:
+        status = _title_of(item.get("status"))
+        status_id = STATUS_IDS.get(status.strip().lower()) if status else None
+    return str(status_id) if status_id is not None else None
+
+
+def _brand_id(item):
+    brand_id = item.get("brand_id")
+    if brand_id is None and isinstance(item.get("brand"), dict):
+        brand_id = item["brand"].get("id")
+    return str(brand_id) if brand_id is not None else None
+
+
+def parse_listing(item, base_url):
+    """Turns one wardrobe item into (item_id, url, raw dict for build_item_record), or None."""
+    if not isinstance(item, dict) or "id" not in item or "title" not in item:
+        return None
+    photo = item.get("photo") or {}
+    created = item.get("created_at_ts") or item.get("created_at") or (photo.get("high_resolution") or {}).get("timestamp")
+    if not created:
+        return None
+    item_id = str(item["id"])
+    url = item.get("url") or f"/items/{item_id}"
+    if url.startswith("/"):
+        url = base_url + url
+    photos = [p.get("url") for p in item.get("photos") or [] if isinstance(p, dict) and p.get("url")]
+    if not photos and photo.get("url"):
+        photos = [photo["url"]]
+    raw = {
+        "source": "profile",
+        "title": _title_of(item.get("title")) or "",
+        "description": _title_of(item.get("description")) or "",
+        "brand": _title_of(item.get("brand_title")) or _title_of(item.get("brand")) or "",
+        "details": [],
+        "createdAt": created,
+        "size": _title_of(item.get("size_title")) or _title_of(item.get("size")),
+        "color": _title_of(item.get("color1")) or _title_of(item.get("color")),
+        "photos": photos,
+        "statusId": _status_id(item),
+        "brandId": _brand_id(item),
+    }
+    return item_id, url, raw
+
+
+def _find_item_lists(root, max_nodes=50000):
+    """Yields lists of item-like dicts anywhere in a JSON document."""
+    stack = [root]
+    visited = 0
+    while stack and visited < max_nodes:
+        node = stack.pop()
+        visited += 1
+        if isinstance(node, list):
+            if node and all(isinstance(x, dict) and "id" in x and "title" in x for x in node):
+                yield node
+                continue
+            stack.extend(x for x in node if isinstance(x, (dict, list)))
+        elif isinstance(node, dict):
+            stack.extend(x for x in node.values() if isinstance(x, (dict, list)))
+
+
+def parse_member_html(html, base_url):
+    """Listings from the embedded state of a /member/ page."""
+    soup = BeautifulSoup(html, "lxml")
+    listings = []
+    for script in soup.select('script[type="application/json"], script#__NEXT_DATA__'):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        for items in _find_item_lists(data):
+            listings += [listing for listing in (parse_listing(item, base_url) for item in items) if listing]
+    return listings
+
+
+class SellerProfileCache:
+    """Recent listings per seller URL, kept for ttl seconds, one fetch per seller at a time."""
+
+    def __init__(self, ttl=SELLER_PROFILE_TTL_SECONDS):
+        self.ttl = ttl
+        self.profiles = {}
+        self.by_item = {}
+        self.loading = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, profile):
+        return profile is not None and time.time() - profile["fetched_at"] < self.ttl
+
+    async def _fetch(self, fetcher, seller_name, seller_url):
+        parts = urlsplit(seller_url)
+        base_url = f"{parts.scheme}://{parts.netloc}"
+        user_id = member_id(seller_url)
+        client = await fetcher.get_client()
+        listings = []
+        with span("seller_profile_fetch"):
+            if user_id:
+                api_url = (f"{base_url}/api/v2/wardrobe/{user_id}/items"
+                           f"?page=1&per_page={SELLER_PROFILE_PER_PAGE}&order=newest_first")
+                try:
+                    response = await http_get(client, api_url)
+                    if response.status_code == 200:
+                        listings = [listing for listing in (parse_listing(item, base_url)
+                                                            for item in response.json().get("items") or []) if listing]
+                except (BlockedError, ValueError, AttributeError):
+                    listings = []
+            if not listings:
+                response = await http_get(client, seller_url)
+                if response.status_code == 200:
+                    listings = await asyncio.to_thread(parse_member_html, response.text, base_url)
+        profile = {
+            "seller_name": seller_name,
+            "seller_url": seller_url,
+            "fetched_at": time.time(),
+            "listings": {},
+        }
+        now = time.time()
+        for item_id, url, raw in listings:
+            record = build_item_record(url, dict(raw, sellerName=seller_name, sellerUrl=seller_url), now)
+            if record.uploaded_at:
+                # The keyword filter sees brand and title, like the catalog grid card does
+                keyword_text = f"{raw['brand']} {record.title} {record.description}".lower()
+                profile["listings"][item_id] = (url, record, keyword_text, (raw["statusId"], raw["brandId"]))
+        count("seller_profiles_fetched")
+        return profile
+
+    async def load(self, fetcher, seller_name, seller_url):
+        """Returns the seller's profile summary, fetching it unless a fresh one is cached."""
+        with self._lock:
+            profile = self.profiles.get(seller_url)
+            if self._fresh(profile):
+                count("seller_profile_cache_hits")
+                return profile
+        # Concurrent items of the same seller (on the same event loop) wait for the one fetch
+        loop = asyncio.get_running_loop()
+        pending = self.loading.get(seller_url)
+        if pending and pending[0] is loop:
+            return await asyncio.shield(pending[1])
+        future = loop.create_future()
+        self.loading[seller_url] = (loop, future)
+        profile = None
+        try:
+            profile = await self._fetch(fetcher, seller_name, seller_url)
+            if profile:
+                with self._lock:
+                    self.profiles[seller_url] = profile
+                    for item_id in profile["listings"]:
+                        self.by_item[item_id] = seller_url
+        except Exception as e:
+            print(f"Could not load seller profile {seller_url}: {e}")
+            count("seller_profile_errors")
+        finally:
+            self.loading.pop(seller_url, None)
+            # Also when the fetch is cancelled, so waiting items go on without the profile
+            future.set_result(profile)
+        return profile
+
+    def record_for(self, item_id):
+        """Returns the ItemRecord of item_id from a fresh cached profile, or None."""
+        with self._lock:
+            profile = self.profiles.get(self.by_item.get(item_id))
+            if not self._fresh(profile) or item_id not in profile["listings"]:
+                return None
+            return profile["listings"][item_id][1]
+
+    def recent_listings(self, profile, keyword, status_ids=(), brand_ids=()):
+        """
+        (url, uploaded_at) of the profile's listings in the rolling window that mention
+        keyword and match the search's status_ids/brand_ids (if set). A listing without a
+        known status or brand does not pass that filter.
+        """
+        if not profile:
+            return []
+        cutoff = time.time() - ROLLING_WINDOW_SECONDS
+        return [
+            (url, record.uploaded_at)
+            for url, record, keyword_text, (status_id, brand_id) in profile["listings"].values()
+            if record.uploaded_at > cutoff and keyword in keyword_text
+            and (not status_ids or status_id in status_ids)
+            and (not brand_ids or brand_id in brand_ids)
+        ]
+
+
+_cache = SellerProfileCache()
+
+
+def get_seller_profiles():
+    return _cache
@@ -0,0 +1,255 @@
+"""
+Multi-process item scanning.
+
+One Python process drives one Chromium, and parsing, regex work and screenshot
+encoding all share its event loop. A ShardPool starts N worker processes, each with
+its own event loop, browser and HTTP client, and partitions item IDs across them
+(item_id % N). Workers only scan and screenshot; they never touch the history store.
+The coordinator (scan_targets in the main process) keeps walking the catalog, serves
+cached items itself and commits every result centrally through the OrderedCommitter
+in catalog order, so the match decision is identical to a serial run.
+
+Rate and memory budgets are per process, so each shard gets 1/N of them:
+
+- VINTED_DOMAIN_RATE and VINTED_DOMAIN_BURST are divided by N. The shards together stay
+  at the configured rate, but a shard cannot borrow the budget of an idle shard, and
+  each adapts its rate (AIMD) and opens its circuit on its own. Item IDs spread evenly
+  over the shards, so in a busy scan every shard uses its share. The coordinator's
+  catalog requests use the main process's limiter on top of that (one request per
+  catalog page).
+- The memory limit of the resource governor is divided by N, so the shards' browsers
+  together stay within the container's limit.
+
+Every shard accepts the cookie consent once in its context before scanning.
+
+Enable with VINTED_SCAN_SHARDS=<processes> (default 1: no sharding).
+"""
+import asyncio
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+
+SCAN_SHARDS = int(os.getenv("VINTED_SCAN_SHARDS", "1"))
+
+# Items in flight per worker process
+SHARD_CONCURRENCY = int(os.getenv("VINTED_SHARD_CONCURRENCY", "8"))
+
+SHARD_START_TIMEOUT = 120
+
+
+def _shard_main(shard_index, shard_count, requests, responses, concurrency):
+    """Entry point of a worker process."""
+    try:
+        asyncio.run(_shard_loop(shard_index, shard_count, requests, responses, concurrency))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _shard_loop(shard_index, shard_count, requests, responses, concurrency):
+    # Imported here so the coordinator can import this module cheaply
+    from playwright.async_api import async_playwright
+    import vinted_scraper
+    from http_extractor import HTTP_FIRST_ENABLED, HttpItemFetcher
+    from rate_limit import get_rate_limiter
+    from resource_governor import get_resource_governor
+    from resource_policy import ResourceStats, apply_full_policy, apply_lean_policy
+
+    # The per-domain budget is per process; split it so N shards together keep the same rate
+    limiter = get_rate_limiter()
+    limiter.rate = limiter.rate / shard_count
+    limiter.burst = max(1, limiter.burst // shard_count)
+    # Likewise the memory limit, so N shards together stay within the container's limit
+    governor = get_resource_governor()
+    governor.set_limit(governor.limit_mb / shard_count)
+
+    loop = asyncio.get_running_loop()
+    inbox = asyncio.Queue()
+
+    def read_requests():
+        while True:
+            message = requests.get()
+            loop.call_soon_threadsafe(inbox.put_nowait, message)
+            if message is None:
+                return
+
+    threading.Thread(target=read_requests, name=f"shard-{shard_index}-reader", daemon=True).start()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await vinted_scraper.new_scan_context(browser)
+        await vinted_scraper.warm_up_context(context)
+        resource_stats = ResourceStats()
+
+        async def lean_setup(page):
+            await apply_lean_policy(page, resource_stats)
+
+        async def full_setup(page):
+            await apply_full_policy(page, resource_stats)
+
+        http_fetcher = HttpItemFetcher(context, vinted_scraper.USER_AGENT) if HTTP_FIRST_ENABLED else None
+        scan_pages = vinted_scraper.FallbackPages(context, concurrency, lean_setup)
+        screenshot_pages = vinted_scraper.FallbackPages(context, vinted_scraper.SCREENSHOT_CONCURRENCY, full_setup)
+        slots = asyncio.Semaphore(concurrency)
+        responses.put(("ready", shard_index, None))
+
+        async def handle(request_id, kind, payload):
+            async with slots:
+                try:
+                    if kind == "scan":
+                        result = None
+                        if http_fetcher:
+                            result = await vinted_scraper.scan_item_http(http_fetcher, payload)
+                        if result is None:
+                            async with scan_pages.page() as page:
+                                result = await vinted_scraper.scan_item(page, payload)
+                    else:
+                        # PNG bytes; the coordinator encodes and stores them
+                        async with screenshot_pages.page() as page:
+                            result = await vinted_scraper.take_item_screenshot(page, payload)
+                    responses.put((request_id, "ok", result))
+                except Exception as e:
+                    responses.put((request_id, "error", f"{type(e).__name__}: {e}"))
+
+        tasks = set()
+        try:
+            while True:
+                message = await inbox.get()
+                if message is None:
+                    break
+                task = asyncio.create_task(handle(*message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            await scan_pages.close()
+            await screenshot_pages.close()
+            if http_fetcher:
+                await http_fetcher.close()
+            await browser.close()
+
+
+class ShardPool:
+    """Worker processes plus the routing of requests and responses. Use with `async with`."""
+
+    def __init__(self, shards=SCAN_SHARDS, concurrency=SHARD_CONCURRENCY):
+        self.shards = shards
+        self.concurrency = concurrency
+        self.processes = []
+        self.request_queues = []
+        self.responses = None
+        self.pending = {}
+        self.ids = itertools.count()
+        self.loop = None
+        self.stats = {"scans": [0] * shards, "screenshots": [0] * shards, "errors": 0}
+
+    @property
+    def capacity(self):
+        """Items that can be in flight across all shards."""
+        return self.shards * self.concurrency
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        # spawn: a forked child would inherit the parent's event loop and Playwright state
+        mp = multiprocessing.get_context("spawn")
+        self.responses = mp.Queue()
+        for index in range(self.shards):
+            requests = mp.Queue()
+            process = mp.Process(
+                target=_shard_main, args=(index, self.shards, requests, self.responses, self.concurrency),
+                name=f"vinted-shard-{index}", daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+            self.request_queues.append(requests)
+
+        # Each worker reports "ready" once its browser is up
+        ready = 0
+        while ready < self.shards:
+            try:
+                message = await asyncio.to_thread(self.responses.get, True, SHARD_START_TIMEOUT)
+            except queue.Empty:
+                await self.stop()
+                raise RuntimeError(f"scan shards did not start within {SHARD_START_TIMEOUT}s")
+            if message[0] == "ready":
+                ready += 1
+        threading.Thread(target=self._read_responses, name="shard-responses", daemon=True).start()
+        print(f"Started {self.shards} scan shards ({self.capacity} items in flight).")
+        return self
+
+    def _read_responses(self):
+        while True:
+            try:
+                message = self.responses.get(timeout=5)
+            except queue.Empty:
+                # A crashed worker never answers; fail its requests instead of hanging
+                dead = [index for index, process in enumerate(self.processes) if not process.is_alive()]
+                if dead:
+                    self.loop.call_soon_threadsafe(self._fail_shards, dead)
+                continue
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            self.loop.call_soon_threadsafe(self._resolve, *message)
+
+    def _fail_shards(self, shards):
+        for request_id, (future, shard) in list(self.pending.items()):
+            if shard in shards:
+                self._resolve(request_id, "error", f"scan shard {shard} exited")
+
+    def _resolve(self, request_id, status, result):
+        future, _ = self.pending.pop(request_id, (None, None))
+        if future is None or future.done():
+            return
+        if status == "ok":
+            future.set_result(result)
+        else:
+            self.stats["errors"] += 1
+            future.set_exception(RuntimeError(result))
+
+    def shard_for(self, product_url):
+        from history_store import item_key
+        key = item_key(product_url)
+        return int(key) % self.shards if key.isdigit() else hash(key) % self.shards
+
+    def _submit(self, shard, kind, payload):
+        request_id = next(self.ids)
+        future = self.loop.create_future()
+        self.pending[request_id] = (future, shard)
+        self.request_queues[shard].put((request_id, kind, payload))
+        return future
+
+    async def scan(self, product_url):
+        """Scans one item on its shard and returns the scan_item result dict."""
+        shard = self.shard_for(product_url)
+        self.stats["scans"][shard] += 1
+        return await self._submit(shard, "scan", product_url)
+
+    async def screenshot(self, product_url):
+        """Takes the item screenshot on its shard and returns the PNG bytes."""
+        shard = self.shard_for(product_url)
+        self.stats["screenshots"][shard] += 1
+        return await self._submit(shard, "screenshot", product_url)
+
+    async def stop(self):
+        for requests in self.request_queues:
+            requests.put(None)
+        for process in self.processes:
+            await asyncio.to_thread(process.join, 30)
+            if process.is_alive():
+                process.terminate()
+        if self.responses is not None:
+            self.responses.put(None)
+        for future, _ in self.pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("shard pool stopped"))
+        self.pending.clear()
+        print(f"Shard pool stopped. Scans per shard: {self.stats['scans']}, errors: {self.stats['errors']}.")
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
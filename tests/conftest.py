@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# The scraper modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import HistoryStore  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An empty HistoryStore; the working directory has no legacy JSON files to migrate."""
+    monkeypatch.chdir(tmp_path)
+    store = HistoryStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
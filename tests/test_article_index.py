@@ -0,0 +1,53 @@
+import article_index
+from article_index import ArticleIndex, normalize_code
+
+
+def write_catalog(path, rows, header="artikelnummer,kleur,naam\n", mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        if mode == "w":
+            f.write(header)
+        for row in rows:
+            f.write(",".join(row) + "\n")
+
+
+def test_normalize_code_keeps_digits_only():
+    assert normalize_code("1.23.4.5678") == "12345678"
+    assert normalize_code("1234-5678") == "12345678"
+    assert normalize_code(12345678) == "12345678"
+
+
+def test_codes_match_in_any_notation(tmp_path):
+    path = str(tmp_path / "articles.csv")
+    write_catalog(path, [("1.23.4.5678", "zwart", "Top"), ("7654321", "", "Broek")])
+    index = ArticleIndex(path)
+
+    found = index.find_articles("Costes top art. 12345678, ook 1234-5678 en 7654321-38")
+
+    assert [article["article_code"] for article in found] == ["1.23.4.5678", "7654321"]
+    assert found[0] == {"artikelnummer": "1.23.4.5678", "kleur": "zwart", "naam": "Top", "article_code": "1.23.4.5678"}
+    # Empty columns are left out
+    assert "kleur" not in found[1]
+
+
+def test_phone_numbers_sizes_and_prices_do_not_match(tmp_path):
+    path = str(tmp_path / "articles.csv")
+    write_catalog(path, [("12345678", "", "Top")])
+    index = ArticleIndex(path)
+
+    assert index.find_articles("Bel 06-12345678, maat 38, prijs 12.50") == []
+    assert index.find_articles_many(["", None, "12345678"]) == [[], [], [index.find_articles("12345678")[0]]]
+
+
+def test_appended_rows_are_loaded_without_a_rebuild(tmp_path, monkeypatch):
+    path = str(tmp_path / "articles.csv")
+    write_catalog(path, [("12345678", "", "Top")])
+    index = ArticleIndex(path)
+    monkeypatch.setattr(article_index, "ARTICLE_RELOAD_SECONDS", 0)
+
+    write_catalog(path, [("87654321", "", "Jurk")], mode="a")
+    assert index.reload_if_changed()
+    assert len(index) == 2
+
+    write_catalog(path, [("11111111", "", "Rok")])
+    assert index.reload_if_changed()
+    assert [article["article_code"] for article in index.find_articles("12345678 11111111")] == ["11111111"]
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from catalog_grid import harvest_grid
+from vinted_scraper import catalog_page_url
+
+GRID_HTML = """
+<div data-testid="grid-item">
+  <a href="/items/101-costes-top" title="Costes top, Costes, M, € 12,50"></a>
+  <div data-testid="product-item-id-101--description-title">Costes</div>
+  <div data-testid="product-item-id-101--description-subtitle">Top zwart</div>
+  <div>€ 12,50</div>
+  <a href="/member/7-anna"><span data-testid="product-item-id-101--owner-name">anna</span></a>
+  <div>2 uur geleden</div>
+</div>
+<div data-testid="grid-item">
+  <a href="/items/102-zara-jurk" title="Jurk, Zara, S, € 9,00"></a>
+  <div>Zara</div>
+</div>
+<div data-testid="grid-item">
+  <a href="/items/103-broek" title="Broek, COSTES, 38, € 20,00"></a>
+  <a href="/items/103-broek">Broek</a>
+</div>
+<div data-testid="grid-item">
+  <a href="/items/101-costes-top" title="Costes top, Costes, M, € 12,50"></a>
+</div>
+"""
+
+
+@pytest.mark.parametrize("search_url, page_number, expected", [
+    ("https://www.vinted.nl/catalog?search_text=costes&order=newest_first", 1,
+     "https://www.vinted.nl/catalog?search_text=costes&order=newest_first&page=1"),
+    ("https://www.vinted.nl/catalog?page=3&search_text=costes", 4,
+     "https://www.vinted.nl/catalog?search_text=costes&page=4"),
+    ("https://www.vinted.nl/catalog?search_text=&brand_ids[]=1&brand_ids[]=2", 2,
+     "https://www.vinted.nl/catalog?search_text=&brand_ids%5B%5D=1&brand_ids%5B%5D=2&page=2"),
+    ("https://www.vinted.nl/catalog", 5, "https://www.vinted.nl/catalog?page=5"),
+])
+def test_catalog_page_url(search_url, page_number, expected):
+    assert catalog_page_url(search_url, page_number) == expected
+
+
+class EvaluatePage:
+    def __init__(self, result):
+        self.result = result
+        self.args = None
+
+    async def evaluate(self, script, args):
+        self.args = args
+        return self.result
+
+
+def test_harvest_grid_keys_cards_by_item_id_in_grid_order():
+    cards = [{"item_id": "9", "url": "https://www.vinted.nl/items/9"}, {"item_id": "3", "url": "https://www.vinted.nl/items/3"}]
+    page = EvaluatePage({"total": 5, "cards": cards})
+
+    harvested = asyncio.run(harvest_grid(page, "Costes"))
+
+    assert list(harvested) == ["9", "3"]
+    assert harvested["3"]["url"] == "https://www.vinted.nl/items/3"
+    # The keyword is matched case-insensitively in the page
+    assert page.args == ['[data-testid="grid-item"]', "costes"]
+
+
+def test_grid_script_reads_cards_in_the_browser():
+    async_api = pytest.importorskip("playwright.async_api")
+
+    async def main():
+        async with async_api.async_playwright() as p:
+            try:
+                browser = await p.chromium.launch(headless=True)
+            except Exception as e:
+                pytest.skip(f"Chromium not available: {e}")
+            try:
+                page = await browser.new_page()
+                async def serve_grid(route):
+                    await route.fulfill(body=GRID_HTML, content_type="text/html")
+
+                await page.route("https://www.vinted.nl/catalog", serve_grid)
+                await page.goto("https://www.vinted.nl/catalog")
+                return await harvest_grid(page, "costes")
+            finally:
+                await browser.close()
+
+    harvested = asyncio.run(main())
+
+    # The Zara card is dropped and the repeated card of item 101 is read once
+    assert list(harvested) == ["101", "103"]
+    assert harvested["101"] == {
+        "item_id": "101", "url": "https://www.vinted.nl/items/101-costes-top", "title": "Top zwart", "brand": "Costes",
+        "price": "€ 12,50", "seller_name": "anna", "seller_url": "https://www.vinted.nl/member/7-anna",
+        "time_hint": "2 uur geleden",
+    }
+    assert harvested["103"]["title"] == "Broek"
@@ -0,0 +1,61 @@
+import sqlite3
+import time
+
+from history_store import HistoryStore, item_key
+
+
+def test_item_key_uses_the_vinted_item_id():
+    assert item_key("https://www.vinted.nl/items/1234-costes-top") == "1234"
+    assert item_key("https://www.vinted.nl/member/1") == "https://www.vinted.nl/member/1"
+
+
+def test_add_seller_item_is_an_upsert_on_item_id(store):
+    assert store.add_seller_item("anna", "https://www.vinted.nl/items/1-a")
+    assert not store.add_seller_item("anna", "https://www.vinted.nl/items/1-renamed")
+    assert store.seller_count_total() == 1
+    assert store.known_item_ids() == {"1"}
+
+
+def test_expire_drops_items_outside_the_rolling_window(store):
+    now = time.time()
+    store.add_seller_item("anna", "https://www.vinted.nl/items/1", now - 25 * 3600)
+    store.add_seller_item("anna", "https://www.vinted.nl/items/2", now - 3600)
+    store.put_scanned_item("3", {"url": "https://www.vinted.nl/items/3", "uploaded_at": now - 30 * 3600})
+    store.put_scanned_item("4", {"url": "https://www.vinted.nl/items/4", "uploaded_at": now - 60})
+
+    assert store.expire() == 2
+    assert store.known_item_ids() == {"2", "4"}
+
+
+def test_scanned_items_are_returned_newest_first_per_search(store):
+    for item_id in ("9", "10", "8"):
+        store.put_scanned_item(item_id, {"url": f"https://www.vinted.nl/items/{item_id}", "details": {"size": "M"}})
+    store.tag_item_search("9", "nl")
+    store.tag_item_search("10", "nl")
+
+    assert [entry["item_id"] for entry in store.scanned_items_newest_first()] == ["10", "9", "8"]
+    assert [entry["item_id"] for entry in store.scanned_items_newest_first("nl")] == ["10", "9"]
+    assert store.get_scanned_item("8")["details"] == {"size": "M"}
+
+
+def test_high_water_mark_only_moves_up(store):
+    store.advance_high_water_mark(100)
+    store.advance_high_water_mark(50)
+    store.advance_high_water_mark(120, "nl")
+
+    assert store.high_water_mark() == 100
+    assert store.high_water_mark("nl") == 120
+
+
+def test_unused_seller_index_is_dropped_from_older_databases(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE seller_items (item_id TEXT PRIMARY KEY, url TEXT NOT NULL, seller TEXT NOT NULL, added_at REAL NOT NULL)")
+    conn.execute("CREATE INDEX idx_seller_items_seller_added ON seller_items (seller, added_at)")
+    conn.close()
+
+    store = HistoryStore(path)
+    indexes = {row["name"] for row in store.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    store.close()
+    assert "idx_seller_items_seller_added" not in indexes
+    assert "idx_seller_items_added" in indexes
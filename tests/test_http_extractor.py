@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+import item_extractor
+from http_extractor import HttpItemFetcher, is_complete, parse_item_html
+from item_extractor import build_item_record
+
+BASE_URL = "https://www.vinted.nl"
+NOW = 1_700_000_000.0
+
+JSON_PAGE = """<html><head>
+<script type="application/json">{"props": {"items": [
+  {"id": 111, "title": "Other item", "user": {"login": "bob"}},
+  %s
+]}}</script></head>
+<body><h1>Rendered title</h1></body></html>
+"""
+
+DOM_PAGE = """<html><body>
+<h1>Costes blazer</h1>
+<div data-testid="item-description">Art. 1234567, maat 38</div>
+<div class="details-list__item"><span>Maat</span><span>38</span></div>
+<div class="details-list__item"><span>Kleur</span><span>Beige</span></div>
+<div class="details-list__item"><span>Geplaatst</span><span>3 uur geleden</span></div>
+<div data-testid="item-photo-1"><img src="/photos/1.jpg"></div>
+<a href="/member/42-anna"><span data-testid="profile-username">anna (12)</span></a>
+</body></html>
+"""
+
+# Client-rendered shell: no hydration state, no details rows and no seller block
+SHELL_PAGE = """<html><body><div id="root"></div><script src="/app.js"></script></body></html>"""
+
+
+@pytest.fixture(autouse=True)
+def no_article_catalog(monkeypatch):
+    monkeypatch.setattr(item_extractor, "get_article_index", lambda: None)
+
+
+def item_json(**overrides):
+    item = {
+        "id": 987, "title": "Costes top", "description": "Nieuw, 1234567",
+        "created_at_ts": NOW - 3600, "size_title": "M", "color1": {"title": "Zwart"},
+        "user": {"id": 42, "login": "anna"},
+        "photos": [{"url": "https://img/1.jpg"}, {"full_size_url": "https://img/2.jpg"}, {}],
+    }
+    item.update(overrides)
+    return JSON_PAGE % json.dumps(item)
+
+
+def test_complete_page_from_hydration_json():
+    raw = parse_item_html(item_json(), "987", BASE_URL)
+
+    assert raw["source"] == "http_json"
+    assert (raw["title"], raw["size"], raw["color"]) == ("Costes top", "M", "Zwart")
+    assert raw["sellerName"] == "anna"
+    assert raw["sellerUrl"] == "https://www.vinted.nl/member/42-anna"
+    assert raw["photos"] == ["https://img/1.jpg", "https://img/2.jpg"]
+
+    record = build_item_record(f"{BASE_URL}/items/987-costes-top", raw, now=NOW)
+    assert record.is_within_24h and record.uploaded_at == NOW - 3600
+    assert record.product_id == "1234567"
+    assert is_complete(record)
+
+
+def test_complete_page_from_server_rendered_dom():
+    raw = parse_item_html(DOM_PAGE, "987", BASE_URL)
+
+    assert raw["source"] == "http"
+    assert raw["details"] == ["Maat\n38", "Kleur\nBeige", "Geplaatst\n3 uur geleden"]
+    assert raw["sellerName"] == "anna"
+    assert raw["sellerUrl"] == "https://www.vinted.nl/member/42-anna"
+    assert raw["photos"] == ["https://www.vinted.nl/photos/1.jpg"]
+
+    record = build_item_record(f"{BASE_URL}/items/987", raw, now=NOW)
+    assert (record.size, record.color, record.time_text) == ("38", "Beige", "3 uur geleden")
+    assert is_complete(record)
+
+
+def test_shell_page_needs_playwright():
+    record = build_item_record(f"{BASE_URL}/items/987", parse_item_html(SHELL_PAGE, "987", BASE_URL), now=NOW)
+
+    assert record.time_text == "Unknown"
+    assert not is_complete(record)
+
+
+def test_recent_item_without_seller_needs_playwright():
+    page = item_json(user_id=42, user=None)
+    record = build_item_record(f"{BASE_URL}/items/987", parse_item_html(page, "987", BASE_URL), now=NOW)
+
+    assert record.is_within_24h and record.seller_name is None
+    assert not is_complete(record)
+
+
+def test_old_item_is_decided_without_a_seller():
+    page = item_json(user_id=42, user=None, created_at_ts=NOW - 3 * 86400)
+    record = build_item_record(f"{BASE_URL}/items/987", parse_item_html(page, "987", BASE_URL), now=NOW)
+
+    assert not record.is_within_24h
+    assert is_complete(record)
+
+
+def fetch(pages, product_url):
+    """Runs fetch_record against an in-memory transport serving pages by path."""
+    def handler(request):
+        html = pages.get(request.url.path)
+        return httpx.Response(200, html=html) if html else httpx.Response(404)
+
+    async def main():
+        fetcher = HttpItemFetcher(context=None, user_agent="test")
+        fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await fetcher.fetch_record(product_url)
+        finally:
+            await fetcher.close()
+    return asyncio.run(main())
+
+
+def test_fetch_record_returns_none_when_the_browser_is_needed():
+    pages = {"/items/1": item_json(id=1, created_at_ts=time.time() - 60), "/items/2": SHELL_PAGE}
+
+    record = fetch(pages, "https://http-extractor.vinted.invalid/items/1")
+    assert record.seller_name == "anna" and record.extract_ms > 0
+    assert fetch(pages, "https://http-extractor.vinted.invalid/items/2") is None
+    assert fetch(pages, "https://http-extractor.vinted.invalid/items/3") is None
@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+import pytest
+
+import vinted_scraper
+from vinted_scraper import (cache_scan_result, cached_scan_result, extract_item_id, iter_catalog_candidates,
+                            new_scan_result)
+
+
+class FakeCatalogPage:
+    """Stands in for the catalog page: goto() sets the URL, harvest_grid reads it."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.url = None
+        self.visited = []
+
+    async def wait_for_selector(self, selector, timeout=None):
+        if not self.pages.get(self.page_number()):
+            raise TimeoutError(selector)
+
+    def page_number(self):
+        return int(self.url.rsplit("page=", 1)[1])
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    """Returns a factory for a fake catalog whose pages list the given item IDs."""
+
+    async def fake_goto(page, url, **kwargs):
+        page.url = url
+        page.visited.append(page.page_number())
+
+    async def fake_harvest_grid(page, keyword="costes"):
+        ids = page.pages.get(page.page_number(), [])
+        return {str(item_id): {"item_id": str(item_id), "url": f"https://www.vinted.nl/items/{item_id}"} for item_id in ids}
+
+    async def no_cookies(page):
+        pass
+
+    monkeypatch.setattr(vinted_scraper, "goto", fake_goto)
+    monkeypatch.setattr(vinted_scraper, "harvest_grid", fake_harvest_grid)
+    monkeypatch.setattr(vinted_scraper, "accept_cookies", no_cookies)
+    return FakeCatalogPage
+
+
+def collect(page, **kwargs):
+    async def main():
+        return [extract_item_id(url) async for url in iter_catalog_candidates(page, "https://www.vinted.nl/catalog?search_text=costes", **kwargs)]
+    return asyncio.run(main())
+
+
+def scanned(item_id, status="ok", uploaded_at=None):
+    result = new_scan_result(f"https://www.vinted.nl/items/{item_id}")
+    result.update(status=status, time_text="1 uur geleden", seller_name="anna",
+                  seller_url="https://www.vinted.nl/member/1-anna", details={"size": "M"})
+    result["record"] = type("Record", (), {"uploaded_at": uploaded_at})()
+    return result
+
+
+def test_cached_result_is_rebuilt_without_a_page_load(store):
+    cache_scan_result(store, scanned(5, uploaded_at=time.time() - 3600), "nl")
+
+    result = cached_scan_result(store, "https://www.vinted.nl/items/5")
+    assert result["cached"] is True
+    assert result["status"] == "ok"
+    assert (result["seller_name"], result["details"]) == ("anna", {"size": "M"})
+    assert cached_scan_result(store, "https://www.vinted.nl/items/6") is None
+
+
+def test_cached_result_turns_too_old_after_24h(store):
+    cache_scan_result(store, scanned(5, uploaded_at=time.time() - 25 * 3600))
+
+    assert cached_scan_result(store, "https://www.vinted.nl/items/5")["status"] == "too_old"
+
+
+def test_only_finished_items_are_cached_and_advance_the_high_water_mark(store):
+    cache_scan_result(store, scanned(7, status="blocked"), "nl", "nl")
+    assert store.high_water_mark("nl") == 0
+
+    cache_scan_result(store, scanned(6, status="too_old"), "nl", "nl")
+    cache_scan_result(store, scanned(5), "nl", "nl")
+    assert store.high_water_mark("nl") == 6
+    assert [entry["item_id"] for entry in store.scanned_items_newest_first("nl")] == ["5"]
+    assert store.known_item_ids("nl") == {"5", "6"}
+
+
+def test_second_run_stops_at_the_high_water_mark(store, catalog):
+    pages = {1: [30, 29], 2: [28, 27], 3: [26, 25], 4: [24]}
+    first = catalog(pages)
+    assert collect(first) == ["30", "29", "28", "27", "26", "25", "24"]
+    for item_id in (30, 29, 28, 27, 26, 25, 24):
+        cache_scan_result(store, scanned(item_id), "nl", "nl")
+
+    # Two new items arrived on top; everything else shifted down a page
+    second = catalog({1: [32, 31], 2: [30, 29], 3: [28, 27], 4: [26, 25]})
+    found = collect(second, known_ids=store.known_item_ids("nl"), high_water_mark=store.high_water_mark("nl"))
+
+    assert found == ["32", "31"]
+    # Page 2 holds the first known item, so paging ends there
+    assert second.visited == [1, 2]
+
+
+def test_high_water_mark_is_scoped_per_search(store, catalog):
+    for item_id in (30, 29):
+        cache_scan_result(store, scanned(item_id), "nl", "nl")
+
+    other = catalog({1: [30, 29], 2: [28]})
+    found = collect(other, known_ids=store.known_item_ids("be"), high_water_mark=store.high_water_mark("be"))
+
+    # Another search has not listed these items, so it scans them itself and keeps paging
+    assert found == ["30", "29", "28"]
+    assert other.visited == [1, 2, 3]
+
+
+def test_known_items_are_not_yielded(store, catalog):
+    cache_scan_result(store, scanned(40), "nl", "nl")
+    # Known but not cached: decided without a match, or counted from a seller profile
+    cache_scan_result(store, scanned(39, status="too_old"), "nl", "nl")
+    store.tag_item_search("38", "nl")
+
+    page = catalog({1: [41, 40, 39, 38, 37]})
+    assert collect(page, known_ids=store.known_item_ids("nl")) == ["41", "37"]
+
+
+def test_unscoped_prefilter_uses_the_seller_history(store, catalog):
+    store.add_seller_item("anna", "https://www.vinted.nl/items/12")
+    store.put_scanned_item("11", {"url": "https://www.vinted.nl/items/11"})
+
+    page = catalog({1: [13, 12, 11, 10], 2: [9]})
+    assert collect(page, known_ids=store.known_item_ids()) == ["13", "10"]
+    # Known items still end paging after their page
+    assert page.visited == [1]
@@ -0,0 +1,106 @@
+import pytest
+
+import item_extractor
+from item_extractor import build_item_record, classify_upload_time, parse_relative_age, parse_timestamp
+
+NOW = 1_700_000_000.0
+
+
+@pytest.mark.parametrize("time_text, seconds", [
+    ("zojuist", 0),
+    ("just now", 0),
+    ("5 seconden geleden", 5),
+    ("12 minuten geleden", 12 * 60),
+    ("2 uur geleden", 2 * 3600),
+    ("een uur geleden", 3600),
+    ("an hour ago", 3600),
+    ("gisteren", 86400),
+    ("a day ago", 86400),
+    ("3 dagen geleden", 3 * 86400),
+    ("2 weeks ago", 2 * 7 * 86400),
+    ("1 maand geleden", 30 * 86400),
+    ("Unknown", None),
+    ("", None),
+])
+def test_parse_relative_age(time_text, seconds):
+    assert parse_relative_age(time_text) == seconds
+
+
+@pytest.mark.parametrize("time_text, recent", [
+    ("2 uur geleden", True),
+    ("just now", True),
+    ("gisteren", False),
+    ("a day ago", False),
+    ("3 dagen geleden", False),
+    ("Unknown", True),
+])
+def test_classify_upload_time(time_text, recent):
+    assert classify_upload_time(time_text) is recent
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    (NOW, NOW),
+    (NOW * 1000, NOW),
+    ("2023-11-14T22:13:20Z", NOW),
+    ("2023-11-14T23:13:20+01:00", NOW),
+    ("not a date", None),
+])
+def test_parse_timestamp(value, expected):
+    assert parse_timestamp(value) == expected
+
+
+@pytest.fixture(autouse=True)
+def no_article_catalog(monkeypatch):
+    monkeypatch.setattr(item_extractor, "get_article_index", lambda: None)
+
+
+def test_record_from_json_state():
+    raw = {
+        "source": "json",
+        "title": "Costes top 1234567",
+        "description": "Art. 123456-789, nieuw",
+        "createdAt": NOW - 2 * 3600,
+        "size": "M",
+        "color": "Zwart",
+        "sellerName": "anna (12)",
+        "sellerUrl": "https://www.vinted.nl/member/42-anna",
+        "photos": ["https://img/1.jpg", "https://img/2.jpg", "https://img/1.jpg"],
+    }
+    record = build_item_record("https://www.vinted.nl/items/987-costes-top", raw, now=NOW)
+
+    assert record.item_id == "987"
+    assert record.source == "json"
+    assert record.uploaded_at == NOW - 2 * 3600
+    assert record.is_within_24h is True
+    assert record.time_text == "2.0 uur geleden"
+    assert record.product_id_candidates == ["1234567", "123456-789"]
+    assert record.seller_name == "anna"
+    assert record.photo_urls == ["https://img/1.jpg", "https://img/2.jpg"]
+    assert record.details() == {"size": "M", "color": "Zwart", "product_id": "1234567"}
+
+
+def test_record_from_dom_details():
+    raw = {
+        "details": ["Maat\nL", "Kleur\nBlauw", "Geplaatst\ngisteren"],
+        "sellerUrl": "https://www.vinted.nl/member/42-anna",
+    }
+    record = build_item_record("https://www.vinted.nl/items/987", raw, now=NOW)
+
+    assert record.source == "dom"
+    assert (record.size, record.color) == ("L", "Blauw")
+    assert record.time_text == "gisteren"
+    assert record.is_within_24h is False
+    assert record.uploaded_at == NOW - 86400
+    # Name derived from the profile URL
+    assert record.seller_name == "anna"
+    assert record.product_id == "Onbekend"
+
+
+def test_record_with_unknown_upload_time_fails_open():
+    record = build_item_record("https://www.vinted.nl/items/987", {"details": ["Maat\nS"]}, now=NOW)
+
+    assert record.time_text == "Unknown"
+    assert record.is_within_24h is True
+    assert record.uploaded_at is None
+    assert (record.size, record.color) == ("S", "Onbekend")
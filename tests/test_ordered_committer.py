@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+import vinted_scraper
+from scan_archive import ScanArchive
+from seller_analytics import SellerAnalytics
+from vinted_scraper import OrderedCommitter, commit_scan_result, commit_scan_results, new_scan_result
+
+
+@pytest.fixture(autouse=True)
+def isolated_analytics(monkeypatch):
+    """Fresh in-memory analytics and no Parquet archive for every test."""
+    analytics = SellerAnalytics()
+    monkeypatch.setattr(vinted_scraper, "get_seller_analytics", lambda: analytics)
+    monkeypatch.setattr(vinted_scraper, "get_scan_archive", lambda: None)
+    return analytics
+
+
+def scan_result(item_id, seller="anna", status="ok"):
+    result = new_scan_result(f"https://www.vinted.nl/items/{item_id}-costes")
+    result.update(status=status, seller_name=seller, seller_url=f"https://www.vinted.nl/member/1-{seller}",
+                  details={"size": "M", "color": "Zwart", "product_id": None})
+    return result
+
+
+def test_results_are_committed_in_catalog_order(store):
+    committer = OrderedCommitter(store, threshold=3)
+
+    assert committer.add(2, scan_result(3)) == []
+    assert committer.add(1, scan_result(2)) == []
+    assert store.known_item_ids() == set()
+
+    matches = committer.add(0, scan_result(1))
+    # Item 3 is the seller's third item, so the match is on it, not on the item that arrived last
+    assert [match["item_id"] for match in matches] == ["3"]
+    assert matches[0]["seller_count"] == 3
+    assert store.known_item_ids() == {"1", "2", "3"}
+
+
+def test_everything_after_a_too_old_item_is_ignored(store):
+    committer = OrderedCommitter(store, threshold=1)
+
+    committer.add(1, scan_result(2, status="too_old"))
+    committer.add(2, scan_result(3))
+    matches = committer.add(0, scan_result(1, seller="bob"))
+
+    assert [match["seller_name"] for match in matches] == ["bob"]
+    assert committer.stopped
+    assert store.known_item_ids() == {"1"}
+
+
+def test_results_without_seller_are_skipped(store):
+    matches = commit_scan_results({5: scan_result(1, status="no_seller"), 7: scan_result(2)}, store, threshold=1)
+
+    assert [match["item_id"] for match in matches] == ["2"]
+    assert store.known_item_ids() == {"2"}
+
+
+def test_own_scan_archives_details_of_an_item_first_seen_on_a_profile(store, tmp_path, monkeypatch):
+    archive = ScanArchive(str(tmp_path / "archive"))
+    monkeypatch.setattr(vinted_scraper, "get_scan_archive", lambda: archive)
+    listed_at = time.time() - 3600
+
+    first = dict(scan_result(1), seller_listings=[("https://www.vinted.nl/items/2-costes", listed_at)])
+    commit_scan_result(first, store, threshold=3)
+    assert [(row[0], row[4], row[7]) for row in archive.buffer] == [("2", None, False), ("1", "M", False)]
+
+    # Item 2 is then answered from the profile cache: its details and match flag are archived
+    commit_scan_result(dict(scan_result(2), profile=True), store, threshold=2)
+    assert [(row[0], row[4], row[7]) for row in archive.buffer][2:] == [("2", "M", True)]
+
+    # Replays from the scan cache add nothing
+    commit_scan_result(dict(scan_result(2), cached=True), store, threshold=2)
+    assert len(archive.buffer) == 3
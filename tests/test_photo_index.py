@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+import photo_index
+from photo_index import PHOTO_INDEX_DAYS, PHOTO_MATCH_DISTANCE, PhotoHasher, PhotoIndex
+
+BASE = 0x0123_4567_89AB_CDEF
+
+
+def flip(value, bits):
+    """value with its lowest `bits` bits inverted."""
+    return value ^ ((1 << bits) - 1)
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "photos.db")
+
+
+@pytest.fixture
+def index(index_path):
+    index = PhotoIndex(index_path)
+    yield index
+    index.close()
+
+
+def test_neighbours_are_found_within_the_match_distance(index):
+    index.add("1", "anna", [BASE, None])
+    index.add("2", "bob", [flip(BASE, PHOTO_MATCH_DISTANCE)])
+    index.add("3", "carl", [flip(BASE, PHOTO_MATCH_DISTANCE + 1)])
+    # Hashes with the top bit set survive the signed SQLite round trip
+    index.add("4", "dirk", [1 << 63])
+
+    rows = index.neighbours(BASE)
+    assert sorted(index.item_ids[row] for row in rows) == ["1", "2"]
+    assert [index.item_ids[row] for row in index.neighbours(1 << 63, max_distance=0)] == ["4"]
+
+
+def test_sellers_sharing_a_photo_get_each_others_signal(index):
+    index.add("1", "anna", [BASE])
+    index.add("2", "bob", [flip(BASE, 3)])
+    index.add("3", "carl", [flip(BASE, 40)])
+
+    assert index.shared_photo_signal("1", "anna") == {"shared_photo_sellers": ["bob"], "shared_photo_items": ["2"]}
+    assert index.shared_photo_signal("2", "bob") == {"shared_photo_sellers": ["anna"], "shared_photo_items": ["1"]}
+    assert index.shared_photo_signal("3", "carl") == {"shared_photo_sellers": [], "shared_photo_items": []}
+
+
+def test_a_seller_is_not_in_its_own_signal(index):
+    index.add("1", "anna", [BASE])
+    # The same photo on another listing of the same seller is normal, not a shared photo
+    index.add("2", "anna", [BASE])
+
+    assert index.shared_photo_signal("1", "anna") == {"shared_photo_sellers": [], "shared_photo_items": []}
+    assert index.shared_photo_signal("9", "anna") == {"shared_photo_sellers": [], "shared_photo_items": []}
+
+
+def test_hashes_expire_after_the_index_window(index_path, monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(photo_index.time, "time", lambda: clock[0])
+    first = PhotoIndex(index_path)
+    first.add("1", "anna", [BASE])
+    clock[0] += 1
+    first.add("2", "bob", [BASE])
+    first.close()
+
+    clock[0] += PHOTO_INDEX_DAYS * 86400 - 0.5
+    reloaded = PhotoIndex(index_path)
+    # Item 1 is just past the window, item 2 just inside it
+    assert not reloaded.has_item("1")
+    assert reloaded.has_item("2")
+    assert [reloaded.item_ids[row] for row in reloaded.neighbours(BASE)] == ["2"]
+    reloaded.close()
+
+
+def test_flush_item_indexes_a_queued_item_before_the_batch_is_full(index, monkeypatch):
+    monkeypatch.setattr(photo_index, "hash_photos", lambda blobs: [BASE for _ in blobs])
+
+    async def main():
+        hasher = PhotoHasher(index, "test", batch_size=16)
+
+        async def download(url):
+            return b"photo"
+
+        hasher._download = download
+        hasher.submit("1", "anna", ["https://img/1.jpg"])
+        assert not index.has_item("1")
+        await hasher.flush_item("1")
+        assert index.has_item("1")
+        await hasher.close()
+
+    asyncio.run(main())
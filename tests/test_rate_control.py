@@ -0,0 +1,158 @@
+import asyncio
+import itertools
+
+import pytest
+
+import rate_control
+from rate_control import (
+    CIRCUIT_COOLDOWN_SECONDS, CIRCUIT_THRESHOLD, MULTIPLICATIVE_DECREASE, CircuitOpenError, DomainController,
+    is_block_status, is_challenge_html,
+)
+
+_domains = itertools.count()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(rate_control.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def controller():
+    # A domain of its own, so the process-wide token buckets of other tests are untouched
+    return DomainController(f"test{next(_domains)}.vinted.invalid")
+
+
+def test_block_status_needs_the_bot_protection_for_a_403():
+    assert is_block_status(429, {})
+    assert is_block_status(403, {"X-DataDome": "protected"})
+    assert not is_block_status(403, {"content-type": "text/html"})
+    assert not is_block_status(200, {"x-datadome": "protected"})
+
+
+def test_only_real_interstitials_count_as_challenges():
+    normal = ('<html><head><title>Costes top | Vinted</title>'
+              '<script src="https://js.datadome.co/tags.js"></script></head>'
+              '<body>recaptcha captcha datadome</body></html>')
+    assert not is_challenge_html(normal)
+    assert is_challenge_html('<html><head><title>Just a moment...</title></head></html>')
+    assert is_challenge_html('<iframe src="https://geo.captcha-delivery.com/captcha/?cid=1"></iframe>')
+
+
+def test_successes_raise_the_rate_up_to_the_ceiling(controller):
+    for _ in range(10_000):
+        controller.record_success()
+
+    assert controller.rate == pytest.approx(controller.max_rate)
+
+
+def test_failures_halve_the_rate_once_per_cooldown(controller, clock):
+    controller.record_failure("timeout")
+    controller.record_failure("timeout")
+    assert controller.rate == pytest.approx(controller.base_rate * MULTIPLICATIVE_DECREASE)
+
+    clock[0] += 10
+    controller.record_failure("timeout")
+    assert controller.rate == pytest.approx(controller.base_rate * MULTIPLICATIVE_DECREASE ** 2)
+
+
+def test_circuit_opens_after_consecutive_blocks_and_probes_after_the_cooldown(controller, clock):
+    for _ in range(CIRCUIT_THRESHOLD):
+        controller.before_request()
+        controller.record_failure("blocked")
+    assert controller.circuit == "open"
+    with pytest.raises(CircuitOpenError):
+        controller.before_request()
+
+    clock[0] += CIRCUIT_COOLDOWN_SECONDS
+    probe = controller.before_request()
+    assert probe and controller.circuit == "half_open"
+    # Everyone else waits for the probe's verdict
+    with pytest.raises(CircuitOpenError):
+        controller.before_request()
+
+    controller.record_success()
+    assert controller.circuit == "closed"
+    assert not controller.before_request()
+
+
+def test_a_failed_probe_reopens_with_a_doubled_cooldown(controller, clock):
+    for _ in range(CIRCUIT_THRESHOLD):
+        controller.record_failure("blocked")
+    clock[0] += CIRCUIT_COOLDOWN_SECONDS
+    controller.before_request()
+
+    controller.record_failure("blocked")
+
+    assert controller.circuit == "open"
+    assert controller.cooldown == 2 * CIRCUIT_COOLDOWN_SECONDS
+
+
+def test_a_probe_without_verdict_reopens_the_circuit(controller, clock):
+    for _ in range(CIRCUIT_THRESHOLD):
+        controller.record_failure("blocked")
+    clock[0] += CIRCUIT_COOLDOWN_SECONDS
+    probe = controller.before_request()
+
+    controller.release_probe(probe)
+
+    assert controller.circuit == "open"
+    with pytest.raises(CircuitOpenError):
+        controller.before_request()
+
+
+def test_a_stuck_probe_is_replaced_after_the_probe_timeout(controller, clock):
+    for _ in range(CIRCUIT_THRESHOLD):
+        controller.record_failure("blocked")
+    clock[0] += CIRCUIT_COOLDOWN_SECONDS
+    first = controller.before_request()
+
+    clock[0] += rate_control.PROBE_TIMEOUT_SECONDS
+    second = controller.before_request()
+
+    assert second and second != first
+    # The late verdict-less end of the first probe no longer re-opens the circuit
+    controller.release_probe(first)
+    assert controller.circuit == "half_open"
+
+
+def test_a_cancelled_probe_request_releases_the_probe(controller, clock, monkeypatch):
+    monkeypatch.setattr(rate_control, "controller_for", lambda url: controller)
+    for _ in range(CIRCUIT_THRESHOLD):
+        controller.record_failure("blocked")
+    clock[0] += CIRCUIT_COOLDOWN_SECONDS
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def main():
+        task = asyncio.create_task(rate_control._controlled(f"https://{controller.domain}/items/1", hang))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert controller.circuit == "open"
+
+
+def test_retries_stop_when_the_budget_is_spent(controller):
+    allowed = sum(controller.allow_retry() for _ in range(100))
+
+    assert allowed == rate_control.RETRY_BUDGET_FLOOR
+
+
+def test_every_attempt_is_counted_by_outcome(controller, monkeypatch):
+    counted = []
+    monkeypatch.setattr(rate_control, "controller_for", lambda url: controller)
+    monkeypatch.setattr(rate_control, "count", lambda name, amount=1: counted.append(name))
+    monkeypatch.setattr(rate_control, "backoff_delay", lambda attempt, retry_after: 0)
+    outcomes = iter([("blocked", None, None), ("timeout", None, None), ("ok", "page", None)])
+
+    async def attempt():
+        return next(outcomes)
+
+    assert asyncio.run(rate_control._controlled(f"https://{controller.domain}/items/1", attempt)) == "page"
+    assert [name for name in counted if name.startswith("attempts_")] == ["attempts_blocked", "attempts_timeout", "attempts_ok"]
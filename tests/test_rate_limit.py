@@ -0,0 +1,45 @@
+import pytest
+
+import rate_limit
+from rate_limit import DomainRateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_is_free_then_reservations_queue_up(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Every further request waits one more token interval (0.5 s)
+    assert [bucket.reserve() for _ in range(3)] == [0.5, 1.0, 1.5]
+
+
+def test_tokens_refill_up_to_the_burst(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    for _ in range(3):
+        bucket.reserve()
+
+    clock[0] += 10
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.0, 0.5]
+
+
+def test_set_rate_keeps_tokens_earned_at_the_old_rate(clock):
+    bucket = TokenBucket(rate=1, burst=5)
+    for _ in range(5):
+        bucket.reserve()
+
+    clock[0] += 2
+    bucket.set_rate(10)
+    assert bucket.tokens == pytest.approx(2)
+
+
+def test_limiter_keeps_one_bucket_per_domain(clock):
+    limiter = DomainRateLimiter(rate=1, burst=1)
+
+    assert limiter.bucket("www.vinted.nl") is limiter.bucket("www.vinted.nl")
+    assert limiter.bucket("www.vinted.nl") is not limiter.bucket("www.vinted.de")
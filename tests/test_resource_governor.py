@@ -0,0 +1,55 @@
+import resource_governor
+from resource_governor import ResourceGovernor, ScanCheckpoint
+
+
+def governor_at(monkeypatch, rss_mb, limit_mb=1000):
+    monkeypatch.setattr(resource_governor, "process_tree_rss_mb", lambda: rss_mb)
+    return ResourceGovernor(limit_mb=limit_mb, max_navigations=10)
+
+
+def test_page_limit_follows_memory_pressure(monkeypatch):
+    assert governor_at(monkeypatch, 100).page_limit(8) == 8
+    assert governor_at(monkeypatch, 800).page_limit(8) == 4
+    assert governor_at(monkeypatch, 950).page_limit(8) == 1
+
+
+def test_pages_are_recycled_after_max_navigations_or_under_pressure(monkeypatch):
+    calm = governor_at(monkeypatch, 100)
+    assert not calm.should_recycle_page(9)
+    assert calm.should_recycle_page(10)
+
+    assert governor_at(monkeypatch, 800).should_recycle_page(1)
+
+
+def test_set_limit_moves_the_thresholds(monkeypatch):
+    governor = governor_at(monkeypatch, 600)
+    assert governor.pressure() == "ok"
+
+    governor.set_limit(500)
+
+    assert governor.pressure() == "critical"
+
+
+def test_an_interrupted_scan_is_resumed(store):
+    first = ScanCheckpoint(store, "nl")
+    first.page_read(3)
+
+    second = ScanCheckpoint(store, "nl")
+    assert second.resume_pages == 3
+    second.complete()
+
+    assert ScanCheckpoint(store, "nl").resume_pages == 0
+
+
+def test_resuming_stops_after_max_resumes(store):
+    for expected in (0, 4, 4, 0):
+        checkpoint = ScanCheckpoint(store, max_resumes=2)
+        assert checkpoint.resume_pages == expected
+        checkpoint.page_read(4)
+
+
+def test_scanners_keep_separate_checkpoints(store):
+    ScanCheckpoint(store, "nl", scanner="monitor").page_read(5)
+
+    assert ScanCheckpoint(store, "nl", scanner="scan").resume_pages == 0
+    assert ScanCheckpoint(store, "nl", scanner="monitor").resume_pages == 5
@@ -0,0 +1,62 @@
+import os
+import time
+
+import scan_archive
+from scan_archive import ScanArchive, day_of
+
+DAY = 86400
+
+
+def test_day_of_is_utc():
+    assert day_of(0) == "1970-01-01"
+
+
+def test_flush_writes_one_file_per_day_and_read_prunes_by_day(tmp_path):
+    now = time.time()
+    archive = ScanArchive(root=str(tmp_path))
+    archive.append(1, "anna", now - 3 * DAY, now, size="M", product_id=1234567, matched=True)
+    archive.append(2, "bob", None, now - DAY)
+    archive.append(3, "anna", now, now)
+
+    assert archive.flush() == 3
+    assert archive.flush() == 0
+    assert archive.days() == sorted({day_of(now - 3 * DAY), day_of(now - DAY), day_of(now)})
+
+    everything = archive.read()
+    assert sorted(everything.column("item_id").to_pylist()) == ["1", "2", "3"]
+    assert everything.column("product_id").to_pylist()[everything.column("item_id").to_pylist().index("1")] == "1234567"
+
+    recent = archive.read(since=now - DAY / 2, columns=("item_id", "seller"))
+    assert recent.column_names == ["item_id", "seller"]
+    assert recent.column("item_id").to_pylist() == ["3"]
+
+
+def test_flush_is_due_after_flush_rows(tmp_path):
+    archive = ScanArchive(root=str(tmp_path), flush_rows=2)
+    archive.append(1, "anna", None, time.time())
+    assert not archive.flush_due()
+    archive.append(2, "anna", None, time.time())
+    assert archive.flush_due()
+
+
+def test_maintain_drops_expired_days_and_compacts_finished_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(scan_archive, "ARCHIVE_COMPACT_FILES", 2)
+    now = time.time()
+    archive = ScanArchive(root=str(tmp_path), retention_days=10)
+    archive.append(1, "anna", now - 20 * DAY, now)
+    # The third file of a finished day exceeds the limit, so that flush compacts the day
+    for item_id in range(2, 5):
+        archive.append(item_id, "anna", now - 2 * DAY, now)
+        archive.flush()
+
+    yesterday = os.path.join(str(tmp_path), f"day={day_of(now - 2 * DAY)}")
+    assert archive.days() == [day_of(now - 2 * DAY)]
+    assert len(os.listdir(yesterday)) == 1
+    assert sorted(archive.read().column("item_id").to_pylist()) == ["2", "3", "4"]
+
+
+def test_read_of_an_empty_archive_has_the_schema(tmp_path):
+    table = ScanArchive(root=str(tmp_path)).read(columns=("item_id", "uploaded_at"))
+
+    assert table.num_rows == 0
+    assert table.column_names == ["item_id", "uploaded_at"]
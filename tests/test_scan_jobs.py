@@ -0,0 +1,23 @@
+import asyncio
+
+import scan_jobs
+from scan_jobs import ScanJob, _run_job
+
+
+def test_finished_job_keeps_the_returned_matches(monkeypatch):
+    async def fake_scan(on_event=None, **kwargs):
+        match = {"item_id": "1", "seller_name": "anna", "screenshot_path": "shot.jpg"}
+        on_event("match", match)
+        # Signals completed after the scan only exist on the returned list
+        match.update(shared_photo_sellers=["bob"], shared_photo_items=["2"])
+        return [match]
+
+    monkeypatch.setattr(scan_jobs, "capture_newest_vinted_item_screenshot", fake_scan)
+    job = ScanJob()
+    asyncio.run(_run_job(job))
+
+    assert job.status == "done"
+    assert job.matches == [{"item_id": "1", "seller_name": "anna", "screenshot_path": "shot.jpg",
+                            "shared_photo_sellers": ["bob"], "shared_photo_items": ["2"]}]
+    # The streamed event keeps what was known when it was sent
+    assert "shared_photo_sellers" not in job.events[0]["data"]
@@ -0,0 +1,74 @@
+import io
+import os
+import time
+
+import pytest
+
+import screenshot_store
+from screenshot_store import LocalBackend, ScreenshotStore, encode_screenshot
+
+
+def write(root, name, age_seconds, size=100):
+    path = os.path.join(root, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    modified = time.time() - age_seconds
+    os.utime(path, (modified, modified))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def no_reference_sources(monkeypatch):
+    monkeypatch.setattr(screenshot_store, "_reference_sources", [])
+
+
+def test_fresh_captures_are_reused(tmp_path):
+    store = ScreenshotStore(LocalBackend(str(tmp_path)), image_format="webp", fresh_seconds=3600)
+    write(str(tmp_path), store.key_for("1"), age_seconds=60)
+    write(str(tmp_path), store.key_for("2"), age_seconds=7200)
+
+    assert store.fresh("1") == os.path.join(str(tmp_path), store.key_for("1"))
+    assert store.fresh("2") is None
+    assert store.fresh("3") is None
+
+
+def test_evict_removes_expired_then_oldest_over_the_size_cap(tmp_path):
+    root = str(tmp_path)
+    store = ScreenshotStore(LocalBackend(root), image_format="webp", ttl_seconds=86400, max_store_bytes=250)
+    write(root, store.key_for("expired"), age_seconds=2 * 86400)
+    write(root, store.key_for("old"), age_seconds=300)
+    write(root, store.key_for("mid"), age_seconds=200)
+    write(root, store.key_for("new"), age_seconds=100)
+
+    assert store.evict() == 2
+    assert sorted(os.listdir(root)) == sorted([store.key_for("mid"), store.key_for("new")])
+
+
+def test_evict_leaves_foreign_and_referenced_files(tmp_path):
+    root = str(tmp_path)
+    store = ScreenshotStore(LocalBackend(root), image_format="webp", ttl_seconds=60)
+    # A capture from before the store and an unrelated file in the same directory
+    write(root, "vinted_item_1768320939.png", age_seconds=86400)
+    write(root, "error_1768320889.png", age_seconds=86400)
+    held_by_job = write(root, store.key_for("job"), age_seconds=86400)
+    held_by_scan = write(root, store.key_for("scan"), age_seconds=86400)
+    write(root, store.key_for("stale"), age_seconds=86400)
+    screenshot_store.register_reference_source(lambda: [held_by_job, None])
+
+    assert store.evict(keep=[held_by_scan]) == 1
+    assert not os.path.exists(os.path.join(root, store.key_for("stale")))
+    assert len(os.listdir(root)) == 4
+
+
+def test_encode_downscales_and_fits_the_byte_cap():
+    from PIL import Image
+
+    png = io.BytesIO()
+    Image.effect_noise((2000, 1000), 64).convert("RGB").save(png, "PNG")
+
+    data = encode_screenshot(png.getvalue(), "jpg", quality=95, max_width=800, max_bytes=100 * 1024)
+
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.format == "JPEG"
+        assert image.size == (800, 400)
+    assert len(data) <= 100 * 1024
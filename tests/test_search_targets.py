@@ -0,0 +1,30 @@
+import json
+
+from search_targets import DEFAULT_MATCH_THRESHOLD, SearchTarget, clean_search_url, load_search_targets
+
+
+def test_clean_search_url_drops_stale_parameters_and_orders_newest_first():
+    url = clean_search_url("https://www.vinted.nl/catalog?brand_ids[]=1&time=123&search_by_image_uuid=&order=relevance")
+
+    assert url == "https://www.vinted.nl/catalog?brand_ids%5B%5D=1&order=newest_first"
+
+
+def test_target_from_filters():
+    target = SearchTarget.from_dict({"domain": "www.vinted.be", "brand_ids": [40883], "status_ids": [6, 1],
+                                     "keyword": "Costes"}, index=1)
+
+    assert target.name == "search2"
+    assert target.domain == "www.vinted.be"
+    assert target.keyword == "costes"
+    assert target.match_threshold == DEFAULT_MATCH_THRESHOLD
+    assert "status_ids%5B%5D=6&status_ids%5B%5D=1&brand_ids%5B%5D=40883" in target.url
+
+
+def test_load_search_targets_falls_back_to_the_search_url_on_bad_config():
+    config = {"VINTED_SEARCH_TARGETS": json.dumps([{"name": "a"}, {"name": "a"}]),
+              "VINTED_SEARCH_URL": "https://www.vinted.nl/catalog?brand_ids[]=1"}
+
+    targets = load_search_targets(config)
+
+    assert [target.name for target in targets] == ["default"]
+    assert targets[0].url == "https://www.vinted.nl/catalog?brand_ids%5B%5D=1&order=newest_first"
@@ -0,0 +1,90 @@
+import time
+
+import numpy as np
+
+from scan_archive import ScanArchive
+from seller_analytics import DetectionRule, SellerAnalytics, velocity
+
+NOW = 1_800_000_000.0
+HOUR = 3600
+
+
+def test_window_table_counts_every_window_in_one_pass():
+    analytics = SellerAnalytics()
+    ages = {"anna": [0.5, 2, 30, 200, 800], "bob": [10, 10 * 24]}
+    rows = [(seller, age) for seller, seller_ages in ages.items() for age in seller_ages]
+    analytics._add_rows([str(i) for i in range(len(rows))], [seller for seller, _ in rows],
+                        [NOW - age * HOUR for _, age in rows])
+
+    table = analytics.window_table(now=NOW)
+
+    # Columns: 1h, 24h, 7d, 30d; the 800h item is past 30 days
+    assert table[analytics.seller_codes["anna"]].tolist() == [1, 2, 3, 4]
+    assert table[analytics.seller_codes["bob"]].tolist() == [0, 1, 1, 2]
+
+
+def test_add_rows_skips_ids_already_loaded():
+    analytics = SellerAnalytics()
+    assert analytics._add_rows(["1", "2", "2"], ["anna"] * 3, [NOW] * 3) == 2
+    assert analytics._add_rows(["2", "3"], ["anna"] * 2, [NOW] * 2) == 1
+    assert analytics.size == 3
+
+
+def test_seller_windows_include_items_added_since_the_last_refresh():
+    analytics = SellerAnalytics()
+    analytics.refresh()
+    now = time.time()
+
+    assert analytics.add("1", "anna", now - 60)
+    assert analytics.add("2", "anna", now - 3 * 24 * HOUR)
+    assert not analytics.add("1", "anna", now - 60)
+
+    assert analytics.seller_windows("anna", now=now) == {"1h": 1, "24h": 1, "7d": 2, "30d": 2}
+    assert analytics.seller_windows("nobody", now=now) == {"1h": 0, "24h": 0, "7d": 0, "30d": 0}
+
+
+def test_refresh_merges_the_archive_and_the_sqlite_history(store, tmp_path):
+    now = time.time()
+    archive = ScanArchive(root=str(tmp_path / "archive"))
+    archive.append("1", "anna", now - 5 * 24 * HOUR, now - 5 * 24 * HOUR)
+    archive.append("2", "anna", None, now - 2 * HOUR)
+    archive.flush()
+    store.add_seller_item("anna", "https://www.vinted.nl/items/2", now - 2 * HOUR)
+    store.add_seller_item("anna", "https://www.vinted.nl/items/3", now - HOUR / 2)
+
+    analytics = SellerAnalytics(archive)
+    analytics.refresh(store)
+
+    assert analytics.size == 3
+    assert analytics.seller_windows("anna") == {"1h": 1, "24h": 2, "7d": 3, "30d": 3}
+
+
+def test_top_sellers_by_window_and_velocity():
+    analytics = SellerAnalytics()
+    now = time.time()
+    # anna: 3 today and nothing before; bob: 4 today but 60 in the month
+    times = [now - HOUR] * 3 + [now - HOUR] * 4 + [now - 10 * 24 * HOUR] * 56
+    sellers = ["anna"] * 3 + ["bob"] * 60
+    analytics._add_rows([str(i) for i in range(len(times))], sellers, times)
+
+    assert [row["seller"] for row in analytics.top_sellers(by="24h")] == ["bob", "anna"]
+    assert [row["seller"] for row in analytics.top_sellers(by="velocity")] == ["anna", "bob"]
+
+
+def test_velocity_compares_today_with_the_monthly_average():
+    assert velocity(3, 0) == 3
+    assert velocity(6, 60) == 3
+    assert np.isclose(velocity(1, 300), 0.1)
+
+
+def test_detection_rule_reports_every_window_that_reached_its_minimum():
+    rule = DetectionRule(min_24h=3, min_1h=0, min_7d=10, min_30d=0, min_velocity=0)
+
+    assert rule.reasons({"1h": 1, "24h": 3, "7d": 12, "30d": 12}) == ["24h>=3", "7d>=10"]
+    assert rule.reasons({"1h": 1, "24h": 2, "7d": 9, "30d": 40}) == []
+
+
+def test_longer_windows_are_opt_in():
+    rule = DetectionRule(min_24h=3)
+
+    assert rule.reasons({"1h": 0, "24h": 2, "7d": 50, "30d": 200}, velocity_score=10) == []
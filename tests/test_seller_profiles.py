@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+
+from item_extractor import build_item_record
+from search_targets import SearchTarget
+from seller_profiles import SellerProfileCache, member_id, parse_listing
+
+BASE_URL = "https://www.vinted.nl"
+
+
+def wardrobe_item(item_id, age_hours=1, **fields):
+    return dict({"id": item_id, "title": "Costes top", "brand_title": "Costes",
+                 "created_at_ts": time.time() - age_hours * 3600, "url": f"/items/{item_id}-costes-top"}, **fields)
+
+
+def profile_of(items):
+    profile = {"listings": {}}
+    for item in items:
+        item_id, url, raw = parse_listing(item, BASE_URL)
+        record = build_item_record(url, raw)
+        profile["listings"][item_id] = (url, record, f"{raw['brand']} {record.title}".lower(),
+                                        (raw["statusId"], raw["brandId"]))
+    return profile
+
+
+def test_member_id():
+    assert member_id("https://www.vinted.nl/member/123-anna") == "123"
+    assert member_id("https://www.vinted.nl/items/123") is None
+
+
+def test_parse_listing_reads_status_and_brand():
+    _, url, raw = parse_listing(wardrobe_item(1, status="Nieuw met prijskaartje", brand_id=40883), BASE_URL)
+
+    assert url == "https://www.vinted.nl/items/1-costes-top"
+    assert (raw["statusId"], raw["brandId"]) == ("6", "40883")
+    assert parse_listing(wardrobe_item(2, status_id=2, brand={"id": 5}), BASE_URL)[2]["statusId"] == "2"
+    assert parse_listing({"id": 3, "title": "no time"}, BASE_URL) is None
+
+
+def test_target_filters_come_from_the_search_url():
+    target = SearchTarget.from_dict({"brand_ids": [40883], "status_ids": [6, 1]})
+
+    assert target.status_ids == ("6", "1")
+    assert target.brand_ids == ("40883",)
+
+
+def test_recent_listings_apply_keyword_window_status_and_brand():
+    profile = profile_of([
+        wardrobe_item(1, status="Nieuw met prijskaartje", brand_id=40883),
+        wardrobe_item(2, status="Zeer goed", brand_id=40883),
+        wardrobe_item(3, status="Nieuw met prijskaartje", brand_id=1),
+        wardrobe_item(4, brand_id=40883),
+        wardrobe_item(5, age_hours=30, status="Nieuw met prijskaartje", brand_id=40883),
+        wardrobe_item(6, status="Nieuw met prijskaartje", brand_id=40883, title="Jurk", brand_title="Zara"),
+    ])
+    cache = SellerProfileCache()
+
+    filtered = cache.recent_listings(profile, "costes", ("6",), ("40883",))
+    unfiltered = cache.recent_listings(profile, "costes")
+
+    assert [url for url, _ in filtered] == ["https://www.vinted.nl/items/1-costes-top"]
+    assert len(unfiltered) == 4
+    assert cache.recent_listings(None, "costes") == []
+
+
+def test_cancelled_fetch_releases_the_waiting_items():
+    cache = SellerProfileCache()
+    started = asyncio.Event()
+
+    async def hanging_fetch(fetcher, seller_name, seller_url):
+        started.set()
+        await asyncio.sleep(3600)
+
+    cache._fetch = hanging_fetch
+    seller_url = f"{BASE_URL}/member/42-anna"
+
+    async def main():
+        first = asyncio.create_task(cache.load(None, "anna", seller_url))
+        await started.wait()
+        second = asyncio.create_task(cache.load(None, "anna", seller_url))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        # The second item goes on without a profile instead of waiting forever
+        assert await asyncio.wait_for(second, timeout=1) is None
+        assert seller_url not in cache.loading
+
+    asyncio.run(main())
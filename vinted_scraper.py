@@ -1,8 +1,27 @@
 import asyncio
 import os
+import threading
 import time
 import re
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from playwright.async_api import async_playwright
+from catalog_grid import harvest_grid
+from history_store import HistoryStore
+from http_extractor import HTTP_CONCURRENCY, HTTP_FIRST_ENABLED, HttpItemFetcher
+from item_extractor import extract_item_record
+from photo_index import PHOTO_HASHING_ENABLED, PhotoHasher, get_photo_index
+from rate_control import BlockedError, goto, is_timeout
+from readiness import race_selectors, selector_race, wait_for_visual_ready
+from resource_governor import ScanCheckpoint, get_resource_governor
+from resource_policy import ResourceStats, apply_lean_policy, apply_full_policy
+from scan_archive import get_scan_archive
+from scan_metrics import count, finish_run, span, start_run
+from screenshot_store import get_screenshot_store, register_reference_source
+from search_targets import DEFAULT_MATCH_THRESHOLD, SearchTarget, clean_search_url, load_search_targets
+from seller_analytics import DetectionRule, get_seller_analytics, velocity
+from seller_profiles import SELLER_PROFILES_ENABLED, get_seller_profiles
+from shard_pool import SCAN_SHARDS, ShardPool
 try:
     from playwright_stealth import stealth_async
 except ImportError:
@@ -15,7 +34,27 @@ except ImportError:
         async def stealth_async(page):
             pass
 
-VINTED_SEARCH_URL = "https://www.vinted.nl/catalog?status_ids%5B%5D=6&page=1&time=1768305966&brand_ids%5B%5D=40883&search_by_image_uuid=&order=newest_first"
+# Both can be overridden, e.g. to point the scraper at the local benchmark fixture server.
+# Several searches are configured with VINTED_SEARCH_TARGETS (see search_targets.py).
+VINTED_BASE_URL = os.getenv("VINTED_BASE_URL", "https://www.vinted.nl")
+VINTED_SEARCH_URL = clean_search_url(os.getenv("VINTED_SEARCH_URL", f"{VINTED_BASE_URL}/catalog?status_ids%5B%5D=6&page=1&brand_ids%5B%5D=40883&order=newest_first"))
+
+# Number of item pages scanned in parallel (one browser, one context, N pages)
+SCAN_CONCURRENCY = int(os.getenv("VINTED_SCAN_CONCURRENCY", "4"))
+
+# Number of pages rendering screenshots while the scan is still running
+SCREENSHOT_CONCURRENCY = int(os.getenv("VINTED_SCREENSHOT_CONCURRENCY", "2"))
+
+# Maximum number of catalog pages walked per scan
+CATALOG_MAX_PAGES = int(os.getenv("VINTED_CATALOG_MAX_PAGES", "10"))
+
+# Number of configured searches scanned at the same time
+TARGET_CONCURRENCY = int(os.getenv("VINTED_TARGET_CONCURRENCY", "3"))
+
+# Seconds between monitor passes; 0 disables the background monitor
+MONITOR_INTERVAL = int(os.getenv("VINTED_MONITOR_INTERVAL", "0"))
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
 
 
 async def check_is_within_24h(page):
@@ -23,156 +62,68 @@ async def check_is_within_24h(page):
     Checks if the item was uploaded within the last 24 hours.
     Returns:
         (bool, str): (is_within_24h, time_text)
-        is_within_24h is True if < 24h, False if > 24h, None if undetermined.
     """
     try:
-        # Search in the details list for "Geplaatst" or "Uploaded"
-        # The structure is usually .details-list__item containing title and value
-        details_text = await page.locator('.details-list__item').all_inner_texts()
-        
-        time_text = "Unknown"
-        
-        # Look for the line containing the timestamp
-        found_timestamp = False
-        for text in details_text:
-            if "Geplaatst" in text or "Uploaded" in text:
-                # The text usually looks like "Geplaatst\n1 uur geleden"
-                # We normalize it
-                lines = text.split('\n')
-                for line in lines:
-                    line_lower = line.lower().strip()
-                    # Check for time indicators
-                    if any(x in line_lower for x in ['zojuist', 'just now', 'minu', 'uur', 'hour', 'ind', 'sec']):
-                         time_text = line.strip()
-                         found_timestamp = True
-                         break
-                    if 'dag' in line_lower or 'day' in line_lower:
-                         time_text = line.strip()
-                         found_timestamp = True
-                         break
-            if found_timestamp:
-                break
-        
-        print(f"Detected upload time: {time_text}")
-        
-        if not found_timestamp:
-            print("Warning: Could not find specific timestamp, assuming within 24h to be safe.")
-            return True, "Unknown"
-
-        time_lower = time_text.lower()
-        
-        # Logic for < 24h
-        # "zojuist", "seconden", "minuten", "uur" (hours) -> Keep
-        if any(x in time_lower for x in ['zojuist', 'just now', 'sec', 'min', 'uur', 'hour']):
-            return True, time_text
-        
-        # "dag", "days" -> Stop (older than 24h)
-        # Vinted switches to "1 dag geleden" after 24h
-        if 'dag' in time_lower or 'day' in time_lower:
-            return False, time_text
-            
-        return True, time_text # Default keep if unsure
-
+        record = await extract_item_record(page, seller_wait_ms=0)
+        print(f"Detected upload time: {record.time_text}")
+        return record.is_within_24h, record.time_text
     except Exception as e:
         print(f"Error checking time: {e}")
         return True, "Error" # Fail open
 
-import json
-
-HISTORY_FILE = "seller_history.json"
-
-def load_seller_history():
-    """Loads the seller history from a JSON file."""
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading history: {e}")
-    return {"sellers": {}}
-
-def save_seller_history(history):
-    """Saves the seller history to a JSON file."""
-    try:
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=4)
-    except Exception as e:
-        print(f"Error saving history: {e}")
+def cache_scan_result(store, result, search=None, scope=None):
+    """
+    Records that search listed the item, advances the high-water mark of scope and stores a
+    freshly scanned, successful result in the item cache.
+    """
+    item_id = extract_item_id(result["url"])
+    if not item_id:
+        return
+    # Items that were blocked or failed are not covered yet and must be retried next run
+    if result["status"] not in ("ok", "too_old", "no_seller"):
+        return
+    store.advance_high_water_mark(item_id, scope)
+    if search:
+        store.tag_item_search(item_id, search)
+    if result["status"] != "ok" or result.get("cached") or result.get("shared"):
+        return
+    record = result["record"]
+    store.put_scanned_item(item_id, {
+        "url": result["url"],
+        "time_text": result["time_text"],
+        "uploaded_at": record.uploaded_at if record else None,
+        "scanned_at": time.time(),
+        "details": result["details"],
+        "seller_name": result["seller_name"],
+        "seller_url": result["seller_url"],
+    })
 
-def cleanup_seller_history(history):
-    """Removes items older than 24 hours from the history."""
-    now = time.time()
-    cutoff = now - (24 * 3600)
-    
-    new_sellers = {}
-    for seller, items in history.get("sellers", {}).items():
-        # Keep only items added within the last 24h
-        valid_items = [item for item in items if item.get("added_at", 0) > cutoff]
-        if valid_items:
-            new_sellers[seller] = valid_items
-            
-    history["sellers"] = new_sellers
-    return history
+def cached_scan_result(store, product_url):
+    """Rebuilds a scan result from the item cache, or returns None if the item is not cached."""
+    entry = store.get_scanned_item(extract_item_id(product_url) or "")
+    if not entry:
+        return None
+    uploaded_at = entry.get("uploaded_at")
+    is_fresh = uploaded_at is None or time.time() - uploaded_at < 24 * 3600
+    return {
+        "url": product_url,
+        "status": "ok" if is_fresh else "too_old",
+        "time_text": entry["time_text"],
+        "details": entry["details"],
+        "seller_name": entry["seller_name"],
+        "seller_url": entry["seller_url"],
+        "record": None,
+        "cached": True,
+    }
 
 async def get_seller_info(page):
     """
     Extracts the seller's username and profile URL from the product page.
     Returns: (name, url)
     """
-    seller_name = None
-    seller_url = None
     try:
-        # Strategy 1: Specific data-testid (Reliable but potentially delayed)
-        # Wait a bit for the element to be present
-        selectors = [
-            '[data-testid="profile-username"]',
-            '[data-testid="item-owner-name"]',
-            '.seller-details__name',
-            'a[href*="/member/"]'
-        ]
-        
-        for selector in selectors:
-            try:
-                # Use a short wait to ensure JS has rendered the name
-                el = page.locator(selector).first
-                await el.wait_for(state="visible", timeout=3000)
-                
-                # Check if it's a link to get URL
-                href = await el.get_attribute('href')
-                if not href:
-                    # Look for parent link or link inside
-                    link_el = page.locator(f'a:has({selector}), {selector} a').first
-                    if await link_el.count() > 0:
-                        href = await link_el.get_attribute('href')
-
-                if href:
-                    seller_url = f"https://www.vinted.nl{href}" if href.startswith('/') else href
-
-                name = await el.inner_text()
-                if name and len(name.strip()) > 1:
-                    # Clean up: sometimes it has reviews or " (90)"
-                    seller_name = name.splitlines()[0].split('(')[0].strip()
-                    if seller_name and seller_url:
-                        return seller_name, seller_url
-            except:
-                continue
-        
-        # Strategy 2: Extract from profile link URL specifically
-        profile_links = await page.locator('a[href*="/member/"]').all()
-        for link in profile_links:
-            href = await link.get_attribute('href')
-            if href and "signup" not in href and "login" not in href:
-                seller_url = f"https://www.vinted.nl{href}" if href.startswith('/') else href
-                parts = href.strip('/').split('/')
-                if len(parts) >= 2 and parts[0] == 'member':
-                    member_part = parts[1]
-                    if '-' in member_part:
-                        seller_name = member_part.split('-', 1)[1]
-                    else:
-                        seller_name = member_part
-                    return seller_name, seller_url
-
-        return seller_name, seller_url
+        record = await extract_item_record(page)
+        return record.seller_name, record.seller_url
     except Exception as e:
         print(f"Error extracting seller info: {e}")
         return None, None
@@ -181,278 +132,1002 @@ async def get_item_details(page):
     """
     Extracts Size, Color and Product ID (if available) from the item page.
     """
-    details = {
-        "size": "Onbekend",
-        "color": "Onbekend",
-        "product_id": "Onbekend"
+    try:
+        record = await extract_item_record(page, seller_wait_ms=0)
+        return record.details()
+    except Exception as e:
+        print(f"Error in get_item_details: {e}")
+        return {"size": "Onbekend", "color": "Onbekend", "product_id": "Onbekend"}
+
+def extract_item_id(product_url):
+    """Returns the Vinted item ID from an /items/<id>-... URL, or None."""
+    match = re.search(r'/items/(\d+)', product_url)
+    return match.group(1) if match else None
+
+def new_scan_result(product_url):
+    return {
+        "url": product_url,
+        "status": "ok",
+        "time_text": None,
+        "details": None,
+        "seller_name": None,
+        "seller_url": None,
+        "record": None,
     }
+
+def apply_item_record(result, record):
+    """Fills a scan result from an ItemRecord and sets its status (ok, too_old or no_seller)."""
+    result["record"] = record
+    result["time_text"] = record.time_text
+    if not record.is_within_24h:
+        result["status"] = "too_old"
+        return result
+
+    result["details"] = record.details()
+    if not record.seller_name:
+        result["status"] = "no_seller"
+        return result
+
+    result["seller_name"] = record.seller_name
+    result["seller_url"] = record.seller_url
+    return result
+
+async def scan_item(page, product_url):
+    """
+    Opens a single item page and extracts upload time, details and seller in one evaluate.
+    Does not touch the seller history, so it is safe to run concurrently.
+    Returns a result dict with a 'status' of ok, too_old, timeout, no_seller or error.
+    """
+    result = new_scan_result(product_url)
     try:
-        # 1. Attributes from the details list
-        # Use a shorter timeout to avoid hanging
+        with span("item_goto"):
+            await goto(page, product_url, wait_until="load")
+
+        try:
+            with span("item_ready_wait"):
+                await page.wait_for_selector('h1, [data-testid="item-description"], .item-attributes', timeout=10000)
+        except:
+            print(f"Page load timeout, skipping {product_url}")
+            count("timeouts")
+            result["status"] = "timeout"
+            return result
+
+        # Extract time, details and seller in one round trip
+        with span("item_extract"):
+            record = await extract_item_record(page)
+        apply_item_record(result, record)
+    except BlockedError as e:
+        print(f"Blocked while opening {product_url}: {e}")
+        count("blocked")
+        result["status"] = "blocked"
+    except Exception as e:
+        print(f"Error processing item {product_url}: {e}")
+        if is_timeout(e):
+            count("timeouts")
+            result["status"] = "timeout"
+        else:
+            count("errors")
+            result["status"] = "error"
+    return result
+
+async def scan_item_http(fetcher, product_url):
+    """
+    Scans an item over plain HTTP without rendering it.
+    Returns the same result dict as scan_item, or None when the page has to be rendered.
+    """
+    record = await fetcher.fetch_record(product_url)
+    if record is None:
+        return None
+    return apply_item_record(new_scan_result(product_url), record)
+
+def commit_scan_result(result, store, threshold=DEFAULT_MATCH_THRESHOLD):
+    """
+    Applies one ok scan result to the seller history and the seller analytics.
+    Returns the match dict (without screenshot yet) if the seller matches the DetectionRule
+    (threshold is its 24h minimum), else None.
+    """
+    product_url = result["url"]
+    seller_name = result["seller_name"]
+    analytics = get_seller_analytics()
+    archive = get_scan_archive()
+    now = time.time()
+
+    # History and analytics both count items by listing time (detection time when unknown)
+    item_id = extract_item_id(product_url)
+    record = result.get("record")
+    uploaded_at = record.uploaded_at if record else None
+    if store.add_seller_item(seller_name, product_url, uploaded_at or now):
+        print(f"Item added to history for {seller_name}.")
+    is_new = analytics.add(item_id or product_url, seller_name, uploaded_at or now)
+
+    # The seller's other recent listings from their profile count without opening them
+    added = 0
+    for url, listed_at in result.get("seller_listings") or ():
+        added += store.add_seller_item(seller_name, url, listed_at)
+        if analytics.add(extract_item_id(url) or url, seller_name, listed_at) and archive:
+            archive.append(extract_item_id(url) or url, seller_name, listed_at, now)
+    if added:
+        print(f"Added {added} listings from the profile of {seller_name}.")
+
+    windows = analytics.seller_windows(seller_name)
+    velocity_score = velocity(windows["24h"], windows["30d"])
+    reasons = DetectionRule(min_24h=threshold).reasons(windows, velocity_score)
+    print(f"Seller '{seller_name}' now has {windows['24h']} items in 24h "
+          f"({windows['1h']} in 1h, {windows['7d']} in 7d, {windows['30d']} in 30d, velocity {velocity_score:.1f}).")
+    # The item's own scan also archives its details when a profile listing archived it bare
+    # first; replays from the cache or another search are already archived
+    if archive and (is_new or not (result.get("cached") or result.get("shared"))):
+        archive.append(item_id or product_url, seller_name, uploaded_at, now, result["details"]["size"],
+                       result["details"]["color"], result["details"]["product_id"], bool(reasons))
+    if not reasons:
+        return None
+
+    item_id = item_id or str(int(now))
+    print(f"Match recorded for {seller_name} ({', '.join(reasons)}).")
+    return {
+        "url": product_url,
+        "screenshot_path": None,
+        "seller_name": seller_name,
+        "seller_url": result["seller_url"],
+        "seller_count": windows["24h"],
+        "seller_windows": windows,
+        "velocity": round(velocity_score, 2),
+        "match_reasons": reasons,
+        "item_id": item_id,
+        "size": result["details"]["size"],
+        "color": result["details"]["color"],
+        "product_id": result["details"]["product_id"],
+        "product_id_valid": result["details"].get("product_id_valid"),
+        "articles": result["details"].get("articles", []),
+    }
+
+class OrderedCommitter:
+    """
+    Applies scan results to the seller history in catalog order while they stream in.
+    Results may be produced out of order by the worker pool; they are buffered until every
+    earlier index has arrived, so the history and the seller_count decision are identical
+    to a serial scan. Everything after the first too-old item is ignored (list is sorted by date).
+    """
+
+    def __init__(self, store, threshold=DEFAULT_MATCH_THRESHOLD):
+        self.store = store
+        self.threshold = threshold
+        self.pending = {}
+        self.next_idx = 0
+        self.stopped = False
+
+    def add(self, idx, result):
+        """Buffers a result and returns the matches that became final because of it."""
+        self.pending[idx] = result
+        matches = []
+        while not self.stopped and self.next_idx in self.pending:
+            current = self.next_idx
+            result = self.pending.pop(current)
+            self.next_idx += 1
+
+            if result["status"] == "too_old":
+                print(f"⛔ Item {current+1} is too old ({result['time_text']}). Ignoring everything after it as list is sorted by date.")
+                self.stopped = True
+                break
+            if result["status"] == "no_seller":
+                print(f"Could not identify seller for {result['url']}. Skipping.")
+                continue
+            if result["status"] != "ok":
+                continue
+
+            match = commit_scan_result(result, self.store, self.threshold)
+            if match:
+                matches.append(match)
+        return matches
+
+def commit_scan_results(results, store, threshold=DEFAULT_MATCH_THRESHOLD):
+    """
+    Applies a complete dict of idx -> scan result to the seller history in catalog order.
+    Returns the list of matches (without screenshots yet).
+    """
+    committer = OrderedCommitter(store, threshold)
+    matches = []
+    for position, idx in enumerate(sorted(results)):
+        matches += committer.add(position, results[idx])
+    return matches
+
+# Candidate containers for the item screenshot, most specific first
+CONTAINER_RACE = selector_race("item_container", [
+    'div[data-testid="item-view"]', '.item-view', '.item-view__main',
+    '.item-main-container', 'main', '.item-content',
+    '[data-testid="item-details"]', '.main-content', '.item-container',
+])
+
+async def take_item_screenshot(page, product_url):
+    """Opens the item page and returns a PNG screenshot of the main item container."""
+    with span("screenshot_goto"):
+        await goto(page, product_url, wait_until="load")
+
+    await page.add_style_tag(content="""
+        header, footer, .sidebar, .ads, #onetrust-banner-sdk, 
+        .is-header-sticky, .notification-manager, 
+        .catalog-filter-modal, .cookie-consent,
+        .details-list__item--seller { display: none !important; }
+        body, html { margin: 0 !important; padding: 0 !important; }
+        .item-view__main, .item-main-container { width: 100% !important; max-width: 100% !important; margin: 0 !important; }
+    """)
+
+    # All candidates race at once; the first one laid out larger than 100x100 wins
+    with span("screenshot_container_lookup"):
+        _, target_element = await race_selectors(page, CONTAINER_RACE, min_size=100)
+
+    with span("screenshot_settle"):
+        if target_element:
+            await target_element.scroll_into_view_if_needed()
+        await wait_for_visual_ready(page, target_element)
+
+    with span("screenshot_capture"):
+        if target_element:
+            return await target_element.screenshot()
+        return await page.screenshot(full_page=False)
+
+async def run_page_pool(context, items, handler, concurrency=SCAN_CONCURRENCY, should_skip=None, page_setup=None, open_pages=True):
+    """
+    Runs handler(page, idx, item) for every item on a bounded pool of pages in one context.
+    items may be a list or an async iterable; in the latter case workers start on the
+    first item while the producer is still yielding the rest.
+    should_skip(idx) is checked before an item is started.
+    page_setup(page) is awaited once per new page (e.g. to install a resource policy).
+    Pages are replaced when the resource governor says so, and fewer of them work at
+    once under memory pressure.
+    With open_pages=False the workers get page=None and borrow pages themselves.
+    Returns a dict idx -> handler result.
+    """
+    queue = asyncio.Queue()
+    if isinstance(items, list):
+        worker_count = max(1, min(concurrency, len(items)))
+    else:
+        worker_count = max(1, concurrency)
+
+    async def producer():
         try:
-            attr_elements = await page.locator('.details-list__item').all()
-            for el in attr_elements:
+            if isinstance(items, list):
+                for idx, item in enumerate(items):
+                    queue.put_nowait((idx, item))
+            else:
+                idx = 0
+                async for item in items:
+                    await queue.put((idx, item))
+                    idx += 1
+        except Exception as e:
+            # Items already queued are still processed
+            print(f"Error while producing work items: {e}")
+        finally:
+            # One sentinel per worker marks the end of the stream
+            for _ in range(worker_count):
+                await queue.put(None)
+
+    results = {}
+    governor = get_resource_governor()
+    busy = {"pages": 0}
+
+    async def open_page():
+        page = await context.new_page()
+        await stealth_async(page)
+        if page_setup:
+            await page_setup(page)
+        return page
+
+    pages = []
+    for _ in range(worker_count):
+        pages.append(await open_page() if open_pages else None)
+
+    async def worker(slot):
+        uses = 0
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            idx, item = entry
+            if should_skip and should_skip(idx):
+                continue
+            if pages[slot] is None:
+                results[idx] = await handler(None, idx, item)
+                continue
+            await governor.wait_for_slot(lambda: busy["pages"], worker_count)
+            busy["pages"] += 1
+            try:
+                results[idx] = await handler(pages[slot], idx, item)
+            finally:
+                busy["pages"] -= 1
+            uses += 1
+            if governor.should_recycle_page(uses):
+                old_page, pages[slot] = pages[slot], None
                 try:
-                    text = await el.inner_text(timeout=5000)
-                    if '\n' in text:
-                        key, value = text.split('\n', 1)
-                        key_l = key.lower()
-                        if 'maat' in key_l or 'size' in key_l:
-                            details["size"] = value.strip()
-                        elif 'kleur' in key_l or 'color' in key_l:
-                            details["color"] = value.strip()
+                    await old_page.close()
                 except:
-                    continue
+                    pass
+                pages[slot] = await open_page()
+                uses = 0
+
+    try:
+        await asyncio.gather(producer(), *(worker(slot) for slot in range(worker_count)))
+    finally:
+        for page in pages:
+            if page is None:
+                continue
+            try:
+                await page.close()
+            except:
+                pass
+    return results
+
+class FallbackPages:
+    """
+    Small pool of pages opened on demand, for HTTP-first workers that need to render
+    an item after all. At most `size` pages exist at once, fewer under memory pressure;
+    pages are replaced when the resource governor says so.
+    """
+
+    def __init__(self, context, size, page_setup=None):
+        self.context = context
+        self.size = size
+        self.page_setup = page_setup
+        self.semaphore = asyncio.Semaphore(size)
+        self.governor = get_resource_governor()
+        self.in_use = 0
+        self.uses = {}
+        self.idle = []
+        self.pages = []
+
+    @asynccontextmanager
+    async def page(self):
+        async with self.semaphore:
+            await self.governor.wait_for_slot(lambda: self.in_use, self.size)
+            self.in_use += 1
+            try:
+                if self.idle:
+                    page = self.idle.pop()
+                else:
+                    page = await self.context.new_page()
+                    await stealth_async(page)
+                    if self.page_setup:
+                        await self.page_setup(page)
+                    self.pages.append(page)
+                    self.uses[page] = 0
+                try:
+                    yield page
+                finally:
+                    self.uses[page] += 1
+                    if self.governor.should_recycle_page(self.uses[page]):
+                        self.pages.remove(page)
+                        del self.uses[page]
+                        try:
+                            await page.close()
+                        except:
+                            pass
+                    else:
+                        self.idle.append(page)
+            finally:
+                self.in_use -= 1
+
+    async def close(self):
+        for page in self.pages:
+            try:
+                await page.close()
+            except:
+                pass
+
+def catalog_page_url(search_url, page_number):
+    """Returns the search URL with its page= parameter set to page_number."""
+    parts = urlsplit(search_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "page"]
+    query.append(("page", str(page_number)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+COOKIE_BUTTONS = re.compile(r"^(Alle toestaan|Accepteren|Accept all|Toestaan)$")
+
+async def accept_cookies(page):
+    """Clicks the cookie consent button if it is shown."""
+    # One locator matches every known button label instead of probing them one by one
+    btn = page.get_by_role("button", name=COOKIE_BUTTONS).first
+    if not await btn.is_visible():
+        return
+    print(f"Accepting cookies with button: {await btn.inner_text()}")
+    await btn.click()
+
+    # Resolves as soon as the banner is gone (immediately if it never existed)
+    try:
+        await page.wait_for_selector('#onetrust-consent-sdk', state='hidden', timeout=3000)
+        print("Cookie banner confirmed hidden")
+    except:
+        print("Cookie banner still visible after accepting")
+
+async def iter_catalog_candidates(page, search_url=VINTED_SEARCH_URL, known_ids=None, stop_event=None, max_pages=CATALOG_MAX_PAGES, high_water_mark=0, keyword="costes", checkpoint=None):
+    """
+    Async generator walking page=1..max_pages of the catalog and yielding the URLs of
+    candidate items mentioning keyword as soon as each page is read.
+    Items in known_ids are not yielded: cached scans are replayed by the caller and the
+    rest (too old, no seller, or counted from a seller profile) were already applied.
+    Paging stops when a page is empty, when stop_event is set (a worker reached the 24h
+    boundary) or after a page that contains an item from known_ids or an item ID at or
+    below high_water_mark (already covered by an earlier run). After an interrupted run
+    (see ScanCheckpoint) known items only stop paging past the pages that run had read.
+    checkpoint.catalog_done is set unless paging stopped because the catalog was blocked.
+    """
+    known_ids = known_ids or set()
+    resume_pages = checkpoint.resume_pages if checkpoint else 0
+    seen = set()
+    for page_number in range(1, max_pages + 1):
+        if stop_event and stop_event.is_set():
+            print("24h boundary reached, stopping catalog paging.")
+            break
+
+        page_url = catalog_page_url(search_url, page_number)
+        print(f"Navigating to {page_url}")
+        try:
+            with span("catalog_page_load", page=page_number):
+                # The grid is in the DOM long before trackers and images settle, so don't wait for networkidle
+                await goto(page, page_url, wait_until="domcontentloaded")
+                await page.wait_for_selector('[data-testid="grid-item"]', timeout=15000)
+        except BlockedError as e:
+            # The checkpoint stays open, so the next run pages past this point again
+            print(f"Catalog page {page_number} blocked, stopping: {e}")
+            return
+        except:
+            print(f"No catalog grid on page {page_number}, stopping.")
+            break
+        count("catalog_pages")
+
+        if page_number == 1:
+            with span("cookie_consent"):
+                await accept_cookies(page)
+
+        reached_known = False
+        new_on_page = 0
+        skipped = 0
+        cards = await harvest_grid(page, keyword)
+        count("grid_candidates", len(cards))
+        for item_id, card in cards.items():
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+            new_on_page += 1
+            if item_id in known_ids:
+                reached_known = True
+                skipped += 1
+                continue
+            if item_id.isdigit() and int(item_id) <= high_water_mark:
+                reached_known = True
+            yield card["url"]
+
+        if skipped:
+            count("grid_known_skipped", skipped)
+        print(f"Catalog page {page_number}: {new_on_page} new candidates ({skipped} already known).")
+        if checkpoint:
+            checkpoint.page_read(page_number)
+        if reached_known and page_number >= resume_pages:
+            print("Reached an item that was already processed, stopping catalog paging.")
+            break
+        if not new_on_page:
+            break
+    if checkpoint:
+        checkpoint.catalog_done = True
+
+async def new_scan_context(browser):
+    """Creates a browser context with the viewport and user agent the scraper uses."""
+    return await browser.new_context(
+        viewport={'width': 1280, 'height': 800},
+        user_agent=USER_AGENT
+    )
+
+async def warm_up_context(context, url=VINTED_SEARCH_URL):
+    """Opens the catalog once in context and accepts cookies, so its later pages start consented."""
+    page = await context.new_page()
+    try:
+        await stealth_async(page)
+        await goto(page, url, wait_until="domcontentloaded")
+        await accept_cookies(page)
+    except Exception as e:
+        print(f"Warning: could not warm up browser context: {e}")
+    finally:
+        await page.close()
+
+async def scan_catalog(context, store, output_dir, concurrency=SCAN_CONCURRENCY, on_event=None, search_url=None):
+    """Runs a single search (search_url, default VINTED_SEARCH_URL). See scan_targets."""
+    target = SearchTarget(name="default", url=clean_search_url(search_url or VINTED_SEARCH_URL))
+    return await scan_targets(context, store, output_dir, [target], concurrency, on_event)
+
+async def scan_targets(context, store, output_dir, targets, concurrency=SCAN_CONCURRENCY, on_event=None, shard_pool=None, scanner="scan"):
+    """
+    Runs one scan of every SearchTarget on an existing browser context: per target, streams
+    catalog candidates into the item workers and applies the results to the history store in
+    catalog order; matches of all targets are screenshotted as soon as they are final.
+    Targets run concurrently (at most TARGET_CONCURRENCY at once) and share the HTTP client,
+    the fallback pages, the per-domain rate budget and the screenshot pool. An item listed by
+    several targets is opened once; the other targets wait for that result.
+    With a running ShardPool, item scans and screenshots run in its worker processes and this
+    context is only used for the catalog; results are still committed here, in catalog order.
+    on_event(kind, data) is called for "item" and "match" events so callers can stream progress.
+    scanner names the caller ("scan" or "monitor") so each keeps its own ScanCheckpoint.
+    Pages are closed afterwards so the context can be reused.
+    """
+    def emit(kind, data):
+        if on_event:
+            try:
+                on_event(kind, data)
+            except Exception as e:
+                print(f"Error in scan event callback: {e}")
+
+    # Only the screenshot step needs fully rendered pages; everything else runs lean
+    resource_stats = ResourceStats()
+
+    async def lean_setup(new_page):
+        await apply_lean_policy(new_page, resource_stats)
+
+    async def full_setup(new_page):
+        await apply_full_policy(new_page, resource_stats)
+
+    # Item pages are fetched over HTTP with the context's cookies; pages are only opened
+    # for items the HTTP response can't answer, and for screenshots
+    http_fetcher = HttpItemFetcher(context, USER_AGENT) if HTTP_FIRST_ENABLED else None
+    fallback_pages = FallbackPages(context, concurrency, lean_setup)
+    # Screenshot pages are opened on demand: reused screenshots need no page at all
+    screenshot_pages = FallbackPages(context, SCREENSHOT_CONCURRENCY, full_setup)
+    screenshots = get_screenshot_store(output_dir)
+    # Photos of newly scanned items are hashed in the background for the shared-photo signal
+    photo_hasher = PhotoHasher(get_photo_index(), USER_AGENT) if PHOTO_HASHING_ENABLED else None
+    # Seller profiles are fetched over the HTTP client, so they need the HTTP-first path
+    profiles = get_seller_profiles() if SELLER_PROFILES_ENABLED and http_fetcher else None
+    archive = get_scan_archive()
+
+    async def flush_archive():
+        with span("archive_flush"):
+            try:
+                archived = await asyncio.to_thread(archive.flush)
+                if archived:
+                    print(f"Archived {archived} items.")
+            except Exception as e:
+                print(f"Error writing the scan archive: {e}")
+
+    # With one search the history is scoped as before; with several, paging stops and
+    # cache replays are scoped to what each search listed itself
+    multi = len(targets) > 1
+    in_flight = {}
+    committed_matches = []
+    matched_ids = set()
+    match_queue = asyncio.Queue()
+    target_slots = asyncio.Semaphore(TARGET_CONCURRENCY)
+
+    def queue_matches(matches, target):
+        for match in matches:
+            # The same item can match in two searches, screenshot it once
+            if match["item_id"] in matched_ids:
+                continue
+            matched_ids.add(match["item_id"])
+            match["search"] = target.name
+            count("items_matched")
+            committed_matches.append(match)
+            match_queue.put_nowait(match)
+
+    async def scan_one(worker_page, product_url):
+        result = cached_scan_result(store, product_url)
+        if result is not None:
+            return result
+        record = profiles.record_for(extract_item_id(product_url)) if profiles else None
+        if record is not None:
+            # Listed in a seller profile fetched earlier: no page load needed
+            count("items_from_profile")
+            return dict(apply_item_record(new_scan_result(product_url), record), profile=True)
+        if shard_pool:
+            return await shard_pool.scan(product_url)
+        if http_fetcher:
+            # Plain HTTP first; render the page only when the response can't be parsed
+            result = await scan_item_http(http_fetcher, product_url)
+            if result is not None:
+                count("http_fast_path")
+                return result
+            count("http_fallbacks")
+            async with fallback_pages.page() as fallback_page:
+                return await scan_item(fallback_page, product_url)
+        return await scan_item(worker_page, product_url)
+
+    async def scan_shared(worker_page, product_url):
+        """Scans an item once per run, however many searches list it."""
+        item_id = extract_item_id(product_url) or product_url
+        if item_id in in_flight:
+            count("items_deduplicated")
+            return dict(await in_flight[item_id], shared=True)
+        future = asyncio.get_running_loop().create_future()
+        in_flight[item_id] = future
+        try:
+            result = await scan_one(worker_page, product_url)
         except Exception as e:
-            print(f"Warning: Could not extract attributes: {e}")
+            print(f"Error processing item {product_url}: {e}")
+            result = dict(new_scan_result(product_url), status="error")
+        future.set_result(result)
+        return result
 
-        # 2. Try to find Product ID/Article Code in description
+    async def scan_target(target):
+        scope = target.name if multi else None
+        catalog_page = await context.new_page()
+        await stealth_async(catalog_page)
+        await lean_setup(catalog_page)
         try:
-            # Check for description
-            desc_loc = page.locator('[data-testid="item-description"]')
-            description = await desc_loc.inner_text(timeout=5000)
-            
-            # Check for title
-            title_loc = page.locator('h1')
-            title = await title_loc.inner_text(timeout=5000)
-            
-            combined_text = f"{title} {description}"
-            
-            # Look for patterns like "Art: 1234567" or just 7-10 digit numbers
-            # Common Costes patterns: 1234567, 1.23.4.5678, or 123456-123
-            potential_ids = re.findall(r'\b\d{7,10}\b|\b\d{6}-\d{3}\b', combined_text)
-            if potential_ids:
-                details["product_id"] = potential_ids[0]
+            # Stream candidate URLs from the catalog straight into the item workers.
+            # The list is sorted by date, so once an item is too old every later item is too:
+            # workers skip queued items past the earliest boundary and the producer stops paging.
+            # Known items never enter the worker pool; cached ones are replayed after the scan
+            known_ids = store.known_item_ids(scope)
+            checkpoint = ScanCheckpoint(store, scope, scanner)
+            boundary_reached = asyncio.Event()
+            scan_state = {"stop_at": None}
+            committer = OrderedCommitter(store, target.match_threshold)
+
+            async def scan_handler(worker_page, idx, product_url):
+                # Items scanned by an earlier run are rebuilt from the cache without a page load
+                item_started = time.perf_counter()
+                result = await scan_shared(worker_page, product_url)
+                if profiles and result["status"] == "ok" and result["seller_url"] and not result.get("cached"):
+                    profile = await profiles.load(http_fetcher, result["seller_name"], result["seller_url"])
+                    result = dict(result, seller_listings=profiles.recent_listings(
+                        profile, target.keyword, target.status_ids, target.brand_ids))
+                with span("store_write"):
+                    cache_scan_result(store, result, target.name, scope)
+                if photo_hasher and result["status"] == "ok" and result["record"] and not result.get("shared"):
+                    photo_hasher.submit(extract_item_id(product_url), result["seller_name"], result["record"].photo_urls)
+                if result.get("cached"):
+                    count("items_cached")
+                elif not result.get("shared") and not result.get("profile"):
+                    count("items_scanned")
+                elapsed_ms = (time.perf_counter() - item_started) * 1000
+                status = result["status"]
+                if status in ("too_old", "no_seller"):
+                    count("items_skipped")
+                extract_ms = result["record"].extract_ms if result["record"] else 0
+                print(f"[{target.name} {idx+1}] {status}: {product_url} ({result['time_text']}, extracted in {extract_ms:.0f}ms)")
+                if status == "too_old" and (scan_state["stop_at"] is None or idx < scan_state["stop_at"]):
+                    scan_state["stop_at"] = idx
+                    boundary_reached.set()
+                emit("item", {"index": idx, "url": product_url, "status": status, "search": target.name,
+                              "cached": bool(result.get("cached") or result.get("shared") or result.get("profile")), "elapsed_ms": elapsed_ms})
+                queue_matches(committer.add(idx, result), target)
+                # Written as the scan goes, so a killed run loses at most one batch
+                if archive and archive.flush_due():
+                    await flush_archive()
+                return result
+
+            def past_boundary(idx):
+                return scan_state["stop_at"] is not None and idx > scan_state["stop_at"]
+
+            candidates = iter_catalog_candidates(catalog_page, target.url, known_ids, boundary_reached,
+                                                 target.max_pages, store.high_water_mark(scope), target.keyword, checkpoint)
+            scan_started = time.time()
+            if shard_pool:
+                print(f"Scanning '{target.name}' items from the last 24h on {shard_pool.shards} shard processes...")
+                results = await run_page_pool(context, candidates, scan_handler, shard_pool.capacity, should_skip=past_boundary, open_pages=False)
+            elif http_fetcher:
+                print(f"Scanning '{target.name}' items from the last 24h with {HTTP_CONCURRENCY} HTTP workers ({concurrency} fallback pages)...")
+                results = await run_page_pool(context, candidates, scan_handler, HTTP_CONCURRENCY, should_skip=past_boundary, open_pages=False)
             else:
-                # Check for dotted format
-                dotted_ids = re.findall(r'\b\d\.\d{2}\.\d\.\d{4}\b', combined_text)
-                if dotted_ids:
-                    details["product_id"] = dotted_ids[0]
+                print(f"Scanning '{target.name}' items from the last 24h with {concurrency} pages...")
+                results = await run_page_pool(context, candidates, scan_handler, concurrency, should_skip=past_boundary, page_setup=lean_setup)
+            scan_elapsed = max(time.time() - scan_started, 1e-6)
+            opened = sum(1 for result in results.values()
+                         if not result.get("cached") and not result.get("shared") and not result.get("profile"))
+            print(f"[{target.name}] Scanned {len(results)} items ({opened} opened, {len(results) - opened} from cache, seller profiles or other searches) in {scan_elapsed:.1f}s ({len(results) / scan_elapsed:.2f} items/sec).")
+            # Items that failed are not cached; keep the checkpoint open so the next run pages back to them
+            if checkpoint.catalog_done and not any(result["status"] in ("blocked", "timeout", "error") for result in results.values()):
+                checkpoint.complete()
+
+            # Cached items from earlier runs that paging did not reach this time still count,
+            # so matches are rebuilt for the whole 24h window. Higher IDs are newer.
+            with span("replay_cached"):
+                seen_ids = {extract_item_id(result["url"]) for result in results.values()}
+                earlier = [
+                    cached_scan_result(store, entry["url"])
+                    for entry in store.scanned_items_newest_first(scope)
+                    if entry["item_id"] not in seen_ids
+                ]
+                queue_matches(commit_scan_results(dict(enumerate(earlier)), store, target.match_threshold), target)
+            return len(results) + len(earlier)
+        finally:
+            if not catalog_page.is_closed():
+                await catalog_page.close()
+
+    async def scan_target_slot(target):
+        async with target_slots:
+            try:
+                return await scan_target(target)
+            except Exception as e:
+                # One failing search must not take the others down
+                print(f"Error scanning search '{target.name}': {e}")
+                count("search_failures")
+                return 0
+
+    async def scan_phase():
+        try:
+            return sum(await asyncio.gather(*(scan_target_slot(target) for target in targets)))
+        finally:
+            # Ends the screenshot stream
+            match_queue.put_nowait(None)
+
+    async def pending_matches():
+        while True:
+            match = await match_queue.get()
+            if match is None:
+                return
+            yield match
+
+    async def attach_photo_signal(match):
+        # Job results and SSE clients only see the match as emitted
+        if not photo_hasher:
+            return
+        with span("photo_match"):
+            await photo_hasher.flush_item(match["item_id"])
+            match.update(photo_hasher.index.shared_photo_signal(match["item_id"], match["seller_name"]))
+
+    # Screenshot matched items while the scan continues
+    async def screenshot_handler(worker_page, idx, match):
+        # A seller that stays over the threshold matches the same item run after run
+        fresh_path = await screenshots.fresh_async(match["item_id"])
+        if fresh_path:
+            match["screenshot_path"] = fresh_path
+            count("screenshots_reused")
+            await attach_photo_signal(match)
+            emit("match", match)
+            return
+        print(f"Taking screenshot of {match['url']}")
+        try:
+            with span("screenshot"):
+                if shard_pool:
+                    png = await shard_pool.screenshot(match["url"])
+                else:
+                    async with screenshot_pages.page() as page:
+                        png = await take_item_screenshot(page, match["url"])
+            with span("screenshot_encode"):
+                match["screenshot_path"] = await screenshots.save(match["item_id"], png)
+            count("screenshots")
+            await attach_photo_signal(match)
+            emit("match", match)
         except Exception as e:
-            print(f"Warning: Could not extract ID from description: {e}")
+            print(f"Error taking screenshot for {match['url']}: {e}")
+            count("screenshot_errors")
 
-    except Exception as e:
-        print(f"Error in get_item_details: {e}")
-    
-    return details
+    screenshot_workers = SCREENSHOT_CONCURRENCY * (shard_pool.shards if shard_pool else 1)
+    try:
+        scanned_count, _ = await asyncio.gather(
+            scan_phase(),
+            run_page_pool(context, pending_matches(), screenshot_handler, screenshot_workers, open_pages=False),
+        )
+    finally:
+        await fallback_pages.close()
+        await screenshot_pages.close()
+        if http_fetcher:
+            await http_fetcher.close()
+        if photo_hasher:
+            with span("photo_hash_flush"):
+                await photo_hasher.close()
+        if archive:
+            await flush_archive()
 
-async def capture_newest_vinted_item_screenshot(output_dir: str = "vinted_screenshots"):
+    with span("screenshot_evict"):
+        # Screenshots of this run's matches are referenced even before a job or monitor holds them
+        await asyncio.to_thread(screenshots.evict, [match["screenshot_path"] for match in committed_matches])
+    screenshots.report()
+    resource_stats.report()
+    get_resource_governor().report()
+    count("requests_blocked", resource_stats.requests_saved())
+    count("requests_loaded", resource_stats.loaded_requests)
+    count("bytes_loaded", resource_stats.loaded_bytes)
+
+    if not scanned_count:
+        print("No matching items found. Exiting.")
+        return []
+
+    all_matches = [match for match in committed_matches if match["screenshot_path"]]
+    if photo_hasher:
+        # Photos of items scanned after a match was emitted can only be compared now
+        with span("photo_match"):
+            for match in all_matches:
+                match.update(photo_hasher.index.shared_photo_signal(match["item_id"], match["seller_name"]))
+    if not all_matches:
+         print(f"\nScanned all recent items. No seller matched (>= {min(target.match_threshold for target in targets)} items in rolling 24h or the longer-window rules).")
+         return []
+
+    print(f"\nScan complete. Found {len(all_matches)} matches.")
+    return all_matches
+
+async def capture_newest_vinted_item_screenshot(output_dir: str = "vinted_screenshots", concurrency: int = SCAN_CONCURRENCY, browser_service=None, on_event=None, search_url=None, targets=None, shards=SCAN_SHARDS, scanner="scan"):
     """
-    Goes to the Vinted search URL, opens items from the last 24h, and takes a screenshot if seller matches.
+    Goes to the configured Vinted searches, opens items from the last 24h, and takes a screenshot if seller matches.
+    Item pages are scanned by a pool of `concurrency` pages sharing one browser.
+    If a running browser_pool.BrowserService is given, a warm context is leased from it
+    instead of launching a new Chromium.
+    on_event(kind, data) receives "item" and "match" events while the scan runs.
+    targets defaults to load_search_targets(); search_url scans that single URL instead.
+    With shards > 1 item pages are scanned by that many worker processes (see shard_pool.py).
+    scanner identifies the caller for the resume checkpoint ("monitor" for ScanMonitor).
     """
+    if search_url:
+        targets = [SearchTarget(name="default", url=clean_search_url(search_url))]
+    targets = targets or load_search_targets()
+
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # 0. Load and cleanup persistent history
-    history = load_seller_history()
-    history = cleanup_seller_history(history)
-    print(f"Loaded history for {len(history['sellers'])} sellers.")
+    # Spans and counters of this run end up in scan_profiles/run_<id>.json and on /metrics
+    profile = start_run()
 
-    timestamp = int(time.time())
-    # Note: screenshot_path will now be generated per-item to ensure uniqueness
+    # 0. Open persistent history and expire everything outside the rolling 24h window
+    with span("history_load"):
+        store = HistoryStore()
+        store.expire()
+        # Long windows come from the scan archive, which expire() does not touch
+        await asyncio.to_thread(get_seller_analytics().refresh, store)
+    print(f"Loaded history for {store.seller_count_total()} sellers.")
+    print(f"Loaded {store.scanned_item_count()} cached items (high-water mark {store.high_water_mark()}).")
 
-    async with async_playwright() as p:
-        # Launch browser
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            viewport={'width': 1280, 'height': 800},
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-        )
-        page = await context.new_page()
-        
-        # Apply stealth
-        await stealth_async(page)
+    shard_pool = None
+    try:
+        if shards > 1:
+            with span("shard_start"):
+                shard_pool = await ShardPool(shards).start()
 
-        try:
-            # 1. Navigate to URL
-            print(f"Navigating to {VINTED_SEARCH_URL}")
-            await page.goto(VINTED_SEARCH_URL, wait_until="networkidle")
-
-            # 2. Handle Cookies
-            cookie_buttons = ["Alle toestaan", "Accepteren", "Accept all", "Toestaan"]
-            for btn_name in cookie_buttons:
-                btn = page.get_by_role("button", name=btn_name)
-                if await btn.is_visible():
-                    print(f"Accepting cookies with button: {btn_name}")
-                    await btn.click()
-                    await asyncio.sleep(2)
-                    break
-            
-            try:
-                await page.wait_for_selector('#onetrust-consent-sdk', state='hidden', timeout=3000)
-                print("Cookie banner confirmed hidden")
-            except:
-                print("Cookie banner selector not found or already hidden")
-            
-            # 3. Collect candidate item URLs
-            print("Collecting candidate Costes items from search results...")
-            candidate_urls = []
-            grid_items = page.locator('[data-testid="grid-item"]')
-            count = await grid_items.count()
-            print(f"Found {count} items in grid")
-
-            # We collect more items to ensure we verify 24h range
-            max_check = 100 
-            for i in range(min(count, max_check)): 
-                try:
-                    item = grid_items.nth(i)
-                    text = await item.inner_text()
-                    if "costes" not in text.lower():
-                        continue
-                    
-                    link = item.locator('a').first
-                    href = await link.get_attribute('href')
-                    if href:
-                        full_url = f"https://www.vinted.nl{href}" if href.startswith('/') else href
-                        if full_url not in candidate_urls:
-                            candidate_urls.append(full_url)
-                except:
-                    continue
-            
-            print(f"Found {len(candidate_urls)} candidate Costes items to check.")
+        if browser_service:
+            async with browser_service.lease() as context:
+                return await scan_targets(context, store, output_dir, targets, concurrency, on_event, shard_pool, scanner)
 
-            if not candidate_urls:
-                print("No Costes items found. Exiting.")
+        async with async_playwright() as p:
+            # Launch browser
+            with span("browser_launch"):
+                browser = await p.chromium.launch(headless=True)
+                context = await new_scan_context(browser)
+            try:
+                return await scan_targets(context, store, output_dir, targets, concurrency, on_event, shard_pool, scanner)
+            finally:
                 await browser.close()
-                return None, None
-
-            # 4. Iterate through items
-            print(f"Scanning up to {len(candidate_urls)} items from the last 24h...")
-            
-            success_match = False
-            match_count = 0
-            all_matches = []
-
-            for idx, product_url in enumerate(candidate_urls):
-                print(f"\n--- Scanning Item {idx+1}/{len(candidate_urls)} ---")
-                print(f"URL: {product_url}")
-                
-                try:
-                    await page.goto(product_url, wait_until="load")
-                    
-                    try:
-                        await page.wait_for_selector('h1, [data-testid="item-description"], .item-attributes', timeout=10000)
-                    except:
-                        print("Page load timeout, skipping...")
-                        continue
-
-                    # 4.1 Check 24h time limit
-                    is_fresh, time_text = await check_is_within_24h(page)
-                    if not is_fresh:
-                        print(f"⛔ Item is too old ({time_text}). Stopping scan as list is sorted by date.")
-                        break # STOP the loop
-                    
-                    print(f"✓ Item is recent ({time_text}).")
-
-                    # 4.1.b Get extra details
-                    item_details = await get_item_details(page)
-
-                    # 4.2 Get Seller Info
-                    seller_name, seller_url = await get_seller_info(page)
-                    if not seller_name:
-                        print("Could not identify seller. Skipping.")
-                        continue
-                        
-                    print(f"Seller: {seller_name} ({seller_url})")
-                    
-                    # 4.3 Update History
-                    if seller_name not in history["sellers"]:
-                        history["sellers"][seller_name] = []
-                    
-                    # Add current item to history if not exists
-                    exists = any(item["url"] == product_url for item in history["sellers"][seller_name])
-                    if not exists:
-                        history["sellers"][seller_name].append({
-                            "url": product_url,
-                            "added_at": time.time()
-                        })
-                        print(f"Item added to history for {seller_name}.")
-                    
-                    seller_count = len(history["sellers"][seller_name])
-                    print(f"Seller '{seller_name}' now has {seller_count} detected items in rolling 24h.")
-                    
-                    # 4.4 Check Criteria (Total >= 3 items in history)
-                    if seller_count >= 3:
-                        # Generate unique screenshot path for this specific item
-                        item_id = product_url.split('/items/')[1].split('-')[0] if '/items/' in product_url else str(int(time.time()))
-                        current_screenshot_path = os.path.join(output_dir, f"vinted_item_{item_id}.png")
-                        
-                        # Take screenshot
-                        print(f"Taking screenshot: {current_screenshot_path}")
-                        await asyncio.sleep(2)
-                        
-                        await page.add_style_tag(content="""
-                            header, footer, .sidebar, .ads, #onetrust-banner-sdk, 
-                            .is-header-sticky, .notification-manager, 
-                            .catalog-filter-modal, .cookie-consent,
-                            .details-list__item--seller { display: none !important; }
-                            body, html { margin: 0 !important; padding: 0 !important; }
-                            .item-view__main, .item-main-container { width: 100% !important; max-width: 100% !important; margin: 0 !important; }
-                        """)
-                        
-                        target_element = None
-                        container_selectors = [
-                            'div[data-testid="item-view"]', '.item-view', '.item-view__main',
-                            '.item-main-container', 'main', '.item-content',
-                            '[data-testid="item-details"]', '.main-content', '.item-container',
-                        ]
-                        
-                        for selector in container_selectors:
-                            try:
-                                element = await page.wait_for_selector(selector, timeout=2000)
-                                if element:
-                                    box = await element.bounding_box()
-                                    if box and box['width'] > 100 and box['height'] > 100:
-                                        target_element = element
-                                        break
-                            except:
-                                continue
-
-                        if target_element:
-                            await target_element.scroll_into_view_if_needed()
-                            await asyncio.sleep(1)
-                            await target_element.screenshot(path=current_screenshot_path)
-                        else:
-                            await page.screenshot(path=current_screenshot_path, full_page=False)
-
-                        success_match = True
-                        match_count += 1
-                        all_matches.append({
-                            "url": product_url,
-                            "screenshot_path": current_screenshot_path,
-                            "seller_name": seller_name,
-                            "seller_url": seller_url,
-                            "seller_count": seller_count,
-                            "item_id": item_id,
-                            "size": item_details["size"],
-                            "color": item_details["color"],
-                            "product_id": item_details["product_id"]
-                        })
-                        # Continue scanning other items
-                        print(f"Match recorded for {seller_name}. Continuing scan...")
-                    
-                except Exception as e:
-                    print(f"Error processing item {idx}: {e}")
-                    continue
-
-            # Save updated history before exiting
-            save_seller_history(history)
-
-            if not success_match:
-                 print("\nScanned all recent items. No seller found with >= 3 items in rolling 24h.")
-                 await browser.close()
-                 return []
-            
-            print(f"\nScan complete. Found {match_count} matches.")
-            return all_matches
+    except Exception as e:
+        print(f"Error during scraping: {e}")
+        count("scan_failures")
+        raise e
+    finally:
+        if shard_pool:
+            await shard_pool.stop()
+        store.close()
+        finish_run(profile)
+
+class ScanMonitor:
+    """
+    Background monitor: runs an incremental scan pass every `interval` seconds and keeps the
+    resulting match list, so callers can answer from it without waiting for a scan.
+    Passes only open items newer than the previous pass (high-water mark and item cache);
+    the seller history is expired and the 24h matches are rebuilt on every pass.
+    The match list is replaced atomically and can be read from any thread.
+    """
 
+    def __init__(self, interval=MONITOR_INTERVAL, output_dir="vinted_screenshots", browser_service=None):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.browser_service = browser_service
+        self.matches = []
+        self.passes = 0
+        self.pass_running = False
+        self.last_pass_started = None
+        self.last_pass_finished = None
+        self.last_pass_seconds = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._pass_done = threading.Condition()
+
+    async def run_pass(self):
+        self.pass_running = True
+        self.last_pass_started = time.time()
+        try:
+            matches = await capture_newest_vinted_item_screenshot(self.output_dir, browser_service=self.browser_service,
+                                                                 scanner="monitor")
+            self.matches = list(matches)
+            self.last_error = None
         except Exception as e:
-            print(f"Error during scraping: {e}")
-            raise e
+            print(f"Monitor pass failed: {e}")
+            self.last_error = f"{type(e).__name__}: {e}"
         finally:
-            await browser.close()
+            self.pass_running = False
+            self.last_pass_finished = time.time()
+            self.last_pass_seconds = self.last_pass_finished - self.last_pass_started
+            with self._pass_done:
+                self.passes += 1
+                self._pass_done.notify_all()
+
+    async def run(self):
+        """Runs passes until stop() is called. A refresh request starts the next pass early."""
+        print(f"Monitor started, scanning every {self.interval}s.")
+        while not self._stopped.is_set():
+            self._wake.clear()
+            await self.run_pass()
+            print(f"Monitor pass {self.passes} done in {self.last_pass_seconds:.1f}s: {len(self.matches)} matches.")
+            await asyncio.to_thread(self._wake.wait, self.interval)
+        print("Monitor stopped.")
+
+    def refresh(self, timeout=None):
+        """
+        Asks for an incremental pass now and blocks until one that started after this call
+        has finished. Returns True if it finished within timeout.
+        """
+        with self._pass_done:
+            # A pass already running may have paged before this call; wait for the next one
+            target = self.passes + (2 if self.pass_running else 1)
+            self._wake.set()
+            return self._pass_done.wait_for(lambda: self.passes >= target or self._stopped.is_set(), timeout)
+
+    def wait_for_first_pass(self, timeout=None):
+        with self._pass_done:
+            return self._pass_done.wait_for(lambda: self.passes > 0, timeout)
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        with self._pass_done:
+            self._pass_done.notify_all()
+
+    def snapshot(self):
+        return {
+            "interval_seconds": self.interval,
+            "passes": self.passes,
+            "pass_running": self.pass_running,
+            "last_pass_finished": self.last_pass_finished,
+            "last_pass_seconds": round(self.last_pass_seconds, 1) if self.last_pass_seconds else None,
+            "age_seconds": round(time.time() - self.last_pass_finished, 1) if self.last_pass_finished else None,
+            "match_count": len(self.matches),
+            "last_error": self.last_error,
+        }
+
+
+_monitor = None
+
+
+def start_monitor(interval=MONITOR_INTERVAL, browser_service=None, output_dir="vinted_screenshots"):
+    """
+    Starts the process-wide monitor (idempotent). It runs on the browser service loop when one
+    is given, otherwise on its own thread and event loop.
+    """
+    global _monitor
+    if _monitor is None:
+        monitor = ScanMonitor(interval, output_dir, browser_service)
+        if browser_service:
+            browser_service.submit(monitor.run())
+        else:
+            threading.Thread(target=lambda: asyncio.run(monitor.run()), name="vinted-monitor", daemon=True).start()
+        _monitor = monitor
+    return _monitor
+
+
+def stop_monitor():
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+
+
+def _monitor_screenshots():
+    monitor = _monitor
+    return [match["screenshot_path"] for match in monitor.matches] if monitor else []
+
+
+register_reference_source(_monitor_screenshots)
+
+
+def get_monitor():
+    """Returns the running monitor, or None when monitoring is off."""
+    return _monitor
+
 
 if __name__ == "__main__":
-    path, url = asyncio.run(capture_newest_vinted_item_screenshot())
-    if path:
-        print(f"Success to {path}")
+    import sys
+    if "--monitor" in sys.argv:
+        # Run the monitor in the foreground until interrupted
+        monitor = ScanMonitor(MONITOR_INTERVAL or 300)
+        try:
+            asyncio.run(monitor.run())
+        except KeyboardInterrupt:
+            monitor.stop()
+    else:
+        matches = asyncio.run(capture_newest_vinted_item_screenshot())
+        for match in matches:
+            print(f"Match: {match['url']} -> {match['screenshot_path']}")